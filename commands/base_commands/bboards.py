@@ -54,12 +54,18 @@ def list_bboards(caller, old=False):
         bb_name = bboard.key
         unread_num = bboard.num_of_unread_posts(caller, old)
         subbed = bboard in my_subs
-        posts = bboard.archived_posts if old else bboard.posts
         if unread_num:
             unread_str = " {w(%s new){n" % unread_num
         else:
             unread_str = ""
-        bbtable.add_row([bb_number, bb_name, "%s%s" % (len(posts), unread_str), subbed])
+        bbtable.add_row(
+            [
+                bb_number,
+                bb_name,
+                "%s%s" % (bboard.get_post_count(old), unread_str),
+                subbed,
+            ]
+        )
     caller.msg("\n{w" + "=" * 60 + "{n\n%s" % bbtable)
 
 
@@ -212,18 +218,16 @@ class CmdBBNew(ArxPlayerCommand):
             if not posts:
                 continue
             caller.msg("{wBoard {c%s{n:" % bb.key)
-            posts_on_board = 0
-            for post in posts:
-                if noread:
-                    bb.mark_read(caller, post)
-                else:
-                    bb.read_post(caller, post)
-                found_posts += 1
-                posts_on_board += 1
-                if found_posts >= num_posts:
-                    return
+            posts = list(posts[: num_posts - found_posts])
+            found_posts += len(posts)
             if noread:
-                self.msg("You have marked %s posts as read." % posts_on_board)
+                bb.mark_posts_read(caller, posts)
+                self.msg("You have marked %s posts as read." % len(posts))
+            else:
+                for post in posts:
+                    bb.read_post(caller, post)
+            if found_posts >= num_posts:
+                return
         if not found_posts:
             self.msg(
                 "No new posts found on boards: %s."
@@ -13,6 +13,7 @@ from server.utils import prettytable
 from server.utils.arx_utils import raw, list_to_string
 from commands.base import ArxCommand, ArxPlayerCommand
 from commands.mixins import RewardRPToolUseMixin
+from typeclasses.broadcast import MsgPreferences
 
 AT_SEARCH_RESULT = variable_from_module(*settings.SEARCH_AT_RESULT.rsplit(".", 1))
 
@@ -227,11 +228,13 @@ class CmdGameSettings(ArxPlayerCommand):
             new_val = not char.attributes.get(attr)
             result = "on" if new_val else "off"
             char.attributes.add(attr, not char.attributes.get(attr))
+        MsgPreferences.invalidate(char)
         self.msg(f"{attr} is now {result}.")
 
     def set_text_colors(self, char, attr):
         """Sets either pose_quote_color or name_color for the caller"""
         args = self.args
+        MsgPreferences.invalidate(char)
         if not args:
             char.attributes.remove(attr)
             char.msg("Cleared %s setting." % attr)
@@ -717,7 +720,7 @@ class CmdWhisper(RewardRPToolUseMixin, ArxCommand):
                         exclude=exclude,
                     )
                     self.mark_command_used()
-        caller.posecount += 1
+        caller.increment_posecount()
 
 
 class CmdPage(ArxPlayerCommand):
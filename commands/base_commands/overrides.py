@@ -48,6 +48,7 @@ from evennia.utils.utils import (
 from server.utils import arx_utils, prettytable
 from server.utils.exceptions import CommandError
 from commands.base import ArxCommand, ArxPlayerCommand
+from typeclasses.presence import PRESENCE
 from world.dominion.models import RPEvent
 
 AT_SEARCH_RESULT = variable_from_module(*settings.SEARCH_AT_RESULT.rsplit(".", 1))
@@ -516,7 +517,7 @@ class CmdEmit(ArxCommand):
         ):
             caller.msg("Those options are restricted to GMs only.")
             return
-        self.caller.posecount += 1
+        self.caller.increment_posecount()
         if cmdstring == "remit":
             rooms_only = True
             send_to_contents = True
@@ -703,7 +704,7 @@ class CmdPose(ArxCommand):
             self.caller.location.msg_action(
                 self.caller, self.args, options={"is_pose": True}
             )
-            self.caller.posecount += 1
+            self.caller.increment_posecount()
 
 
 class CmdArxSay(CmdSay):
@@ -744,7 +745,7 @@ class CmdArxSay(CmdSay):
         self.caller.location.msg_action(
             self.caller, pre_name_emit_string, exclude=[self.caller], options=options
         )
-        self.caller.posecount += 1
+        self.caller.increment_posecount()
 
 
 # Changed to display room dbref number rather than room name
@@ -844,7 +845,7 @@ class CmdWho(ArxPlayerCommand):
             ) or player.check_permstring("Wizards")
         total_players = len(set(ob.account for ob in session_list))
         number_displayed = 0
-        already_counted = []
+        already_counted = set()
         public_members = []
         if "org" in self.switches:
             from world.dominion.models import Organization
@@ -869,11 +870,11 @@ class CmdWho(ArxPlayerCommand):
                 if pc in already_counted:
                     continue
                 if not session.logged_in:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
                 delta_cmd = pc.idle_time
                 if "active" in self.switches and delta_cmd > 1200:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
                 if "org" in self.switches and pc not in public_members:
                     continue
@@ -884,14 +885,14 @@ class CmdWho(ArxPlayerCommand):
                 pname = self.format_pname(session.get_account())
                 char = pc.char_ob
                 if "watch" in self.switches and char not in watch_list:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
                 if not char or not char.item_data.fealty:
                     fealty = "---"
                 else:
                     fealty = char.item_data.fealty
                 if not self.check_filters(pname, base, fealty):
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
                 pname = crop(pname, width=18)
                 if (
@@ -927,7 +928,7 @@ class CmdWho(ArxPlayerCommand):
                         or session.address,
                     ]
                 )
-                already_counted.append(pc)
+                already_counted.add(pc)
                 number_displayed += 1
         else:
             if not sparse:
@@ -940,27 +941,27 @@ class CmdWho(ArxPlayerCommand):
                 if pc in already_counted:
                     continue
                 if not session.logged_in:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
                 if "org" in self.switches and pc not in public_members:
                     continue
                 delta_cmd = pc.idle_time
                 if "active" in self.switches and delta_cmd > 1200:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     continue
-                if not pc.db.hide_from_watch:
+                if not PRESENCE.is_hidden(pc):
                     base = str(pc)
                     pname = self.format_pname(pc, lname=True, sparse=sparse)
                     char = pc.char_ob
                     if "watch" in self.switches and char not in watch_list:
-                        already_counted.append(pc)
+                        already_counted.add(pc)
                         continue
                     if not char or not char.item_data.fealty:
                         fealty = "---"
                     else:
                         fealty = str(char.item_data.fealty)
                     if not self.check_filters(pname, base, fealty):
-                        already_counted.append(pc)
+                        already_counted.add(pc)
                         continue
                     idlestr = self.get_idlestr(delta_cmd)
                     if sparse:
@@ -972,10 +973,10 @@ class CmdWho(ArxPlayerCommand):
                         table.add_row([pname, fealty, idlestr])
                     else:
                         table.add_row([pname, idlestr])
-                    already_counted.append(pc)
+                    already_counted.add(pc)
                     number_displayed += 1
                 else:
-                    already_counted.append(pc)
+                    already_counted.add(pc)
         is_one = number_displayed == 1
         if number_displayed == total_players:
             string = "{wPlayers:{n\n%s\n%s unique account%s logged in." % (
@@ -1052,11 +1053,13 @@ class CmdArxSetAttribute(CmdSetAttribute):
                         result.append(self.rm_attr(obj, attr))
             else:
                 # setting attribute(s). Make sure to convert to real Python type before saving.
-                for attr in attrs:
-                    if not self.check_attr(obj, attr):
-                        continue
-                    value = _convert_from_string(self, value)
-                    result.append(self.set_attr(obj, attr, value))
+                # item data values are saved together once they've all been set
+                with obj.item_data.batch():
+                    for attr in attrs:
+                        if not self.check_attr(obj, attr):
+                            continue
+                        value = _convert_from_string(self, value)
+                        result.append(self.set_attr(obj, attr, value))
             # send feedback
             msg = "".join(result).strip("\n")
             caller.msg(msg)
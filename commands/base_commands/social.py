@@ -5,7 +5,6 @@ will be character commands, since they'll deal with the grid.
 import time
 import random
 from datetime import datetime, timedelta
-from functools import reduce
 
 from django.conf import settings
 from django.db.models import Q
@@ -30,7 +29,9 @@ from server.utils.arx_utils import (
     a_or_an,
     get_full_url,
 )
+from typeclasses.broadcast import MsgPreferences
 from typeclasses.characters import Character
+from typeclasses.presence import PRESENCE
 from typeclasses.rooms import ArxRoom
 from web.character.models import AccountHistory, FirstContact
 from world.crafting.models import (
@@ -52,6 +53,7 @@ from world.dominion.models import (
     PrestigeCategory,
     PrestigeNomination,
 )
+from world.dominion.prestige import PRESTIGE_RANKINGS
 from world.msgs.models import Journal, Messenger
 from world.msgs.managers import reload_model_as_proxy
 from world.stats_and_skills import do_dice_check
@@ -102,7 +104,7 @@ def get_char_names(charlist, caller):
         char_name(char, verbose_where, watch_list)
         for char in charlist
         if char.player
-        and (not char.player.db.hide_from_watch or caller.check_permstring("builders"))
+        and (not PRESENCE.is_hidden(char.player) or caller.check_permstring("builders"))
     )
 
 
@@ -213,56 +215,52 @@ class CmdWhere(ArxPlayerCommand):
         if "shops" in self.switches:
             self.list_shops()
             return
-        characters = Character.objects.filter(Q(roster__roster__name="Active")).exclude(
-            db_tags__db_key__iexact="disguised"
-        )
-        if self.args:
-            name_list = map(lambda n: Q(db_key__iexact=n), self.lhslist)
-            name_list = reduce(lambda a, b: a | b, name_list)
-            characters = [
-                ob.id
-                for ob in characters.filter(name_list)
-                if not ob.player_ob.db.hide_from_watch
-            ]
-        rooms = (
-            ArxRoom.objects.exclude(db_tags__db_key__iexact="private")
-            .filter(locations_set__in=characters)
-            .distinct()
-            .order_by("db_key")
-        )
+        occupied = PRESENCE.get_occupied_rooms(room_typeclass=ArxRoom)
+        names = set(name.lower() for name in self.lhslist) if self.args else None
+
+        def is_locatable(char):
+            """Whether a character's presence shows us their room"""
+            try:
+                if char.is_disguised or char.roster.roster.name != "Active":
+                    return False
+            except AttributeError:
+                return False
+            if names is None:
+                return True
+            return char.key.lower() in names and not PRESENCE.is_hidden(char.player_ob)
+
+        rooms = [
+            room
+            for room, charlist in occupied.items()
+            if any(is_locatable(ob) for ob in charlist)
+        ]
         if not rooms:
             self.msg("No visible characters found.")
             return
         # this blank line is now a love note to my perfect partner. <3
         msg = " {wLocations of players:\nPlayers who are currently LRP have a |R+|n by their name, "
         msg += "and players who are on your watch list have a {c*{n by their name."
-        applicable_chars = []
+        applicable_chars = set()
         if self.check_switches(self.randomscene_switches):
             cmd = CmdRandomScene()
             cmd.caller = caller.char_ob
-            applicable_chars = list(cmd.scenelist) + [
-                ob for ob in cmd.newbies if ob not in cmd.claimlist
-            ]
+            claimlist = cmd.claimlist
+            applicable_chars = set(cmd.scenelist)
+            applicable_chars.update(ob for ob in cmd.newbies if ob not in claimlist)
         elif self.check_switches(self.firstimp_switches):
-            applicable_chars = [
+            applicable_chars = set(
                 ob.entry.character
                 for ob in AccountHistory.objects.unclaimed_impressions(caller.roster)
-            ]
-        for room in rooms:
-            # somehow can get Character in queryset rather than ArxRoom
-            if not hasattr(room, "get_visible_characters"):
-                from evennia.utils.logger import log_err
-
-                log_err(
-                    "Object ID: %s is not a room despite being from ArxRoom queryset."
-                    % room.id
-                )
-                continue
-            charlist = sorted(room.get_visible_characters(caller), key=lambda x: x.name)
+            )
+        for room in sorted(rooms, key=lambda x: x.db_key):
+            charlist = sorted(
+                (ob for ob in occupied[room] if ob.access(caller, "view")),
+                key=lambda x: x.name,
+            )
             charlist = [
                 ob
                 for ob in charlist
-                if not ob.player_ob.db.hide_from_watch and not ob.is_disguised
+                if not PRESENCE.is_hidden(ob.player_ob) and not ob.is_disguised
             ]
             if self.check_switches(self.filter_switches):
                 charlist = [ob for ob in charlist if ob in applicable_chars]
@@ -309,7 +307,7 @@ class CmdWatch(ArxPlayerCommand):
         table = []
         for ob in sorted(watchlist, key=lambda x: x.key):
             name = ob.key.capitalize()
-            if ob.player_ob.is_connected and not ob.player_ob.db.hide_from_watch:
+            if ob.player_ob.is_connected and not PRESENCE.is_hidden(ob.player_ob):
                 name = "{c*%s{n" % name
             table.append(name)
         caller.msg(
@@ -317,7 +315,7 @@ class CmdWatch(ArxPlayerCommand):
             % ", ".join(table),
             options={"box": True},
         )
-        if caller.db.hide_from_watch:
+        if PRESENCE.is_hidden(caller):
             caller.msg("You are currently in hidden mode.")
         return
 
@@ -328,10 +326,9 @@ class CmdWatch(ArxPlayerCommand):
             self.disp_watchlist(caller)
             return
         if "hide" in self.switches:
-            hide = caller.db.hide_from_watch or False
-            hide = not hide
+            hide = not PRESENCE.is_hidden(caller)
             caller.msg("Hiding set to %s." % str(hide))
-            caller.db.hide_from_watch = hide
+            PRESENCE.set_hidden(caller, hide)
             return
         player = caller.search(self.args)
         if not player:
@@ -950,6 +947,7 @@ class CmdPosebreak(ArxCommand):
             caller.db.posebreak = False
         else:
             caller.db.posebreak = True
+        MsgPreferences.invalidate(caller)
         caller.msg("Pose break set to %s." % caller.db.posebreak)
         return
 
@@ -2651,28 +2649,17 @@ class CmdSocialNotable(ArxCommand):
             )
             assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
         else:
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-
             if "buzz" in self.switches:
                 title = "Who's Momentarily in the News"
                 adjust_type = PrestigeAdjustment.FAME
-                assets = sorted(assets, key=lambda x: x.fame, reverse=True)
+                assets = PRESTIGE_RANKINGS.top("fame")
             elif "legend" in self.switches:
                 title = "People of Legendary Renown"
                 adjust_type = PrestigeAdjustment.LEGEND
-                assets = sorted(assets, key=lambda x: x.total_legend, reverse=True)
+                assets = PRESTIGE_RANKINGS.top("legend")
             elif "infamous" in self.switches:
                 title = "Those Who Society Shuns"
-                assets = [asset for asset in assets if asset.prestige < 0]
-                assets = sorted(assets, key=lambda x: x.prestige, reverse=False)
+                assets = PRESTIGE_RANKINGS.top(highest=False, negative_only=True)
                 if len(assets) == 0:
                     self.msg(
                         "There don't seem to be any people with negative prestige right now!"
@@ -2680,7 +2667,7 @@ class CmdSocialNotable(ArxCommand):
                     return
             else:
                 title = "Who's Being Talked About Right Now"
-                assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
+                assets = PRESTIGE_RANKINGS.top()
 
         assets = assets[:20]
         self.show_rankings(
@@ -50,6 +50,7 @@ from world.dominion.plots.models import Plot, PlotAction
 from typeclasses.accounts import Account
 from typeclasses.rooms import ArxRoom
 from typeclasses.characters import Character
+from typeclasses.presence import PRESENCE
 from typeclasses.wearable.wearable import WearableContainer
 from typeclasses.containers.container import Container
 
@@ -580,7 +581,7 @@ class CmdListStaff(ArxPlayerCommand):
         for ob in staff:
             from commands.base_commands.overrides import CmdWho
 
-            if ob.tags.get("hidden_staff") or ob.db.hide_from_watch:
+            if ob.tags.get("hidden_staff") or PRESENCE.is_hidden(ob):
                 continue
             timestr = CmdWho.get_idlestr(ob.idle_time)
             obname = CmdWho.format_pname(ob)
@@ -32,6 +32,7 @@ from web.character.models import (
 )
 
 from typeclasses.readable.readable_commands import CmdWrite
+from typeclasses.presence import PRESENCE
 from world.traits.models import Trait
 
 from commands.base_commands import (
@@ -1185,6 +1186,11 @@ class SocialTests(ArxCommandTest):
         self.assertTrue(bool(self.caller.db.hide_from_watch))
         self.call_cmd("/hide", "Hiding set to False.")
         self.assertFalse(bool(self.caller.db.hide_from_watch))
+        # hiding set directly, such as by @set, isn't hidden by a stale cache
+        self.caller.db.hide_from_watch = True
+        self.assertTrue(PRESENCE.is_hidden(self.caller))
+        self.caller.attributes.remove("hide_from_watch")
+        self.assertFalse(PRESENCE.is_hidden(self.caller))
         self.call_cmd("/stop testAccount2", "Stopped watching Char2.")
         self.assertTrue(self.char2 not in self.caller.db.watching)
         for _ in range(max_size):
@@ -1,3 +1,45 @@
-from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from evennia_extensions.character_extensions.models import CharacterSheet
+from server.utils.test_utils import ArxTest
+
+
+class TestItemDataBatch(ArxTest):
+    def get_saved_sheet(self):
+        return CharacterSheet.objects.filter(objectdb=self.char1).values(
+            "age", "concept", "family"
+        )[0]
+
+    def test_batch(self):
+        item_data = self.char1.item_data
+        item_data.age = 20
+        item_data.xp = 0
+        with CaptureQueriesContext(connection) as queries:
+            with item_data.batch():
+                item_data.age = 25
+                item_data.concept = "Pirate"
+                item_data.family = "Grayson"
+                item_data.xp = 5
+                item_data.total_xp = 10
+                self.assertEqual(item_data.age, 25)
+                self.assertEqual(self.get_saved_sheet()["age"], 20)
+        updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(
+            self.get_saved_sheet(), dict(age=25, concept="Pirate", family="Grayson")
+        )
+        self.assertIs(
+            CharacterSheet.objects.get(objectdb=self.char1), self.char1.charactersheet
+        )
+        self.assertEqual(self.char1.charactercombatsettings.total_xp, 10)
+        # values set before an exception are still saved
+        with self.assertRaises(ValueError):
+            with item_data.batch():
+                item_data.age = 30
+                raise ValueError
+        self.assertEqual(self.get_saved_sheet()["age"], 30)
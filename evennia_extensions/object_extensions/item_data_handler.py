@@ -5,6 +5,8 @@ the attributes defined as properties that a given Typeclass will need,
 routing the getter/setters of those properties to the underlying models
 where the data is stored.
 """
+from contextlib import contextmanager
+
 from evennia_extensions.object_extensions.storage_wrappers import (
     DimensionsWrapper,
     PermanenceWrapper,
@@ -23,6 +25,50 @@ from server.utils.arx_utils import CachedProperty
 class ItemDataHandler:
     def __init__(self, obj):
         self.obj = obj
+        # storage objects changed during a batch, keyed by id, with their fields
+        self.dirty_storage = None
+
+    @contextmanager
+    def batch(self):
+        """
+        Within this context, setting our values doesn't save their storage
+        objects each time. Instead, each one that was changed is saved once at
+        the end, with only the fields that were changed. Since storage objects
+        are shared in memory, reading a value inside the batch gets the new
+        value. Storage is still saved if we leave with an exception, as it
+        would have been without the batch.
+
+            Usage:
+                with obj.item_data.batch():
+                    obj.item_data.age = 20
+                    obj.item_data.concept = "Pirate"
+        """
+        if self.dirty_storage is not None:
+            # the outermost batch saves everything
+            yield self
+            return
+        self.dirty_storage = {}
+        try:
+            yield self
+        finally:
+            dirty_storage, self.dirty_storage = self.dirty_storage, None
+            for storage, fields in dirty_storage.values():
+                self.save_batched_storage(storage, fields)
+
+    @staticmethod
+    def save_batched_storage(storage, fields):
+        """Saves a storage object changed in a batch, updating only its fields"""
+        if storage._state.adding:
+            # storage that's never been saved is inserted with all its fields
+            storage.save()
+            return
+        # values set through other descriptors, like the location of an
+        # ObjectDB or a characteristic on a CharacterSheet, save themselves
+        fields = fields.intersection(
+            field.name for field in storage._meta.concrete_fields
+        )
+        if fields:
+            storage.save(update_fields=fields)
 
     # properties for dimensions
     size = DimensionsWrapper()
@@ -53,10 +53,26 @@ class StorageWrapper(ABC):
             setattr(storage, self.attr_name, self.deleted_value)
             self.on_pre_delete(storage)
             if self.call_save:
-                storage.save()
+                self.save_storage(instance, storage)
         except ObjectDoesNotExist:
             pass
 
+    def save_storage(self, instance, storage):
+        """
+        Saves the storage object, unless our instance is in the middle of a
+        batch, in which case it's marked as changed and saved when the batch ends.
+        """
+        dirty_storage = getattr(instance, "dirty_storage", None)
+        if dirty_storage is None:
+            storage.save()
+            return
+        _, fields = dirty_storage.setdefault(id(storage), (storage, set()))
+        fields.update(self.get_update_fields())
+
+    def get_update_fields(self):
+        """The fields of the storage object that setting or deleting us changes"""
+        return [self.attr_name]
+
     def get_storage_value_or_default(self, instance):
         """
         This tries to get a value from the storage object for our descriptor's instance.
@@ -101,7 +117,7 @@ class StorageWrapper(ABC):
         setattr(storage, self.attr_name, value)
         if self.call_save:
             self.on_pre_save(storage, value)
-            storage.save()
+            self.save_storage(instance, storage)
 
     def __delete__(self, instance):
         self.delete_attribute(instance)
@@ -19,6 +19,12 @@ class RoomDescriptionWrapper(StorageWrapper):
         if self.attr_name == "room_mood":
             storage.mood_set_at = datetime.now()
 
+    def get_update_fields(self):
+        """Setting or deleting room_mood also changes when and by whom it was set"""
+        if self.attr_name == "room_mood":
+            return [self.attr_name, "mood_set_at", "mood_set_by"]
+        return [self.attr_name]
+
     def on_pre_delete(self, storage):
         """If our self.attr_name is room_mood, then we clear the timestamp
         and our mood_set_by."""
@@ -22,7 +22,9 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from server.utils.counters import COUNTERS
+
+    COUNTERS.start()
 
 
 def at_server_stop():
@@ -30,7 +32,16 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from evennia.scripts.models import ScriptDB
+    from server.utils.counters import COUNTERS
+    from typeclasses.scripts.event_manager import EVENT_LOG_WRITER, get_event_manager
+
+    try:
+        get_event_manager().save_idle_timers()
+    except ScriptDB.DoesNotExist:
+        pass
+    EVENT_LOG_WRITER.flush()
+    COUNTERS.stop()
 
 
 def at_server_reload_start():
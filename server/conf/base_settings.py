@@ -207,6 +207,14 @@ LOG_FORMAT = "%(asctime)s: %(message)s"
 DATE_FORMAT = "%m/%d/%Y %I:%M:%S"
 GLOBAL_DOMAIN_INCOME_MOD = config("GLOBAL_DOMAIN_INCOME_MOD", cast=float, default=0.75)
 
+######################################################################
+# Session log settings
+######################################################################
+# Most lines kept in an account's log of messages for @view_log/report
+SESSION_LOG_CAPACITY = config("SESSION_LOG_CAPACITY", cast=int, default=1000)
+# Most lines kept for pose/history
+POSE_HISTORY_CAPACITY = config("POSE_HISTORY_CAPACITY", cast=int, default=100)
+
 SECRET_KEY = config("SECRET_KEY", default="PLEASEREPLACEME12345")
 HOST_BLOCKER_API_KEY = config("HOST_BLOCKER_API_KEY", default="SOME_KEY")
 import cloudinary
@@ -1,3 +1,5 @@
+from bisect import bisect_right
+
 from django.db import models
 
 from evennia.utils.idmapper.models import SharedMemoryModel
@@ -65,6 +67,7 @@ class NameLookupModel(SharedMemoryModel):
 class NameIntegerLookupModel(NameLookupModel):
     """Tables with name/value pairs that should be sorted by those values"""
 
+    _sorted_index = None
     value = models.SmallIntegerField(
         verbose_name="minimum value for this difficulty range/rating", unique=True
     )
@@ -72,6 +75,37 @@ class NameIntegerLookupModel(NameLookupModel):
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_sorted_index(cls):
+        """
+        Returns our instances sorted by value along with a matching list of their
+        values, for bisecting. It's built once and rebuilt after a save/delete or
+        when our cache has been reset.
+        """
+        if cls._sorted_index is None or not cls._cache_set:
+            instances = sorted(cls.get_all_instances(), key=lambda x: x.value)
+            cls._sorted_index = (instances, [ob.value for ob in instances])
+        return cls._sorted_index
+
+    @classmethod
+    def get_index_for_value(cls, value: int) -> int:
+        """
+        Gets the position in our sorted instances of the highest one whose value
+        is at or below the given value, or 0 if the value is below all of them.
+        """
+        values = cls.get_sorted_index()[1]
+        return max(bisect_right(values, value) - 1, 0)
+
+    @classmethod
+    def get_instance_for_value(cls, value: int):
+        """Returns the highest instance whose value is at or below the given value"""
+        instances = cls.get_sorted_index()[0]
+        if not instances:
+            raise ValueError(
+                f"No {cls.__name__} objects have yet been defined in the database."
+            )
+        return instances[cls.get_index_for_value(value)]
+
     @classmethod
     def cached_instance_sorting_function(cls, instance):
         return instance.value
@@ -79,3 +113,13 @@ class NameIntegerLookupModel(NameLookupModel):
     @classmethod
     def get_cached_instance_sorting_column(cls):
         return "value"
+
+    def save(self, *args, **kwargs):
+        ret = super().save(*args, **kwargs)
+        type(self)._sorted_index = None
+        return ret
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        type(self)._sorted_index = None
+        return ret
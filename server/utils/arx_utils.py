@@ -7,6 +7,7 @@ be of use when designing your own game.
 """
 import re
 from datetime import datetime
+from functools import lru_cache
 
 from django.conf import settings
 
@@ -184,34 +185,58 @@ def datetime_format(date):
     return timestring
 
 
+# our old MUSH-style codes and the evennia markup that replaces them
+OLD_ANSI_CODES = {
+    "%r": "|/",
+    "%R": "|/",
+    "%t": "|-",
+    "%T": "|-",
+    "%b": "|_",
+    "%cr": "|r",
+    "%cR": "|[R",
+    "%cg": "|g",
+    "%cG": "|[G",
+    "%cy": "|!Y",
+    "%cY": "|[Y",
+    "%cb": "|!B",
+    "%cB": "|[B",
+    "%cm": "|!M",
+    "%cM": "|[M",
+    "%cc": "|!C",
+    "%cC": "|[C",
+    "%cw": "|!W",
+    "%cW": "|[W",
+    "%cx": "|!X",
+    "%cX": "|[X",
+    "%ch": "|h",
+    "%cn": "|n",
+}
+# No code is the start of another, so one pass finds the same codes that
+# replacing each of them in turn did.
+RE_OLD_ANSI = re.compile("|".join(re.escape(code) for code in OLD_ANSI_CODES))
+
+
+def _sub_old_ansi_match(match):
+    return OLD_ANSI_CODES[match.group()]
+
+
+@lru_cache(maxsize=1024)
+def _translate_old_ansi(text):
+    return RE_OLD_ANSI.sub(_sub_old_ansi_match, text)
+
+
 def sub_old_ansi(text):
     """Replacing old ansi with newer evennia markup strings"""
     if not text:
         return ""
-    text = text.replace("%r", "|/")
-    text = text.replace("%R", "|/")
-    text = text.replace("%t", "|-")
-    text = text.replace("%T", "|-")
-    text = text.replace("%b", "|_")
-    text = text.replace("%cr", "|r")
-    text = text.replace("%cR", "|[R")
-    text = text.replace("%cg", "|g")
-    text = text.replace("%cG", "|[G")
-    text = text.replace("%cy", "|!Y")
-    text = text.replace("%cY", "|[Y")
-    text = text.replace("%cb", "|!B")
-    text = text.replace("%cB", "|[B")
-    text = text.replace("%cm", "|!M")
-    text = text.replace("%cM", "|[M")
-    text = text.replace("%cc", "|!C")
-    text = text.replace("%cC", "|[C")
-    text = text.replace("%cw", "|!W")
-    text = text.replace("%cW", "|[W")
-    text = text.replace("%cx", "|!X")
-    text = text.replace("%cX", "|[X")
-    text = text.replace("%ch", "|h")
-    text = text.replace("%cn", "|n")
-    return text
+    if "%" not in text:
+        return text
+    if type(text) is not str:
+        # keep the type of subclasses like ANSIString
+        for code, markup in OLD_ANSI_CODES.items():
+            text = text.replace(code, markup)
+        return text
+    return _translate_old_ansi(text)
 
 
 def strip_ansi(text):
@@ -219,35 +244,13 @@ def strip_ansi(text):
     from evennia.utils.ansi import strip_ansi
 
     text = strip_ansi(text)
-    text = (
-        text.replace("%r", "")
-        .replace("%R", "")
-        .replace("%t", "")
-        .replace("%T", "")
-        .replace("%b", "")
-    )
-    text = (
-        text.replace("%cr", "")
-        .replace("%cR", "")
-        .replace("%cg", "")
-        .replace("%cG", "")
-        .replace("%cy", "")
-    )
-    text = (
-        text.replace("%cY", "")
-        .replace("%cb", "")
-        .replace("%cB", "")
-        .replace("%cm", "")
-        .replace("%cM", "")
-    )
-    text = (
-        text.replace("%cc", "")
-        .replace("%cC", "")
-        .replace("%cw", "")
-        .replace("%cW", "")
-        .replace("%cx", "")
-    )
-    text = text.replace("%cX", "").replace("%ch", "").replace("%cn", "")
+    if "%" not in text:
+        return text
+    # Removing a code can join the text around it into another code, which
+    # is then removed if it comes later in our list, so we keep replacing
+    # them in turn here rather than in one pass.
+    for code in OLD_ANSI_CODES:
+        text = text.replace(code, "")
     return text
 
 
@@ -255,13 +258,14 @@ def broadcast(txt, format_announcement=True):
     """Broadcasting a message to the server"""
     from evennia.server.sessionhandler import SESSION_HANDLER
     from evennia.scripts.models import ScriptDB
+    from typeclasses.scripts.event_manager import get_event_manager
 
     if format_announcement:
         txt = "{wServer Announcement{n: %s" % txt
     txt = sub_old_ansi(txt)
     SESSION_HANDLER.announce_all(txt)
     try:
-        events = ScriptDB.objects.get(db_key="Event Manager")
+        events = get_event_manager()
         events.add_gemit(txt)
     except ScriptDB.DoesNotExist:
         pass
@@ -376,6 +380,8 @@ def post_roster_cleanup(entry):
     Args:
         entry: RosterEntry we're initializing
     """
+    from typeclasses.presence import PRESENCE
+
     entry.player.nicks.clear()
     entry.character.nicks.clear()
     entry.player.attributes.remove("playtimes")
@@ -386,7 +392,7 @@ def post_roster_cleanup(entry):
         if entry.player in watched_by:
             watched_by.remove(entry.player)
     entry.player.attributes.remove("watching")
-    entry.player.attributes.remove("hide_from_watch")
+    PRESENCE.set_hidden(entry.player, False)
     entry.player.db.mails = []
     entry.player.db.readmails = set()
     entry.player.tags.remove("new_mail")
@@ -536,6 +542,45 @@ def cache_safe_update(queryset, **kwargs):
             setattr(obj, keyword, value)
 
 
+def cache_safe_increment(model, deltas, *fields):
+    """
+    Adds a per-row amount to one or more fields of many rows using F()
+    expressions, then applies the same amounts to any instances that are
+    already in the idmapper cache so that they do not overwrite the changes
+    upon saving themselves. Rows that share the same amount are updated in a
+    single query, so the number of queries scales with the number of distinct
+    amounts rather than the number of rows.
+
+    Args:
+        model: The SharedMemoryModel class whose rows we're changing.
+        deltas (dict): Mapping of primary keys to the amount to add.
+        *fields: Names of the fields that receive the amount.
+
+    Returns:
+        The number of rows changed.
+    """
+    from collections import defaultdict
+    from django.db.models import F, Value
+    from django.db.models.functions import Coalesce
+
+    pks_by_amount = defaultdict(list)
+    for pk, amount in deltas.items():
+        if amount:
+            pks_by_amount[amount].append(pk)
+    changed = 0
+    for amount, pks in pks_by_amount.items():
+        changed += model.objects.filter(pk__in=pks).update(
+            **{field: Coalesce(F(field), Value(0)) + amount for field in fields}
+        )
+        for pk in pks:
+            obj = model.get_cached_instance(pk)
+            if not obj:
+                continue
+            for field in fields:
+                setattr(obj, field, (getattr(obj, field) or 0) + amount)
+    return changed
+
+
 def text_box(text):
     """Encloses characters in a cute little text box"""
     boxchars = "\n{w" + "*" * 70 + "{n\n"
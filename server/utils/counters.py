@@ -0,0 +1,81 @@
+"""
+Write-behind counters for integer fields that are bumped far more often than
+anyone needs them saved, like the pose counts of characters.
+
+Increments are held in memory and written every FLUSH_INTERVAL seconds by
+flush(), which uses F() expressions to update all the rows that share an
+amount at once. It also runs when the server stops or reloads. The instances
+that the idmapper holds are updated at the same time, so they never include
+increments that haven't been written. Anything that reads a counter should use
+COUNTERS.get so that pending increments are added to the saved value.
+"""
+import traceback
+from collections import defaultdict
+
+from server.utils.arx_utils import cache_safe_increment
+
+# seconds between flushes of our pending increments
+FLUSH_INTERVAL = 30
+
+
+class WriteBehindCounters(object):
+    """Pending increments to integer fields, keyed by model and field name"""
+
+    def __init__(self):
+        # (model class, field name) -> {pk: increment}
+        self.pending = defaultdict(lambda: defaultdict(int))
+        self.looping_call = None
+
+    def increment(self, instance, field, amount=1):
+        """Adds amount to a field of instance the next time we flush"""
+        self.pending[(type(instance), field)][instance.pk] += amount
+
+    def get(self, instance, field):
+        """Returns the value of a field including increments not yet saved"""
+        value = getattr(instance, field)
+        pending = self.pending.get((type(instance), field))
+        if pending:
+            value += pending.get(instance.pk, 0)
+        return value
+
+    def discard(self, instance, field):
+        """Drops pending increments, such as when the field is being set outright"""
+        pending = self.pending.get((type(instance), field))
+        if pending:
+            pending.pop(instance.pk, None)
+
+    def clear(self):
+        """Drops every pending increment"""
+        self.pending.clear()
+
+    def flush(self):
+        """Writes all pending increments with cache_safe_increment"""
+        pending, self.pending = self.pending, defaultdict(lambda: defaultdict(int))
+        for (model, field), increments in pending.items():
+            cache_safe_increment(model, increments, field)
+
+    def flush_on_timer(self):
+        """Flushes, but doesn't let an error stop our timer"""
+        # noinspection PyBroadException
+        try:
+            self.flush()
+        except Exception:
+            traceback.print_exc()
+
+    def start(self, interval=FLUSH_INTERVAL):
+        """Starts flushing every interval seconds"""
+        from twisted.internet import task
+
+        if self.looping_call and self.looping_call.running:
+            return
+        self.looping_call = task.LoopingCall(self.flush_on_timer)
+        self.looping_call.start(interval, now=False)
+
+    def stop(self):
+        """Stops our timer and writes whatever is still pending"""
+        if self.looping_call and self.looping_call.running:
+            self.looping_call.stop()
+        self.flush()
+
+
+COUNTERS = WriteBehindCounters()
@@ -0,0 +1,90 @@
+"""
+Some models, like RollResult, store jinja2 template strings for their messages.
+Making a new Environment and compiling the template again for every roll is
+much slower than rendering it, so this keeps a single Environment and a
+bounded cache of compiled templates, keyed by the model instance that owns
+them. Models should call invalidate_template when they're saved, though a
+changed template string is also noticed and recompiled on its own.
+"""
+from collections import OrderedDict
+
+from jinja2 import BaseLoader, Environment
+
+# How many compiled templates we keep before dropping the least recently used
+MAX_COMPILED_TEMPLATES = 256
+
+
+class CompiledTemplateCache(object):
+    """An LRU cache of compiled templates sharing a single Environment"""
+
+    def __init__(self, max_size=MAX_COMPILED_TEMPLATES):
+        self.max_size = max_size
+        self.environment = Environment(loader=BaseLoader())
+        # key to a tuple of (hash of template string, compiled template)
+        self.templates = OrderedDict()
+
+    def get_template(self, key, source):
+        """
+        Returns the compiled template for a key, compiling it if we don't have it
+        or its source has changed.
+
+            Args:
+                key: A hashable key for whatever owns the template, or None to
+                    use the source itself as the key
+                source (str): The jinja2 template string
+        """
+        if key is None:
+            key = source
+        source_hash = hash(source)
+        cached = self.templates.get(key)
+        if cached and cached[0] == source_hash:
+            self.templates.move_to_end(key)
+            return cached[1]
+        template = self.environment.from_string(source)
+        self.templates[key] = (source_hash, template)
+        self.templates.move_to_end(key)
+        while len(self.templates) > self.max_size:
+            self.templates.popitem(last=False)
+        return template
+
+    def render(self, key, source, data):
+        """Renders a template string with a dict of context data"""
+        return self.get_template(key, source).render(data)
+
+    def invalidate(self, key):
+        """Drops the compiled template for a key, if we have one"""
+        self.templates.pop(key, None)
+
+    def clear(self):
+        """Drops every compiled template"""
+        self.templates.clear()
+
+
+TEMPLATE_CACHE = CompiledTemplateCache()
+
+
+def get_template_key(instance, field_name="template"):
+    """Returns the cache key for a template field of a model instance"""
+    if not instance.pk:
+        return None
+    return instance._meta.label, instance.pk, field_name
+
+
+def render_template(source, key=None, **data):
+    """
+    Renders a jinja2 template string, using a compiled template from our cache.
+
+        Args:
+            source (str): The jinja2 template string
+            key: The key of the template's owner from get_template_key, if any
+            **data: Context variables for the template
+
+        Returns:
+            The rendered string.
+    """
+    return TEMPLATE_CACHE.render(key, source, data)
+
+
+def invalidate_template(instance, field_name="template"):
+    """Drops the compiled template of a model instance, such as after it's saved"""
+    TEMPLATE_CACHE.invalidate(get_template_key(instance, field_name))
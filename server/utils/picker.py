@@ -53,3 +53,109 @@ class WeightedPicker(object):
             result = pickerdict[sorted_keys[-1]]
 
         return result
+
+    def prepare(self):
+        """
+        Returns a PreparedDistribution of our options, for picking from them
+        many times.
+        """
+        return PreparedDistribution(self.choices)
+
+
+class PreparedDistribution(object):
+    """
+    Weighted options that are prepared once with Vose's alias method, so that
+    each pick afterwards takes constant time rather than walking every option.
+    Meant to be kept and reused by anything that picks from the same options
+    again and again, like a weather type's emits. Options are picked with
+    exactly the odds that WeightedPicker.pick gives them.
+    """
+
+    def __init__(self, choices):
+        """
+        Prepares the distribution.
+        :param choices: A list of (option, weight) tuples, weights being integers.
+        """
+        self.options = [option for option, _ in choices]
+        shares = self.get_shares([int(weight) for _, weight in choices])
+        self.total = sum(shares)
+        if self.options and self.total <= 0:
+            raise ValueError("Weights must have a positive total.")
+        self.thresholds, self.aliases = self.build_alias_table(shares, self.total)
+
+    @staticmethod
+    def get_shares(weights):
+        """
+        Returns how many of the numbers WeightedPicker.pick draws from belong to
+        each option. That's its weight, except that options with no weight have
+        none, and the first option with weight has an extra one.
+        """
+        shares = [0] * len(weights)
+        if not weights:
+            return shares
+        starts = {}
+        current = 0
+        for index, weight in enumerate(weights):
+            # a later option with the same start replaces one with no weight
+            starts[current] = index
+            current += weight
+        keys = sorted(starts)
+        ends = keys[1:] + [max(current, keys[-1])]
+        for key, end in zip(keys, ends):
+            shares[starts[key]] += end - key
+        shares[starts[0]] += 1
+        return shares
+
+    @staticmethod
+    def build_alias_table(shares, total):
+        """
+        Builds the alias table with integers, so the odds are exact. Each of
+        our columns keeps its own option for the first thresholds[i] of total
+        numbers, and gives the rest to the option aliases[i].
+        """
+        number = len(shares)
+        scaled = [share * number for share in shares]
+        thresholds = [total] * number
+        aliases = list(range(number))
+        small = [index for index, value in enumerate(scaled) if value < total]
+        large = [index for index, value in enumerate(scaled) if value >= total]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            thresholds[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] += scaled[less] - total
+            if scaled[more] < total:
+                small.append(more)
+            else:
+                large.append(more)
+        return thresholds, aliases
+
+    def pick(self):
+        """
+        Picks an option, or None if we have no options.
+        """
+        if not self.options:
+            return None
+        column = random.randrange(len(self.options))
+        if random.randrange(self.total) < self.thresholds[column]:
+            return self.options[column]
+        return self.options[self.aliases[column]]
+
+    def pick_many(self, number):
+        """
+        Picks a number of options, each independently of the others.
+        :param number: How many options to pick.
+        :return: A list of the options picked.
+        """
+        if not self.options:
+            return [None] * number
+        options, thresholds, aliases = self.options, self.thresholds, self.aliases
+        total, randrange, count = self.total, random.randrange, len(options)
+        results = []
+        for _ in range(number):
+            column = randrange(count)
+            if randrange(total) < thresholds[column]:
+                results.append(options[column])
+            else:
+                results.append(options[aliases[column]])
+        return results
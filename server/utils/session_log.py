@@ -0,0 +1,126 @@
+"""
+Bounded logs of the messages an account receives, used for @view_log and
+reporting players, along with the pose history used by pose/history.
+
+A SessionLog holds its lines in a deque with a maximum length, so the oldest
+lines drop off once it's full, and counts the lines it holds by (sender, text)
+so that checking for a duplicate is a dict lookup rather than a scan of the log.
+
+Logs saved in Attributes are stored with to_data as a list of (sender
+reference, text) pairs, where a reference is "o<id>" for an object or "a<id>"
+for an account, instead of pickling every sender. from_data resolves them again
+and also accepts the lists of (sender, text) tuples we used to save.
+"""
+from collections import Counter, deque
+
+from django.conf import settings
+
+SESSION_LOG_CAPACITY = getattr(settings, "SESSION_LOG_CAPACITY", 1000)
+POSE_HISTORY_CAPACITY = getattr(settings, "POSE_HISTORY_CAPACITY", 100)
+LOG_FORMAT_KEY = "session_log"
+
+
+class SessionLog(object):
+    """A log of (sender, text) lines that discards its oldest lines when full"""
+
+    def __init__(self, lines=(), capacity=SESSION_LOG_CAPACITY, dedupe=True):
+        self.capacity = capacity
+        self.dedupe = dedupe
+        self.lines = deque(maxlen=capacity)
+        self.counts = Counter()
+        for sender, text in lines:
+            self.add(sender, text)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __contains__(self, line):
+        return self.counts[line] > 0
+
+    def __repr__(self):
+        return "<SessionLog: %s/%s lines>" % (len(self.lines), self.capacity)
+
+    def add(self, sender, text):
+        """
+        Adds a line to our log, dropping our oldest line if we're full.
+
+            Returns:
+                False if we dedupe and already have the line, True otherwise.
+        """
+        line = (sender, text)
+        if self.dedupe and self.counts[line]:
+            return False
+        if len(self.lines) == self.capacity:
+            oldest = self.lines.popleft()
+            self.counts[oldest] -= 1
+            if not self.counts[oldest]:
+                del self.counts[oldest]
+        self.lines.append(line)
+        self.counts[line] += 1
+        return True
+
+    def clear(self):
+        self.lines.clear()
+        self.counts.clear()
+
+    def to_data(self):
+        """Returns our lines in the compact form we save in Attributes"""
+        return {
+            LOG_FORMAT_KEY: [(get_sender_ref(sender), text) for sender, text in self]
+        }
+
+    @classmethod
+    def from_data(cls, data, capacity=SESSION_LOG_CAPACITY):
+        """
+        Builds a log from an Attribute's value. Lines whose senders no longer
+        exist are dropped.
+        """
+        if not data:
+            return cls(capacity=capacity)
+        if isinstance(data, dict) and LOG_FORMAT_KEY in data:
+            refs = data[LOG_FORMAT_KEY]
+            senders = resolve_sender_refs(ref for ref, _ in refs)
+            lines = [
+                (senders.get(ref, None if is_sender_ref(ref) else ref), text)
+                for ref, text in refs
+            ]
+        else:
+            lines = [tuple(line) for line in data]
+        return cls([line for line in lines if line[0]], capacity=capacity)
+
+
+def get_sender_ref(sender):
+    """Gets the reference we save for a sender, or its name if it isn't in the db"""
+    from evennia.accounts.models import AccountDB
+
+    pk = getattr(sender, "pk", None)
+    if not pk:
+        return str(sender)
+    if isinstance(sender, AccountDB):
+        return "a%s" % pk
+    return "o%s" % pk
+
+
+def is_sender_ref(ref):
+    """Whether ref refers to an object or account rather than being a name"""
+    return len(ref) > 1 and ref[0] in ("o", "a") and ref[1:].isdigit()
+
+
+def resolve_sender_refs(refs):
+    """Returns a dict of references to senders, with one query per table"""
+    from evennia.accounts.models import AccountDB
+    from evennia.objects.models import ObjectDB
+
+    ids = {"o": set(), "a": set()}
+    for ref in refs:
+        if is_sender_ref(ref):
+            ids[ref[0]].add(int(ref[1:]))
+    senders = {}
+    for prefix, model in (("o", ObjectDB), ("a", AccountDB)):
+        if ids[prefix]:
+            for ob in model.objects.filter(id__in=ids[prefix]):
+                senders["%s%s" % (prefix, ob.id)] = ob
+    return senders
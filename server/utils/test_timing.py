@@ -43,3 +43,147 @@ def time_all_at_once():
 def time_filters():
     t = Timer("by_filtering()", "from world.msgs.test_timing import by_filtering")
     print("Time is %s" % t.timeit(number=1))
+
+
+def render_roll_results(number=1000):
+    """Renders a roll result template the old way, then with our compiled cache"""
+    from jinja2 import BaseLoader, Environment
+    from server.utils.jinja_templates import render_template
+
+    template = "{{character}} rolls {{result}} and {% if result > 0 %}succeeds{% else %}fails{% endif %}."
+    data = {"character": "Tehom", "result": 5}
+
+    def uncached():
+        Environment(loader=BaseLoader()).from_string(template).render(data)
+
+    def cached():
+        render_template(template, key=("timing", 1), **data)
+
+    for name, func in (("Uncompiled", uncached), ("Cached", cached)):
+        seconds = Timer(func).timeit(number=number)
+        print("%s: %d renders per second" % (name, number / seconds))
+
+
+def broadcast_poses(room, number=100):
+    """
+    Times poses sent to everyone in a room, such as a crowded event room with 50
+    occupants, through the room broadcast and through a separate msg call per
+    listener. Only listeners with sessions do any formatting, so run this
+    against a live room.
+    """
+    from typeclasses.broadcast import RoomBroadcast
+
+    listeners = list(room.contents)
+    poser = next((ob for ob in listeners if ob.has_account), room)
+    pose = "%s smiles. \"It's |ca lovely|n night for it, isn't it?\"" % poser.key
+    options = {"is_pose": True}
+
+    def unbatched():
+        for ob in listeners:
+            ob.msg(pose, from_obj=poser, options=options)
+
+    def batched():
+        with RoomBroadcast.sending(room):
+            unbatched()
+
+    for name, func in (("per listener", unbatched), ("broadcast", batched)):
+        elapsed = Timer(func).timeit(number=number)
+        print(
+            "%s: %s listeners, %.0f poses/s" % (name, len(listeners), number / elapsed)
+        )
+
+
+def distribute_channel_message(channel, number=100):
+    """
+    Times a message with mentions sent to every subscriber of a channel, such
+    as a public channel with 300 subscribers. Delivery itself is patched out so
+    only the muting and mention highlighting are timed.
+    """
+    from unittest.mock import Mock, patch
+
+    subs = list(channel.subscriptions.all())
+    names = [sub.char_ob.key for sub in subs[:3] if sub.char_ob]
+    message = "Hey %s, and @Everyone else!" % ", ".join("@" + name for name in names)
+    msgobj = Mock(message=message, senders=subs[:1], keep_log=False)
+
+    with patch.object(type(channel), "send_msg"):
+        elapsed = Timer(
+            lambda: channel.distribute_message(msgobj, online=False)
+        ).timeit(number=number)
+    print("%s subscribers: %.0f messages/s" % (len(subs), number / elapsed))
+
+
+def translate_old_ansi(number=10000):
+    """
+    Times translating old MUSH-style codes in a room description, both the first
+    time we see it and once it's been remembered.
+    """
+    from server.utils.arx_utils import _translate_old_ansi, sub_old_ansi
+
+    desc = "%ch%cgA quiet square%cn.%r%tA fountain splashes %cbgently%cn here. " * 10
+    _translate_old_ansi.cache_clear()
+    for name, func in (
+        ("uncached", lambda: _translate_old_ansi.__wrapped__(desc)),
+        ("cached", lambda: sub_old_ansi(desc)),
+    ):
+        elapsed = Timer(func).timeit(number=number)
+        print("%s: %.0f translations/s" % (name, number / elapsed))
+
+
+def set_sheet_values(character, number=100):
+    """
+    Compares the queries and time taken to set a handful of sheet values on a
+    character, like @chargen or @set does, with and without a batch.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    item_data = character.item_data
+
+    def set_values():
+        item_data.age = 25
+        item_data.concept = "Pirate"
+        item_data.family = "Grayson"
+        item_data.vocation = "Sailor"
+        item_data.social_rank = 8
+
+    def set_values_in_batch():
+        with item_data.batch():
+            set_values()
+
+    for name, func in (("unbatched", set_values), ("batched", set_values_in_batch)):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        elapsed = Timer(func).timeit(number=number)
+        print(
+            "%s: %s queries, %.0f edits/s"
+            % (name, len(queries.captured_queries), number / elapsed)
+        )
+
+
+def pick_weighted(options=50, number=10000):
+    """
+    Compares building a WeightedPicker for every pick, as callers used to, with
+    picking from a PreparedDistribution built once.
+    """
+    from server.utils.picker import WeightedPicker
+
+    choices = [(option, option % 7 + 1) for option in range(options)]
+
+    def build_and_pick():
+        picker = WeightedPicker()
+        for option, weight in choices:
+            picker.add_option(option, weight)
+        return picker.pick()
+
+    picker = WeightedPicker()
+    for option, weight in choices:
+        picker.add_option(option, weight)
+    distribution = picker.prepare()
+    for name, func in (
+        ("rebuilt picker", build_and_pick),
+        ("prepared", distribution.pick),
+        ("prepared pick_many", lambda: distribution.pick_many(number)),
+    ):
+        elapsed = Timer(func).timeit(number=1 if name.endswith("many") else number)
+        print("%s: %.0f picks/s" % (name, number / elapsed))
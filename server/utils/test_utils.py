@@ -74,7 +74,15 @@ class ArxTestConfigMixin(object):
         """Run for each testcase"""
         super(ArxTestConfigMixin, self).setUp()
         from web.character.models import Roster
+        from world.dominion.grandeur import GRANDEUR_GRAPH
+        from world.dominion.prestige import invalidate_rankings
+        from server.utils.counters import COUNTERS
+        from typeclasses.presence import PRESENCE
+        from typeclasses.room_graph import ROOM_GRAPH
+        from typeclasses.scripts.event_manager import clear_event_manager_cache
+        from web.character.clue_index import CLUE_INDEX
         from world.traits.models import Trait
+        from world.weather.models import WeatherEmit
 
         self.active_roster = Roster.objects.create(name="Active")
         self.setup_aliases()
@@ -88,6 +96,14 @@ class ArxTestConfigMixin(object):
         NaturalRollType._cache_set = False
         CheckRank._cache_set = False
         DifficultyTable._cache_set = False
+        invalidate_rankings()
+        GRANDEUR_GRAPH.invalidate()
+        clear_event_manager_cache()
+        COUNTERS.clear()
+        ROOM_GRAPH.invalidate()
+        PRESENCE.invalidate()
+        WeatherEmit.clear_distributions()
+        CLUE_INDEX.invalidate()
 
     def setup_arx_characters(self):
         """
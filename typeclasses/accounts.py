@@ -22,7 +22,9 @@ several more options for customizing the Guest account system.
 
 """
 from evennia import DefaultAccount
+from server.utils.session_log import SessionLog
 from typeclasses.mixins import MsgMixins, InformMixin
+from typeclasses.presence import PRESENCE
 from web.character.models import PlayerSiteEntry
 
 
@@ -175,7 +177,7 @@ class Account(InformMixin, MsgMixins, DefaultAccount):
                     pass
             watched_by = self.char_ob.db.watched_by or []
             if self.sessions.count() == 1:
-                if not self.db.hide_from_watch:
+                if not PRESENCE.is_hidden(self):
                     for watcher in watched_by:
                         watcher.msg(
                             "{wA player you are watching, {c%s{w, has connected.{n"
@@ -440,7 +442,7 @@ class Account(InformMixin, MsgMixins, DefaultAccount):
         """After disconnection is complete, delete NAttributes."""
         if not self.sessions.all():
             watched_by = self.char_ob and self.char_ob.db.watched_by or []
-            if watched_by and not self.db.hide_from_watch:
+            if watched_by and not PRESENCE.is_hidden(self):
                 for watcher in watched_by:
                     watcher.msg(
                         "{wA player you are watching, {c%s{w, has disconnected.{n"
@@ -466,46 +468,38 @@ class Account(InformMixin, MsgMixins, DefaultAccount):
         if not self.tags.get("private_mode"):
             text = text.strip()
             from_obj = make_iter(from_obj)[0]
-            tup = (from_obj, text)
-            if (
-                tup not in self.current_log
-                and from_obj != self
-                and from_obj != self.char_ob
-            ):
-                self.current_log.append((from_obj, text))
+            if from_obj != self and from_obj != self.char_ob:
+                # the log ignores lines it already has
+                self.current_log.add(from_obj, text)
 
     @property
     def current_log(self):
         """Temporary messages for this session"""
         if self.ndb.current_log is None:
-            self.ndb.current_log = []
+            self.ndb.current_log = SessionLog()
         return self.ndb.current_log
 
     @current_log.setter
     def current_log(self, val):
-        self.ndb.current_log = val
+        self.ndb.current_log = SessionLog(val)
 
     @property
     def previous_log(self):
         """Log of our past session"""
-        if self.db.previous_log is None:
-            self.db.previous_log = []
-        return self.db.previous_log
+        return SessionLog.from_data(self.db.previous_log)
 
     @previous_log.setter
     def previous_log(self, val):
-        self.db.previous_log = val
+        self.db.previous_log = SessionLog(val).to_data()
 
     @property
     def flagged_log(self):
         """Messages flagged for GM notice"""
-        if self.db.flagged_log is None:
-            self.db.flagged_log = []
-        return self.db.flagged_log
+        return SessionLog.from_data(self.db.flagged_log)
 
     @flagged_log.setter
     def flagged_log(self, val):
-        self.db.flagged_log = val
+        self.db.flagged_log = SessionLog(val).to_data()
 
     def report_player(self, player):
         """Reports a player for GM attention"""
@@ -0,0 +1,207 @@
+"""
+Fan-out of room messages to their listeners.
+
+ArxRoom.msg_contents opens a RoomBroadcast for the duration of a message, and
+each listener's MsgMixins.msg finds it with RoomBroadcast.current(). The work
+that is the same for every listener, like substituting old ansi codes, checking
+whether the room is private, and applying a given set of pose colors, is then
+done once per broadcast rather than once per listener.
+
+What a listener wants done to their messages (posebreaks, name and quote colors,
+extra newlines, stripping ascii art) is kept in a MsgPreferences snapshot in
+their ndb, so we don't read their Attributes and Tags for every line of RP. Code
+that changes one of those settings should call MsgPreferences.invalidate on the
+object it changed. Snapshots are also dropped whenever a Tag is added to or
+removed from their object, and every snapshot is made again whenever one of the
+Attributes they read is written, such as by @set.
+"""
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from evennia.accounts.models import AccountDB
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+
+from server.utils.arx_utils import sub_old_ansi
+
+
+class MsgPreferences(object):
+    """Snapshot of how an object wants the messages it receives formatted"""
+
+    __slots__ = (
+        "posebreak",
+        "name_color",
+        "quote_color",
+        "newline",
+        "no_ascii",
+        "generation",
+    )
+    # the Attributes we read
+    ATTRIBUTE_KEYS = ("posebreak", "name_color", "pose_quote_color")
+    # bumped whenever one of our Attributes is written, making every snapshot stale
+    current_generation = 0
+
+    def __init__(self, obj):
+        self.generation = MsgPreferences.current_generation
+        self.posebreak = bool(obj.db.posebreak)
+        self.name_color = obj.db.name_color
+        self.quote_color = obj.db.pose_quote_color
+        try:
+            if obj.char_ob:
+                self.newline = bool(obj.tags.get("newline_on_messages"))
+            else:
+                self.newline = bool(obj.player_ob.tags.get("newline_on_messages"))
+        except AttributeError:
+            self.newline = False
+        player_ob = obj.player_ob or obj
+        self.no_ascii = "no_ascii" in player_ob.tags.all()
+
+    @classmethod
+    def get(cls, obj) -> "MsgPreferences":
+        """Returns the cached snapshot for obj, creating it if needed"""
+        prefs = obj.ndb.msg_preferences
+        if prefs is None or prefs.generation != cls.current_generation:
+            prefs = cls(obj)
+            obj.ndb.msg_preferences = prefs
+        return prefs
+
+    @staticmethod
+    def invalidate(obj):
+        """
+        Drops the snapshot for obj, along with the one for its account or
+        character, since each reads some of its settings from the other.
+        """
+        for ob in (obj, getattr(obj, "char_ob", None), getattr(obj, "player_ob", None)):
+            if ob:
+                ob.ndb.msg_preferences = None
+
+    @classmethod
+    def invalidate_all(cls):
+        """Makes every snapshot stale, so each is made again when next used"""
+        cls.current_generation += 1
+
+    @property
+    def pose_key(self):
+        """The preferences that change how a pose is formatted"""
+        return self.posebreak, self.name_color, self.quote_color
+
+
+def forget_msg_preferences(sender, instance, **kwargs):
+    """Makes every snapshot stale when an Attribute they read is written"""
+    if instance.db_key in MsgPreferences.ATTRIBUTE_KEYS:
+        MsgPreferences.invalidate_all()
+
+
+def forget_tagged_msg_preferences(sender, instance, action, reverse, **kwargs):
+    """Drops the snapshot of an object or account when its Tags change"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # a Tag was changed from its own side, so we don't know whose it was
+        MsgPreferences.invalidate_all()
+    else:
+        MsgPreferences.invalidate(instance)
+
+
+post_save.connect(forget_msg_preferences, sender=Attribute)
+post_delete.connect(forget_msg_preferences, sender=Attribute)
+m2m_changed.connect(forget_tagged_msg_preferences, sender=ObjectDB.db_tags.through)
+m2m_changed.connect(forget_tagged_msg_preferences, sender=AccountDB.db_tags.through)
+
+
+def format_pose(text, key, prefs, namex, quote_regex):
+    """
+    Applies a receiver's posebreak, name color and quote color to a pose.
+
+        Args:
+            text (str): The pose
+            key (str): The receiver's name
+            prefs (MsgPreferences): The receiver's preferences
+            namex: Regex that finds the receiver's colored name inside quotes
+            quote_regex: Regex that finds quotes
+
+        Returns:
+            The formatted pose.
+    """
+    if prefs.posebreak:
+        text = "\n" + text
+    name_color = prefs.name_color
+    if name_color:
+        text = text.replace(key, name_color + key + "{n")
+    quote_color = prefs.quote_color
+    # colorize people's quotes with the given text
+    if quote_color:
+        text = quote_regex.sub(r'%s"\1"{n' % quote_color, text)
+        if name_color:
+            # counts the instances of name replacement inside quotes and recolorizes
+            for _ in range(0, text.count("%s{n" % key)):
+                text = namex.sub(r'"\1%s%s\2"' % (key, quote_color), text)
+    return text
+
+
+class RoomBroadcast(object):
+    """
+    The parts of a room message shared by all its listeners. Results are
+    memoized by text, so a message with a mapping that formats differently for
+    some listeners still works: each distinct text is only worked out once.
+    """
+
+    _active = []
+
+    def __init__(self, room):
+        self.room = room
+        self._private = None
+        self._subbed = {}
+        self._poses = {}
+        self._stripped = {}
+
+    @classmethod
+    def current(cls):
+        """Returns the broadcast being sent right now, if any"""
+        if cls._active:
+            return cls._active[-1]
+
+    @classmethod
+    @contextmanager
+    def sending(cls, room):
+        """Makes a broadcast for room current while its message is sent"""
+        broadcast = cls(room)
+        cls._active.append(broadcast)
+        try:
+            yield broadcast
+        finally:
+            cls._active.pop()
+
+    @property
+    def private(self):
+        """Whether the room is private, so its messages shouldn't be logged"""
+        if self._private is None:
+            self._private = bool(self.room.tags.get("private"))
+        return self._private
+
+    def sub_old_ansi(self, text):
+        try:
+            return self._subbed[text]
+        except KeyError:
+            subbed = self._subbed[text] = sub_old_ansi(text)
+            return subbed
+
+    def format_pose(self, text, key, prefs, namex, quote_regex):
+        """Formats a pose, sharing the result with listeners who format it the same"""
+        pose_key = prefs.pose_key
+        # only name colors make the result depend on who we are
+        cache_key = (text, pose_key, key if prefs.name_color else None)
+        try:
+            return self._poses[cache_key]
+        except KeyError:
+            pose = format_pose(text, key, prefs, namex, quote_regex)
+            self._poses[cache_key] = pose
+            return pose
+
+    def strip_ascii(self, text, no_ascii, strip_function):
+        try:
+            return self._stripped[(text, no_ascii)]
+        except KeyError:
+            stripped = strip_function(text, no_ascii)
+            self._stripped[(text, no_ascii)] = stripped
+            return stripped
@@ -3,6 +3,8 @@ Default Typeclass for Bulletin Boards, based loosely on bboards.
 
 See objects.objects for more information on Typeclassing.
 """
+from collections import Counter
+
 from server.utils.arx_utils import get_full_url
 from typeclasses.objects import Object
 from world.msgs.models import Post
@@ -53,15 +55,15 @@ class BBoard(Object):
         if event:
             event.tag_obj(post)
         self.receiver_object_set.add(post)
-        if self.max_posts and self.posts.count() > self.max_posts:
+        self.invalidate_post_index()
+        if self.max_posts and self.get_post_count() > self.max_posts:
             posts = self.posts.exclude(db_tags__db_key="sticky_post")
             if "archive_posts" in self.tags.all():
                 self.archive_post(posts.first())
             else:
-                posts.first().delete()
-            self.flush_unread_cache()
+                self.delete_post(posts.first())
         if announce:
-            post_num = self.posts.count()
+            post_num = self.get_post_count()
             from django.urls import reverse
 
             post_url = get_full_url(
@@ -181,17 +183,50 @@ class BBoard(Object):
         self.num_unread_cache[pobj] = num_unread
         return num_unread
 
+    def get_post_ids(self, old=False):
+        """
+        Returns the IDs of our posts in the order they're numbered, which we
+        keep until a post is added, removed or archived.
+
+            Args:
+                old (bool): Whether we want our archived posts instead
+
+            Returns:
+                A tuple of post IDs, and a dict of each ID to its post number.
+        """
+        index = self.ndb.post_index
+        if index is None:
+            index = self.ndb.post_index = {}
+        if old not in index:
+            posts = self.archived_posts if old else self.posts
+            post_ids = tuple(posts.values_list("id", flat=True))
+            numbers = {post_id: num for num, post_id in enumerate(post_ids, start=1)}
+            index[old] = (post_ids, numbers)
+        return index[old]
+
+    def invalidate_post_index(self):
+        self.ndb.post_index = None
+
+    def get_post_count(self, old=False):
+        return len(self.get_post_ids(old)[0])
+
+    def get_post_number(self, post, old=False):
+        """Returns the number of a post on this board, or None if it isn't here"""
+        return self.get_post_ids(old)[1].get(post.id)
+
     def get_post(self, pobj, postnum, old=False):
         # pobj is a player.
         postnum -= 1
-        if old:
-            posts = self.archived_posts
-        else:
-            posts = self.posts
-        if (postnum < 0) or (postnum >= len(posts)):
+        post_ids = self.get_post_ids(old)[0]
+        if (postnum < 0) or (postnum >= len(post_ids)):
             pobj.msg("Invalid message number specified.")
-        else:
-            return list(posts)[postnum]
+            return
+        try:
+            return Post.objects.get(id=post_ids[postnum])
+        except Post.DoesNotExist:
+            # deleted without going through us, so our numbers are out of date
+            self.invalidate_post_index()
+            return self.get_post(pobj, postnum + 1, old)
 
     def get_latest_post(self):
         try:
@@ -237,13 +272,14 @@ class BBoard(Object):
         Remove post if it's inside the bulletin board.
         """
         retval = False
-        if post in self.posts:
+        if self.get_post_number(post):
+            self.remove_from_unread_cache(post)
             post.delete()
             retval = True
-        if post in self.archived_posts:
+        elif self.get_post_number(post, old=True):
             post.delete()
             retval = True
-        self.flush_unread_cache()
+        self.invalidate_post_index()
         return retval
 
     @staticmethod
@@ -272,16 +308,12 @@ class BBoard(Object):
         """
         Helper function to read a single post.
         """
-        if old:
-            posts = self.archived_posts
-        else:
-            posts = self.posts
         # format post
         sender = self.get_poster(post)
         message = "\n{w" + "-" * 60 + "{n\n"
         message += "{wBoard:{n %s, {wPost Number:{n %s\n" % (
             self.key,
-            list(posts).index(post) + 1,
+            self.get_post_number(post, old),
         )
         message += "{wPoster:{n %s\n" % sender
         message += "{wSubject:{n %s\n" % post.db_header
@@ -295,43 +327,86 @@ class BBoard(Object):
         # mark it read
         self.mark_read(caller, post)
 
-    @staticmethod
-    def archive_post(post):
+    def archive_post(self, post):
+        self.remove_from_unread_cache(post)
         post.tags.add("archived")
+        self.invalidate_post_index()
         return True
 
-    @staticmethod
-    def mark_unarchived(post):
+    def mark_unarchived(self, post):
         post.tags.remove("archived")
+        self.invalidate_post_index()
+        self.flush_unread_cache()
 
-    def mark_read_if_cache(self, caller):
-        num_unread = self.num_unread_cache.get(caller, -1)
-        if num_unread > 0:
-            num_unread = num_unread - 1
-        else:
-            # We didn't have a cache and we'll already be marked read,
-            # just take the value directly
-            num_unread = self.get_unread_posts(caller, old=False).count()
-
-        self.num_unread_cache[caller] = num_unread
-
-    def mark_read(self, caller, post):
-        if not post.db_receivers_accounts.filter(id=caller.id).exists():
-            # Mark our post read
-            post.db_receivers_accounts.add(caller)
-            self.mark_read_if_cache(caller)
-
+    @staticmethod
+    def get_readers(caller):
+        """Returns caller and, if they've set bbaltread, their alts"""
+        readers = [caller]
         if caller.db.bbaltread:
             try:
-                for alt in (ob.player for ob in caller.roster.alts):
-                    # Let's check this first, so we don't erroneously subtract
-                    # from the cache a second time.
-                    if not post.db_receivers_accounts.filter(id=alt.id).exists():
-                        post.db_receivers_accounts.add(alt)
-                        self.mark_read_if_cache(alt)
-
+                readers.extend(ob.player for ob in caller.roster.alts)
             except AttributeError:
                 pass
+        return readers
+
+    def mark_read(self, caller, post):
+        """Marks a post read by caller, and their alts if they've set bbaltread"""
+        self.mark_posts_read(caller, [post])
+
+    def mark_posts_read(self, caller, posts):
+        """
+        Marks posts read by caller, and their alts if they've set bbaltread,
+        with one query to find what they've already read and one to save the rest.
+        Every way of reading posts goes through here. Read state stays in the
+        receivers of each post, since unread posts are found by excluding
+        readers in queries, which a per-account bitmap couldn't be used for.
+        """
+        posts = list(posts)
+        if not posts:
+            return
+        readers = self.get_readers(caller)
+        ReadPostModel = Post.db_receivers_accounts.through
+        already_read = set(
+            ReadPostModel.objects.filter(
+                msg__in=posts, accountdb__in=readers
+            ).values_list("msg_id", "accountdb_id")
+        )
+        new_reads = [
+            ReadPostModel(accountdb=reader, msg=post)
+            for reader in readers
+            for post in posts
+            if (post.id, reader.id) not in already_read
+        ]
+        ReadPostModel.objects.bulk_create(new_reads)
+        # only posts that aren't archived are in our unread counts
+        numbers = self.get_post_ids()[1]
+        num_read = Counter(ob.accountdb for ob in new_reads if ob.msg_id in numbers)
+        for reader, num in num_read.items():
+            if reader in self.num_unread_cache:
+                self.num_unread_cache[reader] = max(
+                    self.num_unread_cache[reader] - num, 0
+                )
+
+    def read_unread_posts(self, caller):
+        """
+        Returns the posts on the board that caller hasn't read, and marks them
+        all read by caller and their alts, as reading them on the web does.
+        """
+        posts = list(
+            Post.objects.all_unread_by(caller).filter(db_receivers_objects=self)
+        )
+        self.mark_posts_read(caller, posts)
+        # they've read everything, so clear out their unread counts
+        for reader in self.get_readers(caller):
+            self.zero_unread_cache(reader)
+        return posts
+
+    def mark_all_read(self, caller, old=False):
+        """Marks every post on the board read by caller and their alts"""
+        self.mark_posts_read(caller, self.get_all_posts(old))
+        if not old:
+            for reader in self.get_readers(caller):
+                self.zero_unread_cache(reader)
 
     @property
     def num_unread_cache(self):
@@ -350,6 +425,15 @@ class BBoard(Object):
     def flush_unread_cache(self):
         self.ndb.num_unread_cache = {}
 
+    def remove_from_unread_cache(self, post):
+        """Lowers the unread counts of those who hadn't read a post we're removing"""
+        if not self.num_unread_cache:
+            return
+        readers = set(post.db_receivers_accounts.values_list("id", flat=True))
+        for account, num_unread in self.num_unread_cache.items():
+            if account.id not in readers and num_unread > 0:
+                self.num_unread_cache[account] = num_unread - 1
+
     @staticmethod
     def get_poster(post):
         return post.poster_name
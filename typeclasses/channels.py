@@ -82,10 +82,22 @@ class Channel(DefaultChannel):
             self.ndb.mute_list = list(self.db.mute_list or [])
         return self.ndb.mute_list
 
+    @property
+    def mute_set(self):
+        """Our muted subscribers as a set, for checking each receiver of a message"""
+        if self.ndb.mute_set is None:
+            self.ndb.mute_set = set(self.mutelist)
+        return self.ndb.mute_set
+
+    def invalidate_mute_cache(self):
+        self.ndb.mute_list = None
+        self.ndb.mute_set = None
+
     @property
     def non_muted_subs(self):
         subs = self.subscriptions.all()
-        listening = [ob for ob in subs if ob.is_connected and ob not in self.mutelist]
+        muted = self.mute_set
+        listening = [ob for ob in subs if ob.is_connected and ob not in muted]
         return listening
 
     @staticmethod
@@ -145,8 +157,7 @@ class Channel(DefaultChannel):
         if subscriber not in mutelist:
             mutelist.append(subscriber)
             self.db.mute_list = mutelist
-            # invalidate cache
-            self.ndb.mute_list = None
+            self.invalidate_mute_cache()
             return True
 
     def unmute(self, subscriber):
@@ -159,13 +170,20 @@ class Channel(DefaultChannel):
         if subscriber in mutelist:
             mutelist.remove(subscriber)
             self.db.mute_list = mutelist
-            # invalidate cache
-            self.ndb.mute_list = None
+            self.invalidate_mute_cache()
             return True
 
     def clear_mute(self):
         self.db.mute_list = []
-        self.ndb.mute_list = None
+        self.invalidate_mute_cache()
+
+    def post_join_channel(self, joiner, **kwargs):
+        super().post_join_channel(joiner, **kwargs)
+        self.invalidate_mention_index()
+
+    def post_leave_channel(self, leaver, **kwargs):
+        super().post_leave_channel(leaver, **kwargs)
+        self.invalidate_mention_index()
 
     def delete_chan_message(self, message):
         """
@@ -224,41 +242,75 @@ class Channel(DefaultChannel):
         """
         self.msg(message, senders=senders, header=header, keep_log=False)
 
-    def __word_contains_mention(self, word, mentions):
-        word = word.lower()
-        for mention in mentions:
-            if word.startswith(mention.lower()) and all(
-                c in string.punctuation for c in word[len(mention) :]
-            ):
-                return mention
-        return None
-
-    def __format_mentions(self, message, names):
+    @property
+    def mention_index(self):
+        """
+        The lowercase character names of our subscribers, mapped to the name
+        and the subscriber. Built once and rebuilt when someone joins or leaves
+        the channel, or a subscriber's character is renamed.
         """
-        Looks through a message for words starting with '@' and
-        mentioning a user's name. Highlights them if found.
+        index = self.ndb.mention_index
+        if index is None:
+            index = {}
+            for sub in self.subscriptions.all():
+                char = sub.char_ob
+                if char:
+                    index.setdefault(char.key.lower(), (char.key, sub))
+            self.ndb.mention_index = index
+        return index
+
+    def invalidate_mention_index(self):
+        self.ndb.mention_index = None
+
+    def get_mention_words(self, message):
+        """
+        Finds the words of a message that start with '@' and mention someone,
+        so that each formatted version of the message doesn't search it again.
+
+            Returns:
+                A list with a tuple for each such word of (text to replace,
+                mention) for one of our general mentions like 'Everyone', and
+                (text to replace, name, subscriber) for a subscriber's name.
+                Either can be None.
         """
         if "@" not in message:
-            return message
-        mentions = [
-            mention
-            for mention in self.mentions + names
-            if mention.lower() in message.lower()
-        ]
-        if not mentions:
-            return message
-
-        words = message.split()
-        for word in words:
+            return []
+        general = {mention.lower(): mention for mention in self.mentions}
+        index = self.mention_index
+        found = []
+        for word in message.split():
             if not word.startswith("@"):
                 continue
             start_length = len(word) - len(word.lstrip("@"))
-            mention = self.__word_contains_mention(word[start_length:], mentions)
-            if not mention:
+            lowered = word[start_length:].lower()
+            # a mention can be followed by punctuation, like '@Everyone!'
+            end = len(lowered.rstrip(string.punctuation))
+            general_mention = named = None
+            for length in range(max(end, 1), len(lowered) + 1):
+                candidate = lowered[:length]
+                prefix = word[: start_length + length]
+                if not general_mention and candidate in general:
+                    general_mention = (prefix, general[candidate])
+                if not named and candidate in index:
+                    named = (prefix,) + index[candidate]
+            if general_mention or named:
+                found.append((general_mention, named))
+        return found
+
+    @staticmethod
+    def format_mentions(message, mention_words, highlighted_subs):
+        """
+        Highlights the mentions found by get_mention_words. Names are only
+        highlighted for subscribers in highlighted_subs.
+        """
+        for general_mention, named in mention_words:
+            if general_mention:
+                prefix, mention = general_mention
+            elif named and named[2] in highlighted_subs:
+                prefix, mention, _ = named
+            else:
                 continue
-            message = message.replace(
-                word[: start_length + len(mention)], f"{{c[{mention}]{{n"
-            )
+            message = message.replace(prefix, f"{{c[{mention}]{{n")
         return message
 
     def send_msg(self, message, reciever, senders):
@@ -266,7 +318,7 @@ class Channel(DefaultChannel):
         Sends a message to a particular reciever
         """
         # if the reciever is muted, we don't send them a message
-        if reciever in self.mutelist:
+        if reciever in self.mute_set:
             return
         try:
             # note our addition of the from_channel keyword here. This could be checked
@@ -284,15 +336,24 @@ class Channel(DefaultChannel):
             subs = self.subscriptions.online()
         else:
             subs = self.subscriptions.all()
-
+        subs = list(subs)
+        everyone = set(subs)
+        mention_words = self.get_mention_words(msgobj.message)
+        mentioned = {named[2] for _, named in mention_words if named}
+        # each distinct way of highlighting the message is only formatted once
+        formatted = {}
         for entity in subs:
             if entity in msgobj.senders or entity.player_ob.db.highlight_all_mentions:
-                names = [sub.char_ob.key for sub in subs if sub.char_ob]
+                profile, highlighted = "all", everyone
+            elif entity in mentioned:
+                profile, highlighted = entity, (entity,)
             else:
-                names = [entity.char_ob.key] if entity.char_ob else []
-            message = self.__format_mentions(msgobj.message, names)
-
-            self.send_msg(message, entity, msgobj.senders)
+                profile, highlighted = None, ()
+            if profile not in formatted:
+                formatted[profile] = self.format_mentions(
+                    msgobj.message, mention_words, highlighted
+                )
+            self.send_msg(formatted[profile], entity, msgobj.senders)
 
         if msgobj.keep_log:
             # log to file
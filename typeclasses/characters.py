@@ -11,7 +11,10 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
 from evennia.objects.objects import DefaultCharacter
 
+from server.utils.counters import COUNTERS
 from server.utils.exceptions import PayError
+from typeclasses.broadcast import MsgPreferences
+from typeclasses.presence import PRESENCE
 from typeclasses.mixins import MsgMixins, ObjectMixins
 from typeclasses.wearable.mixins import UseEquipmentMixins
 from world.msgs.messagehandler import MessageHandler
@@ -632,7 +635,7 @@ class Character(
         pc = self.player_ob
         if not pc:
             return
-        if not watchers or pc.db.hide_from_watch:
+        if not watchers or PRESENCE.is_hidden(pc):
             return
         for watcher in watchers:
             spam = watcher.ndb.journal_spam or []
@@ -748,17 +751,22 @@ class Character(
 
     def get_directions(self, room):
         """
-        Uses the ObjectDB manager and repeated related_set calls in order
-        to find the exit in the current room that directly points to it.
+        Finds the exit in the current room that starts the shortest route to
+        room with the room graph, avoiding rooms we've already traversed. If
+        there's no route, gives the rough heading from our coordinates instead.
         """
+        from typeclasses.room_graph import ROOM_GRAPH
+
         loc = self.location
         if not loc:
             return
+        exit_obj = ROOM_GRAPH.get_next_exit(loc, room, self.ndb.traversed)
+        if exit_obj:
+            return "{c" + str(exit_obj) + "{n"
         x_ori = loc.db.x_coord
         y_ori = loc.db.y_coord
         x_dest = room.db.x_coord
         y_dest = room.db.y_coord
-        check_exits = []
         try:
             x = x_dest - x_ori
             y = y_dest - y_ori
@@ -767,27 +775,10 @@ class Character(
                 dest += "north"
             if y < 0:
                 dest += "south"
-            check_exits.append(dest)
             if x > 0:
                 dest += "east"
-                check_exits.append("east")
             if x < 0:
                 dest += "west"
-                check_exits.append("west")
-            if abs(x) > abs(y):
-                check_exits.reverse()
-            # inserts the NE/SE/SW/NW direction at 0 to be highest priority
-            check_exits.insert(0, dest)
-            for dirname in check_exits:
-                if loc.locations_set.filter(db_key__iexact=dirname).exclude(
-                    db_destination__in=self.ndb.traversed or []
-                ):
-                    return "{c" + dirname + "{n"
-            dest = (
-                "{c"
-                + dest
-                + "{n roughly. Please use '{w@map{n' to determine an exact route"
-            )
         except (AttributeError, TypeError, ValueError):
             print("Error in using directions for rooms: %s, %s" % (loc.id, room.id))
             print(
@@ -796,45 +787,11 @@ class Character(
             )
             self.msg("Rooms not properly set up for @directions. Logging error.")
             return
-        # try to find it through traversal
-        base_query = "db_destination_id"
-        exit_name = []
-        iterations = 0
-        # anything beyond 10 squares becomes extremely lengthy
-        max_iter = 5
-        exit_ids = [ob.id for ob in loc.exits]
-        q_add = ""
-        from django.db.models import Q
-
-        exclude_ob = Q()
-
-        def get_new_exclude_ob():
-            """Helper function to build Q() objects to exclude"""
-            base_exclude_query = "db_tags__db_key"
-            other_exclude_query = {q_add + "db_destination_id": loc.id}
-            traversed_query = {
-                q_add + "db_destination_id__in": self.ndb.traversed or []
-            }
-            exclude_query = q_add + base_exclude_query
-            exclude_dict = {exclude_query: "secret"}
-            return Q(**exclude_dict) | Q(**other_exclude_query) | Q(**traversed_query)
-
-        while not exit_name and iterations < max_iter:
-            q_add = "db_destination__locations_set__" * iterations
-            query = q_add + base_query
-            filter_dict = {query: room.id}
-            exclude_ob |= get_new_exclude_ob()
-            q_ob = Q(Q(**filter_dict) & ~exclude_ob)
-            exit_name = (
-                loc.locations_set.distinct()
-                .filter(id__in=exit_ids)
-                .exclude(exclude_ob)
-                .filter(q_ob)
-            )
-            iterations += 1
-        if not exit_name:
-            return "{c" + dest + "{n"
-        return "{c" + str(exit_name[0]) + "{n"
+        return (
+            "{c"
+            + dest
+            + "{n roughly. Please use '{w@map{n' to determine an exact route"
+        )
 
     def at_pre_puppet(self, account, session=None, **kwargs):
         """
@@ -857,6 +814,9 @@ class Character(
         """
 
         super(Character, self).at_post_puppet()
+        # our account may have changed, and some of our settings come from it
+        MsgPreferences.invalidate(self)
+        PRESENCE.add_character(self)
         try:
             self.messages.messenger_notification(2, force=True)
         except (AttributeError, ValueError, TypeError):
@@ -882,7 +842,9 @@ class Character(
         :type player: Player
         :type session: Session
         """
+        MsgPreferences.invalidate(self)
         if not self.sessions.count():
+            PRESENCE.remove_character(self)
             # only remove this char from grid if no sessions control it anymore.
             if self.location:
 
@@ -947,15 +909,23 @@ class Character(
     @property
     def posecount(self):
         try:
-            return self.roster.pose_count
+            return COUNTERS.get(self.roster, "pose_count")
         except AttributeError:
             return 0
 
     @posecount.setter
     def posecount(self, val):
         try:
+            COUNTERS.discard(self.roster, "pose_count")
             self.roster.pose_count = val
-            self.roster.save()
+            self.roster.save(update_fields=["pose_count"])
+        except AttributeError:
+            pass
+
+    def increment_posecount(self, amount=1):
+        """Counts poses without saving our roster every time, see server.utils.counters"""
+        try:
+            COUNTERS.increment(self.roster, "pose_count", amount)
         except AttributeError:
             pass
 
@@ -970,7 +940,7 @@ class Character(
     def previous_posecount(self, val):
         try:
             self.roster.previous_pose_count = val
-            self.roster.save()
+            self.roster.save(update_fields=["previous_pose_count"])
         except AttributeError:
             pass
 
@@ -1262,7 +1232,7 @@ class Character(
             player = self.player_ob
         if not player:
             return False
-        if not player.db.hide_from_watch:
+        if not PRESENCE.is_hidden(player):
             return True
         if caller.check_permstring("builders"):
             return True
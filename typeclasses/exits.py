@@ -12,6 +12,7 @@ from evennia.commands import command, cmdset
 from world.exploration.models import ShardhavenLayoutExit, ShardhavenObstacle, Monster
 from server.utils.arx_utils import commafy, a_or_an
 from commands.mixins import RewardRPToolUseMixin
+from typeclasses.room_graph import ROOM_GRAPH
 
 
 class Exit(LockMixins, ObjectMixins, DefaultExit):
@@ -40,6 +41,14 @@ class Exit(LockMixins, ObjectMixins, DefaultExit):
                                         defined, in which case that will simply be echoed.
     """
 
+    def at_object_creation(self):
+        super().at_object_creation()
+        ROOM_GRAPH.update_exit(self)
+
+    def at_object_delete(self):
+        ROOM_GRAPH.remove_exit(self)
+        return super().at_object_delete()
+
     def can_traverse(self, character):
         if self.destination.check_banned(character):
             character.msg("You have been banned from entering there.")
@@ -332,7 +341,9 @@ class Exit(LockMixins, ObjectMixins, DefaultExit):
         reverse = self.reverse_exit
         if reverse:
             reverse.destination = new_room
+            ROOM_GRAPH.update_exit(reverse)
         self.location = new_room
+        ROOM_GRAPH.update_exit(self)
 
     def lock_exit(self, caller=None):
         """
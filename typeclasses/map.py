@@ -1,11 +1,15 @@
 """
 Maps.
 """
+from array import array
+
 from typeclasses.objects import Object
 
 _CALLER_ICON = "{gXX{n"
 _BLANK_SQUARE = "  "
 _DEST_ICON = "{rXX{n"
+# how many drawn maps we keep for each map before starting over
+MAX_RENDERED_MAPS = 200
 
 
 class Map(Object):
@@ -28,29 +32,83 @@ class Map(Object):
         self.locks.add("get:perm(Builders);delete:false()")
         self.at_init()
 
-    def get_icon(self, origin_room, x, y, destination=None):
-        room = self.db.rooms.get((x, y), None)
-        if not room:
-            return _BLANK_SQUARE
-        if room == origin_room:
-            return _CALLER_ICON
-        if destination and destination.db.x_coord == x and destination.db.y_coord == y:
-            return _DEST_ICON
-        return room.db.map_icon or _BLANK_SQUARE
+    @property
+    def grid(self):
+        """
+        Our rooms laid out as rows of squares from north to south, built once
+        from our Attributes rather than read from them for every square.
+
+            Returns:
+                A tuple of (bounds, room_ids, icons, squares), where bounds is
+                (min_x, max_x, min_y, max_y), room_ids is an array of the room
+                ID at each square or 0, icons the padded icon at each square,
+                and squares maps a room ID to the indexes of its squares.
+        """
+        grid = self.ndb.grid
+        if grid is None:
+            min_x, max_x = self.db.min_x, self.db.max_x
+            min_y, max_y = self.db.min_y, self.db.max_y
+            width = max_x - min_x + 1
+            size = width * (max_y - min_y + 1)
+            room_ids = array("l", [0]) * size
+            icons = [_BLANK_SQUARE] * size
+            squares = {}
+            for (x, y), room in self.db.rooms.items():
+                if not room or not (min_x <= x <= max_x and min_y <= y <= max_y):
+                    continue
+                index = (max_y - y) * width + x - min_x
+                room_ids[index] = room.id
+                icons[index] = pad_icon(room.db.map_icon or _BLANK_SQUARE)
+                squares.setdefault(room.id, []).append(index)
+            bounds = (min_x, max_x, min_y, max_y)
+            grid = self.ndb.grid = (bounds, room_ids, icons, squares)
+        return grid
+
+    def invalidate_grid(self):
+        """Forgets our grid and rendered maps, after a room is added or changed"""
+        self.ndb.grid = None
+        self.ndb.rendered_maps = None
 
     def draw_map(self, origin_room, destination=None):
-        map = ""
-        for y in range(self.db.max_y, self.db.min_y - 1, -1):
-            map += "\n"
-            for x in range(self.db.min_x, self.db.max_x + 1):
-                if x != self.db.min_x:
-                    map += "-"
-                # cap size of icon at 2 characters
-                icon = self.get_icon(origin_room, x, y, destination)
-                # if icon is only one character, add a space
-                if len(icon) < 2:
-                    icon += " "
-                map += icon
+        """
+        Returns the map with our origin and destination marked. Maps are
+        remembered for each origin and destination square, so drawing one again
+        just returns the string.
+        """
+        dest_coords = None
+        if destination:
+            dest_coords = (destination.db.x_coord, destination.db.y_coord)
+        key = (origin_room.id if origin_room else None, dest_coords)
+        rendered = self.ndb.rendered_maps
+        if rendered is None:
+            rendered = self.ndb.rendered_maps = {}
+        try:
+            return rendered[key]
+        except KeyError:
+            pass
+        (min_x, max_x, min_y, max_y), room_ids, icons, squares = self.grid
+        width = max_x - min_x + 1
+        icons = list(icons)
+        if dest_coords:
+            x, y = dest_coords
+            try:
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    index = (max_y - y) * width + x - min_x
+                    if room_ids[index]:
+                        icons[index] = _DEST_ICON
+            except TypeError:
+                # the destination has no coordinates
+                pass
+        # the origin is marked over the destination, if they share a square
+        for index in squares.get(key[0], ()):
+            icons[index] = _CALLER_ICON
+        map = "".join(
+            "\n" + "-".join(icons[start : start + width])
+            for start in range(0, len(icons), width)
+        )
+        if len(rendered) >= MAX_RENDERED_MAPS:
+            rendered.clear()
+        rendered[key] = map
         return map
 
     def add_room(self, room):
@@ -66,3 +124,16 @@ class Map(Object):
             self.db.min_y = y
         self.db.rooms[(x, y)] = room
         room.db.map = self
+        self.invalidate_grid()
+
+    def clear_square(self, x, y):
+        """Makes a square of the map a blank space"""
+        self.db.rooms[(x, y)] = None
+        self.invalidate_grid()
+
+
+def pad_icon(icon):
+    """Pads an icon that's only one character with a space"""
+    if len(icon) < 2:
+        icon += " "
+    return icon
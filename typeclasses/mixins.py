@@ -2,11 +2,13 @@ from decimal import Decimal
 
 from evennia_extensions.object_extensions.item_data_handler import ItemDataHandler
 from server.utils.arx_utils import sub_old_ansi, text_box, lowercase_kwargs
+from server.utils.session_log import SessionLog, POSE_HISTORY_CAPACITY
 import re
 from datetime import datetime
 from evennia.utils.utils import lazy_property
 from evennia.utils.ansi import parse_ansi
 
+from typeclasses.broadcast import MsgPreferences, RoomBroadcast, format_pose
 from typeclasses.exceptions import InvalidTargetError
 from world.conditions.triggerhandler import TriggerHandler
 from world.crafting.craft_data_handlers import CraftDataHandler
@@ -183,6 +185,13 @@ class NameMixins(object):
         self.key = uncolored_val
         self.ndb.cached_template_desc = None
         self.save()
+        # channels find mentions of their subscribers by our name
+        player = self.player_ob
+        if player:
+            from evennia.comms.models import ChannelDB
+
+            for channel in ChannelDB.objects.get_subscriptions(player):
+                channel.invalidate_mention_index()
 
     def __str__(self):
         return self.name
@@ -733,6 +742,17 @@ RE_ALT_ASCII = re.compile(r"<noascii>(.*?)</noascii>", re.IGNORECASE | re.DOTALL
 RE_COLOR = re.compile(r'"(.*?)"')
 
 
+def strip_ascii(text, no_ascii):
+    """Removes either the ascii or the non-ascii alternative within tags."""
+    if no_ascii:
+        text = RE_ASCII.sub("", text)
+        text = RE_ALT_ASCII.sub(r"\1", text)
+    else:
+        text = RE_ASCII.sub(r"\1", text)
+        text = RE_ALT_ASCII.sub("", text)
+    return text
+
+
 # noinspection PyUnresolvedReferences
 class MsgMixins(object):
     @lazy_property
@@ -764,7 +784,9 @@ class MsgMixins(object):
             pass
         if text.endswith("|"):
             text += "{n"
-        text = sub_old_ansi(text)
+        broadcast = RoomBroadcast.current()
+        text = broadcast.sub_old_ansi(text) if broadcast else sub_old_ansi(text)
+        prefs = MsgPreferences.get(self)
         if from_obj and isinstance(from_obj, dict):
             # somehow our from_obj had a dict passed to it. Fix it up.
             # noinspection PyBroadException
@@ -790,31 +812,24 @@ class MsgMixins(object):
             except AttributeError:
                 pass
         if options.get("is_pose", False):
-            if self.db.posebreak:
-                text = "\n" + text
-            name_color = self.db.name_color
-            if name_color:
-                text = text.replace(self.key, name_color + self.key + "{n")
-            quote_color = self.db.pose_quote_color
-            # colorize people's quotes with the given text
-            if quote_color:
-                text = RE_COLOR.sub(r'%s"\1"{n' % quote_color, text)
-                if name_color:
-                    # counts the instances of name replacement inside quotes and recolorizes
-                    for _ in range(0, text.count("%s{n" % self.key)):
-                        text = self.namex.sub(
-                            r'"\1%s%s\2"' % (self.key, quote_color), text
-                        )
+            if broadcast:
+                text = broadcast.format_pose(
+                    text, self.key, prefs, self.namex, RE_COLOR
+                )
+            else:
+                text = format_pose(text, self.key, prefs, self.namex, RE_COLOR)
             if self.ndb.pose_history is None:
-                self.ndb.pose_history = []
+                self.ndb.pose_history = SessionLog(
+                    capacity=POSE_HISTORY_CAPACITY, dedupe=False
+                )
             if from_obj == self:
-                self.ndb.pose_history = []
+                self.ndb.pose_history.clear()
             else:
                 try:
                     origin = from_obj
                     if not from_obj and options.get("is_magic", False):
                         origin = "Magic System"
-                    self.ndb.pose_history.append((str(origin), text))
+                    self.ndb.pose_history.add(str(origin), text)
                 except AttributeError:
                     pass
         if options.get("box", False):
@@ -827,23 +842,14 @@ class MsgMixins(object):
                 text = text[1:]
             text = "{w<" + self.magic_word + "> |n" + text
             if options.get("is_pose"):
-                if self.db.posebreak:
+                if prefs.posebreak:
                     text = "\n" + text
         try:
-            if self.char_ob:
-                msg_sep = self.tags.get("newline_on_messages")
-                player_ob = self
-            else:
-                msg_sep = self.player_ob.tags.get("newline_on_messages")
-                player_ob = self.player_ob
+            player_ob = self if self.char_ob else self.player_ob
         except AttributeError:
-            msg_sep = None
             player_ob = self
-        try:
-            if msg_sep:
-                text += "\n"
-        except (TypeError, ValueError):
-            pass
+        if prefs.newline:
+            text += "\n"
         try:
             if from_obj and (
                 options.get("is_pose", False) or options.get("log_msg", False)
@@ -854,25 +860,23 @@ class MsgMixins(object):
                     and hasattr(from_obj, "location")
                     and self.location == from_obj.location
                 ):
-                    if self.location.tags.get("private"):
+                    if broadcast and broadcast.room == self.location:
+                        private_msg = broadcast.private
+                    elif self.location.tags.get("private"):
                         private_msg = True
                 if not private_msg:
                     player_ob.log_message(from_obj, text)
         except AttributeError:
             pass
-        text = self.strip_ascii_from_tags(text)
+        if broadcast:
+            text = broadcast.strip_ascii(text, prefs.no_ascii, strip_ascii)
+        else:
+            text = strip_ascii(text, prefs.no_ascii)
         super(MsgMixins, self).msg(text, from_obj, session, options, **kwargs)
 
     def strip_ascii_from_tags(self, text):
         """Removes ascii within tags for formatting."""
-        player_ob = self.player_ob or self
-        if "no_ascii" in player_ob.tags.all():
-            text = RE_ASCII.sub("", text)
-            text = RE_ALT_ASCII.sub(r"\1", text)
-        else:
-            text = RE_ASCII.sub(r"\1", text)
-            text = RE_ALT_ASCII.sub("", text)
-        return text
+        return strip_ascii(text, MsgPreferences.get(self).no_ascii)
 
     def msg_location_or_contents(self, text=None, **kwargs):
         """A quick way to ensure a room message, no matter what it's called on. Requires rooms have null location."""
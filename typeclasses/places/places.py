@@ -138,7 +138,7 @@ class Place(Object):
             if ob not in exclude:
                 place_msg = self.build_tt_msg(from_obj, ob, message, is_ooc, msg_type)
                 ob.msg(place_msg, from_obj=from_obj, options=options)
-        from_obj.posecount += 1
+        from_obj.increment_posecount()
 
     def at_after_move(self, source_location, **kwargs):
         """If new location is not our wearer, remove."""
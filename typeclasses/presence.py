@@ -0,0 +1,125 @@
+"""
+Who is on the grid and where, for +where and who.
+
++where used to find the rooms of every Active character with a query joining
+rooms to their contents, then check the Attributes of everyone in each of
+them. PresenceIndex instead keeps the characters with accounts that are on the
+grid, loaded with one query and then kept up to date as characters enter and
+leave the grid when they're puppeted and unpuppeted. Which room each of them is
+in, whether they're disguised, and whether their room is private are checked
+when asked, from what's already in memory, so nothing needs to tell us when a
+character moves or changes their disguise. Whether an account hides from +watch
+is remembered here as well. It should be changed with set_hidden, but it's
+forgotten whenever a hide_from_watch Attribute is written, such as by @set.
+"""
+from datetime import datetime, timedelta
+
+from django.db.models.signals import post_delete, post_save
+from evennia.typeclasses.attributes import Attribute
+
+
+class PresenceIndex(object):
+    """The characters on the grid, and which of their accounts are hidden"""
+
+    # how long until we reload characters, to catch any moved on or off the grid
+    # without being puppeted, such as by staff
+    REFRESH_INTERVAL = timedelta(minutes=10)
+
+    def __init__(self):
+        self.last_load = None
+        self.characters = set()
+        self.hidden = {}
+
+    def load_characters(self):
+        """Loads every character with an account that's on the grid in one query"""
+        from typeclasses.characters import Character
+
+        self.characters = set(
+            Character.objects.filter(
+                db_location__isnull=False, db_account__isnull=False
+            )
+        )
+        self.last_load = datetime.now()
+
+    def ensure_loaded(self):
+        """Loads our characters if we don't have them or they're out of date"""
+        if (
+            not self.last_load
+            or datetime.now() - self.last_load >= self.REFRESH_INTERVAL
+        ):
+            self.load_characters()
+
+    def invalidate(self):
+        """Forgets everything, so that it's all loaded again when next used"""
+        self.last_load = None
+        self.characters = set()
+        self.hidden = {}
+
+    def add_character(self, character):
+        """Adds a character that was just puppeted"""
+        if self.last_load:
+            self.characters.add(character)
+
+    def remove_character(self, character):
+        """Removes a character that's left the grid"""
+        self.characters.discard(character)
+
+    def is_hidden(self, account):
+        """Whether an account is hidden from +watch, +where and who"""
+        if not account:
+            return False
+        try:
+            return self.hidden[account.id]
+        except KeyError:
+            hidden = self.hidden[account.id] = bool(account.db.hide_from_watch)
+            return hidden
+
+    def set_hidden(self, account, hide):
+        """Sets whether an account is hidden from +watch, +where and who"""
+        if hide:
+            account.db.hide_from_watch = True
+        else:
+            account.attributes.remove("hide_from_watch")
+        self.hidden[account.id] = bool(hide)
+
+    def forget_hidden(self):
+        """Forgets which accounts are hidden, so they're checked again"""
+        self.hidden = {}
+
+    def get_occupied_rooms(self, room_typeclass=None):
+        """
+        Returns the public rooms that characters with accounts are in.
+
+            Args:
+                room_typeclass: If given, only rooms of exactly this typeclass
+
+            Returns:
+                A dict of each room to a list of the characters in it.
+        """
+        self.ensure_loaded()
+        rooms = {}
+        excluded = {}
+        for char in self.characters:
+            room = char.location
+            if not room or not char.player:
+                continue
+            if room not in excluded:
+                excluded[room] = bool(room.tags.get("private")) or bool(
+                    room_typeclass and not room.is_typeclass(room_typeclass, exact=True)
+                )
+            if not excluded[room]:
+                rooms.setdefault(room, []).append(char)
+        return rooms
+
+
+PRESENCE = PresenceIndex()
+
+
+def forget_hidden_accounts(sender, instance, **kwargs):
+    """Forgets cached hidden flags when a hide_from_watch Attribute is written"""
+    if instance.db_key == "hide_from_watch":
+        PRESENCE.forget_hidden()
+
+
+post_save.connect(forget_hidden_accounts, sender=Attribute)
+post_delete.connect(forget_hidden_accounts, sender=Attribute)
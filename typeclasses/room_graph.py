@@ -0,0 +1,240 @@
+"""
+The exits between rooms, kept in memory so that @directions and waypoints can
+find a route without joining ObjectDB to itself once for every step.
+
+RoomGraph loads every exit's location and destination in one query, and
+answers route queries with a breadth-first search. Exits tagged 'secret' are
+never part of a route, nor are rooms the caller has already traversed. Routes
+we've found are remembered, along with the rest of the route from each room on
+it, so following a waypoint only searches once. Exits update the graph when
+they're created, deleted or relocated, when their location or destination is
+saved, such as by @link, and when they're tagged or untagged secret. It's also
+reloaded periodically to catch anything else.
+"""
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from django.db.models.signals import m2m_changed, post_save
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.tags import Tag
+
+
+class RoomGraph(object):
+    """
+    Exits keyed by the ID of the room they're in, along with the routes we've
+    found between rooms.
+    """
+
+    # how long until we reload exits, to catch changes made by builders
+    REFRESH_INTERVAL = timedelta(hours=1)
+    # how many routes we remember
+    MAX_ROUTES = 500
+
+    def __init__(self):
+        self.last_load = None
+        self.exits = {}
+        self.exit_locations = {}
+        self.secret_exits = set()
+        self.routes = OrderedDict()
+
+    def load_exits(self):
+        """Loads the location and destination of every exit in two queries"""
+        self.exits = {}
+        self.exit_locations = {}
+        self.routes = OrderedDict()
+        exits = ObjectDB.objects.filter(
+            db_location__isnull=False, db_destination__isnull=False
+        ).exclude(db_typeclass_path="typeclasses.exits.ShardhavenInstanceExit")
+        for exit_id, room_id, destination_id in exits.order_by("id").values_list(
+            "id", "db_location", "db_destination"
+        ):
+            self.add_edge(exit_id, room_id, destination_id)
+        self.secret_exits = set(
+            exits.filter(db_tags__db_key="secret").values_list("id", flat=True)
+        )
+        self.last_load = datetime.now()
+
+    def add_edge(self, exit_id, room_id, destination_id):
+        self.exits.setdefault(room_id, {})[exit_id] = destination_id
+        self.exit_locations[exit_id] = room_id
+
+    def remove_edge(self, exit_id):
+        room_id = self.exit_locations.pop(exit_id, None)
+        if room_id in self.exits:
+            self.exits[room_id].pop(exit_id, None)
+
+    def ensure_loaded(self):
+        """Loads our exits if we don't have them or they're out of date"""
+        if (
+            not self.last_load
+            or datetime.now() - self.last_load >= self.REFRESH_INTERVAL
+        ):
+            self.load_exits()
+
+    def invalidate(self):
+        """Forgets everything, so that exits are reloaded when next used"""
+        self.last_load = None
+        self.routes = OrderedDict()
+
+    def update_exit(self, exit_obj):
+        """
+        Updates an exit after it's created or moved, or its destination
+        changes. Does nothing if we haven't loaded yet.
+        """
+        if not self.last_load:
+            return
+        self.remove_edge(exit_obj.id)
+        self.secret_exits.discard(exit_obj.id)
+        if exit_obj.location and exit_obj.destination:
+            self.add_edge(exit_obj.id, exit_obj.location.id, exit_obj.destination.id)
+            if exit_obj.tags.get("secret"):
+                self.secret_exits.add(exit_obj.id)
+        self.routes = OrderedDict()
+
+    def set_secret(self, exit_id, secret):
+        """Updates whether an exit we know about is secret after it's tagged"""
+        if not self.last_load or exit_id not in self.exit_locations:
+            return
+        if secret:
+            self.secret_exits.add(exit_id)
+        else:
+            self.secret_exits.discard(exit_id)
+        self.routes = OrderedDict()
+
+    def remove_exit(self, exit_obj):
+        """Removes an exit that's being deleted"""
+        if not self.last_load:
+            return
+        self.remove_edge(exit_obj.id)
+        self.secret_exits.discard(exit_obj.id)
+        self.routes = OrderedDict()
+
+    def find_route(self, origin_id, destination_id, avoided):
+        """
+        Searches for the shortest route from one room to another.
+
+            Args:
+                origin_id (int): ID of the room we start in
+                destination_id (int): ID of the room we want to reach
+                avoided (frozenset): IDs of rooms the route can't pass through
+
+            Returns:
+                A list of (exit ID, room ID) for each step of the route, or None
+                if there's no route.
+        """
+        previous = {origin_id: None}
+        queue = deque([origin_id])
+        while queue:
+            room_id = queue.popleft()
+            for exit_id, next_id in self.exits.get(room_id, {}).items():
+                if (
+                    next_id in previous
+                    or next_id in avoided
+                    or exit_id in self.secret_exits
+                ):
+                    continue
+                previous[next_id] = (exit_id, room_id)
+                if next_id == destination_id:
+                    route = []
+                    while next_id != origin_id:
+                        exit_id, room_id = previous[next_id]
+                        route.append((exit_id, next_id))
+                        next_id = room_id
+                    route.reverse()
+                    return route
+                queue.append(next_id)
+
+    def remember_route(self, key, route):
+        self.routes[key] = route
+        self.routes.move_to_end(key)
+        while len(self.routes) > self.MAX_ROUTES:
+            self.routes.popitem(last=False)
+
+    def get_route(self, origin, destination, traversed=()):
+        """
+        Returns the shortest route between two rooms that doesn't pass through
+        any of the traversed rooms, or use a secret exit.
+
+            Args:
+                origin: The room we start in
+                destination: The room we want to reach
+                traversed: IDs of rooms that we've already passed through
+
+            Returns:
+                A tuple of (exit ID, room ID) for each step of the route, which is
+                empty if we're already there, or None if there's no route.
+        """
+        if origin == destination:
+            return ()
+        self.ensure_loaded()
+        avoided = frozenset(traversed or ()).difference([destination.id])
+        key = (origin.id, destination.id, avoided)
+        if key in self.routes:
+            self.routes.move_to_end(key)
+            return self.routes[key]
+        route = self.find_route(origin.id, destination.id, avoided)
+        if route is None:
+            self.remember_route(key, None)
+            return None
+        route = tuple(route)
+        self.remember_route(key, route)
+        # once we step into the next room, we'll be asked for the rest of the
+        # route with the room we left added to the traversed rooms
+        room_id = origin.id
+        for step, (_, next_id) in enumerate(route[:-1], start=1):
+            avoided = avoided.union([room_id])
+            self.remember_route((next_id, destination.id, avoided), route[step:])
+            room_id = next_id
+        return route
+
+    def get_next_exit(self, origin, destination, traversed=()):
+        """Returns the exit in origin that starts our route to destination, if any"""
+        route = self.get_route(origin, destination, traversed)
+        if not route:
+            return None
+        exit_id = route[0][0]
+        for exit_obj in origin.exits:
+            if exit_obj.id == exit_id:
+                return exit_obj
+        # the exit is gone without telling us, so load everything again
+        self.invalidate()
+
+
+ROOM_GRAPH = RoomGraph()
+
+
+def update_saved_exit(sender, instance, update_fields=None, **kwargs):
+    """Updates an exit when its location or destination is saved"""
+    if not ROOM_GRAPH.last_load or not isinstance(instance, ObjectDB):
+        return
+    if update_fields and not {"db_location", "db_destination"}.intersection(
+        update_fields
+    ):
+        return
+    if instance.db_destination_id or instance.id in ROOM_GRAPH.exit_locations:
+        ROOM_GRAPH.update_exit(instance)
+
+
+def update_secret_exits(sender, instance, action, reverse, pk_set, **kwargs):
+    """Updates secret exits when an exit is tagged or untagged secret"""
+    if not ROOM_GRAPH.last_load or action not in (
+        "post_add",
+        "post_remove",
+        "post_clear",
+    ):
+        return
+    if reverse:
+        # the exits were changed from the Tag's side
+        if instance.db_key == "secret":
+            ROOM_GRAPH.invalidate()
+        return
+    if instance.id not in ROOM_GRAPH.exit_locations:
+        return
+    if action == "post_clear":
+        ROOM_GRAPH.set_secret(instance.id, False)
+    elif Tag.objects.filter(id__in=pk_set, db_key="secret").exists():
+        ROOM_GRAPH.set_secret(instance.id, action == "post_add")
+
+
+post_save.connect(update_saved_exit)
+m2m_changed.connect(update_secret_exits, sender=ObjectDB.db_tags.through)
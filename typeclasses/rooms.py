@@ -27,6 +27,7 @@ from evennia.objects.models import ObjectDB
 
 from commands.base import ArxCommand
 from evennia_extensions.room_extensions.room_data_handler import RoomDataHandler
+from typeclasses.broadcast import RoomBroadcast
 from typeclasses.scripts import gametime
 from typeclasses.mixins import ObjectMixins
 from server.utils.arx_utils import list_to_string
@@ -364,9 +365,10 @@ class ArxRoom(ObjectMixins, DefaultRoom, MagicMixins):
         # if we have an event at this location, log messages
         if eventid:
             from evennia.scripts.models import ScriptDB
+            from typeclasses.scripts.event_manager import get_event_manager
 
             try:
-                event_script = ScriptDB.objects.get(db_key="Event Manager")
+                event_script = get_event_manager()
                 ooc = options.get("ooc_note", False)
                 if gm_only or ooc:
                     event_script.add_gmnote(eventid, message)
@@ -375,9 +377,14 @@ class ArxRoom(ObjectMixins, DefaultRoom, MagicMixins):
             except ScriptDB.DoesNotExist:
                 if from_obj:
                     from_obj.msg("Error: Event Manager not found.")
-        super(ArxRoom, self).msg_contents(
-            text=message, exclude=exclude, from_obj=from_obj, mapping=mapping, **kwargs
-        )
+        with RoomBroadcast.sending(self):
+            super(ArxRoom, self).msg_contents(
+                text=message,
+                exclude=exclude,
+                from_obj=from_obj,
+                mapping=mapping,
+                **kwargs,
+            )
 
     def ban_character(self, character):
         if character not in self.banlist:
@@ -2,6 +2,10 @@
 Script to handle timing for events in the game.
 """
 
+from collections import defaultdict
+from queue import Empty, Queue
+from threading import Thread
+
 from django.conf import settings
 from typeclasses.scripts.scripts import Script
 from world.dominion.models import RPEvent, PrestigeCategory
@@ -14,14 +18,102 @@ from server.utils.arx_utils import time_from_now, time_now
 LOGPATH = settings.LOG_DIR + "/rpevents/"
 GMPATH = LOGPATH + "gm_logs/"
 
+_EVENT_MANAGER = None
+
+
+def get_event_manager():
+    """
+    Returns the Event Manager script. Rooms with events look it up for every
+    message, so we hold onto it rather than querying for it each time.
+
+        Raises:
+            ScriptDB.DoesNotExist if there's no Event Manager.
+    """
+    global _EVENT_MANAGER
+    if _EVENT_MANAGER is None or not _EVENT_MANAGER.pk:
+        from evennia.scripts.models import ScriptDB
+
+        _EVENT_MANAGER = ScriptDB.objects.get(db_key="Event Manager")
+    return _EVENT_MANAGER
+
+
+def clear_event_manager_cache():
+    """Forgets our Event Manager, such as when the database it came from is gone"""
+    global _EVENT_MANAGER
+    _EVENT_MANAGER = None
+
+
+class EventLogWriter(object):
+    """
+    Appends lines to event logs from a background thread, so that a pose during
+    an event doesn't have to open, write and close a log file. Lines are queued,
+    and the writer takes every line that's waiting, groups them by file and opens
+    each file once per batch. The queue is bounded: if the writer falls that far
+    behind, callers wait for room rather than using ever more memory.
+    """
+
+    max_queued_lines = 10000
+    idle_timeout = 1
+
+    def __init__(self):
+        self.queue = Queue(maxsize=self.max_queued_lines)
+        self.thread = None
+
+    def write(self, path, text):
+        """Queues text to be appended to the file at path"""
+        if not self.thread or not self.thread.is_alive():
+            self.start()
+        self.queue.put((path, text))
+
+    def start(self):
+        self.thread = Thread(target=self.run, name="EventLogWriter", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.idle_timeout)]
+            except Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    @staticmethod
+    def write_batch(batch):
+        """Writes queued lines, keeping their order within each file"""
+        lines_by_path = defaultdict(list)
+        for path, text in batch:
+            lines_by_path[path].append(text)
+        for path, lines in lines_by_path.items():
+            # noinspection PyBroadException
+            try:
+                with open(path, "a+") as log:
+                    log.write("".join(lines))
+            except Exception:
+                traceback.print_exc()
+
+    def flush(self):
+        """Blocks until every queued line has been written"""
+        if self.thread and self.thread.is_alive():
+            self.queue.join()
+
+
+EVENT_LOG_WRITER = EventLogWriter()
+
 
 def delayed_start(event_id):
     # noinspection PyBroadException
     try:
         event = RPEvent.objects.get(id=event_id)
-        from evennia.scripts.models import ScriptDB
-
-        script = ScriptDB.objects.get(db_key="Event Manager")
+        script = get_event_manager()
         if event.id in script.db.cancelled:
             script.db.cancelled.remove(event.id)
             return
@@ -60,6 +152,7 @@ class EventManager(Script):
         then another announcement if it's starting under 10 minutes. If under 5
         minutes, we schedule it to start.
         """
+        self.save_idle_timers()
         idles = self.db.idle_events
         actives = self.db.active_events
         for eventid, counter in idles.items():
@@ -209,6 +302,9 @@ class EventManager(Script):
             self.db.active_events.remove(event.id)
         if event.id in self.db.idle_events:
             del self.db.idle_events[event.id]
+        self.posed_events.discard(event.id)
+        if self.ndb.attendees:
+            self.ndb.attendees.pop(event.id, None)
         self.do_awards(event)
         # noinspection PyBroadException
         self.delete_event_post(event)
@@ -221,26 +317,57 @@ class EventManager(Script):
         if event.id in self.db.active_events:
             new_location.start_event_logging(event)
 
+    @property
+    def posed_events(self):
+        """IDs of events that have had messages since we last saved idle timers"""
+        if self.ndb.posed_events is None:
+            self.ndb.posed_events = set()
+        return self.ndb.posed_events
+
+    def save_idle_timers(self):
+        """Resets the saved idle timers of events that have had messages"""
+        posed = self.posed_events
+        if not posed:
+            return
+        idles = self.db.idle_events
+        for eventid in posed:
+            if eventid in idles:
+                idles[eventid] = 0
+        self.db.idle_events = idles
+        posed.clear()
+
+    def get_attendees(self, eventid):
+        """Returns the set of IDs of dompcs who have attended an event"""
+        attendees = self.ndb.attendees
+        if attendees is None:
+            attendees = self.ndb.attendees = {}
+        if eventid not in attendees:
+            attendees[eventid] = set(
+                RPEvent.objects.get(id=eventid)
+                .dompcs.filter(event_participation__attended=True)
+                .values_list("id", flat=True)
+            )
+        return attendees[eventid]
+
     def add_msg(self, eventid, msg, sender=None):
-        # reset idle timer for event
-        self.db.idle_events[eventid] = 0
-        event = RPEvent.objects.get(id=eventid)
+        # reset idle timer for event. It's saved the next time we repeat.
+        self.posed_events.add(eventid)
         msg = parse_ansi(msg, strip_ansi=True)
         msg = "\n" + msg + "\n"
-        with open(self.get_log_path(eventid), "a+") as log:
-            log.write(msg)
+        EVENT_LOG_WRITER.write(self.get_log_path(eventid), msg)
         try:
             dompc = sender.player.Dominion
-            if dompc not in event.attended:
-                event.record_attendance(dompc)
         except AttributeError:
-            pass
+            return
+        attendees = self.get_attendees(eventid)
+        if dompc.id not in attendees:
+            RPEvent.objects.get(id=eventid).record_attendance(dompc)
+            attendees.add(dompc.id)
 
     def add_gmnote(self, eventid, msg):
         msg = parse_ansi(msg, strip_ansi=True)
         msg = "\n" + msg + "\n"
-        with open(self.get_gmlog_path(eventid), "a+") as log:
-            log.write(msg)
+        EVENT_LOG_WRITER.write(self.get_gmlog_path(eventid), msg)
 
     def add_gemit(self, msg):
         msg = parse_ansi(msg, strip_ansi=True)
@@ -1,10 +1,36 @@
 """
 Tests for scripts.
 """
+import os
+from tempfile import mkdtemp
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from evennia import create_script
 from server.utils.test_utils import ArxCommandTest
-from world.dominion.models import AccountTransaction, LIFESTYLES
-from typeclasses.scripts.weekly_events import WeeklyEvents
+from world.dominion.domain.models import (
+    Army,
+    Domain,
+    DomainProject,
+    MilitaryUnit,
+    Ruler,
+)
+from world.dominion.economy import WeeklyEconomy
+from world.dominion.models import AccountTransaction, LIFESTYLES, RPEvent
+from typeclasses.scripts.event_manager import (
+    EVENT_LOG_WRITER,
+    EventManager,
+    get_event_manager,
+)
+from typeclasses.scripts.weekly_events import (
+    BulkInformCreator,
+    MAX_STAGE_RETRIES,
+    WeeklyEvents,
+)
+from web.character.clue_index import CLUE_INDEX
+from web.character.investigation_resolver import InvestigationResolver
+from web.character.models import Clue, Investigation, RosterEntry
 
 
 class TestWeeklyEventScript(ArxCommandTest):
@@ -103,3 +129,260 @@ class TestWeeklyEventScript(ArxCommandTest):
         self.assertEqual(self.assetowner5.vault, pl5)  # Same because tran2 failed
         self.assert_tran_success(tran3, pl2 - tran1.weekly_amount, receiver_vault=None)
         self.assert_tran_success(tran4, pl4, pl3 + tran1.weekly_amount)
+
+    def test_apply_weekly_awards(self):
+        """Tests that tallied xp and resources are saved in bulk for characters."""
+        event = create_script(WeeklyEvents)
+        event.db.week = 1
+        event.initialize_temp_dicts()
+        self.char2.item_data.xp = 5
+        event.award_xp(self.char2, 4, self.account2, "Votes!", xptype="votes")
+        event.award_xp(self.char2, 3, self.account2, "Scenes!", xptype="scenes")
+        event.award_xp(self.char3, 2)
+        # nothing is saved until the awards are applied
+        self.assertEqual(self.char2.item_data.xp, 5)
+        event.apply_weekly_awards()
+        self.assertEqual(self.char2.item_data.xp, 12)
+        self.assertEqual(self.char3.item_data.xp, 2)
+        self.assertEqual(self.assetowner2.economic, 7)
+        self.assetowner2.refresh_from_db()
+        self.assertEqual(self.assetowner2.military, 7)
+        self.assertEqual(self.assetowner3.social, 0)
+
+    def test_reset_action_points(self):
+        """Tests weekly action point regeneration is capped and cache-safe."""
+        self.roster_entry2.action_points = 280
+        self.roster_entry2.save()
+        self.roster_entry3.action_points = 10
+        self.roster_entry3.save()
+        regen = self.roster_entry3.action_point_regen
+        WeeklyEvents.reset_action_points()
+        self.assertEqual(self.account2.roster.action_points, 300)
+        self.assertEqual(self.char3.roster.action_points, 10 + regen)
+        self.roster_entry3.refresh_from_db()
+        self.assertEqual(self.roster_entry3.action_points, 10 + regen)
+
+    def test_resume_weekly_events(self):
+        """Tests that an interrupted weekly update resumes from its checkpoint."""
+        event = create_script(WeeklyEvents)
+        event.db.week = 1
+        event.WEEKLY_STAGES = ("award_vote_xp", "apply_weekly_awards")
+        event.start_weekly_events()
+        event.ndb.recorded_votes[self.account2] = 3
+        self.assertTrue(event.process_weekly_stage())
+        self.assertEqual(event.current_weekly_stage, "apply_weekly_awards")
+        # simulate a reload wiping out our non-persistent tallies
+        event.nattributes.clear()
+        self.assertFalse(event.process_weekly_stage())
+        self.assertFalse(event.update_in_progress)
+        self.assertEqual(self.char2.item_data.xp, 6)
+        self.assertEqual(self.assetowner2.social, 6)
+        self.assertEqual(dict(event.db.xp_awarded), {self.char2: 6})
+
+    @patch("typeclasses.scripts.weekly_events.reactor")
+    @patch("typeclasses.scripts.weekly_events.inform_staff")
+    def test_failed_stage_retries(self, mock_inform_staff, mock_reactor):
+        """Tests a failed stage is retried from its checkpoint, then halted."""
+        event = create_script(WeeklyEvents)
+        event.db.week = 1
+        event.WEEKLY_STAGES = ("award_vote_xp", "apply_weekly_awards")
+        event.start_weekly_events()
+        event.ndb.recorded_votes[self.account2] = 3
+        self.assertTrue(event.process_weekly_stage())
+        xp = dict(event.ndb.xp)
+
+        def fail():
+            event.ndb.xp[self.char2] = 100
+            event.inform_creator.add_player_inform(self.account2, "Twice?", "Test")
+            raise ValueError("Stage failed")
+
+        with patch.object(event, "apply_weekly_awards", side_effect=fail):
+            event.run_weekly_slice()
+            self.assertEqual(dict(event.ndb.xp), xp)
+            self.assertFalse(event.inform_creator.informs)
+            self.assertEqual(event.db.weekly_stage_failures, 1)
+            for _ in range(MAX_STAGE_RETRIES):
+                event.run_weekly_slice()
+        self.assertTrue(event.db.weekly_update_halted)
+        self.assertIn("halted", mock_inform_staff.call_args[0][0])
+        mock_reactor.callLater.reset_mock()
+        event.at_repeat()
+        mock_reactor.callLater.assert_not_called()
+        event.resume_weekly_events()
+        mock_reactor.callLater.assert_called_once()
+        event.run_weekly_slice()
+        self.assertFalse(event.update_in_progress)
+        self.assertEqual(self.char2.item_data.xp, 6)
+
+    def test_economy_dry_run_matches_legacy(self):
+        "Tests a dry run of the weekly economy saves nothing and matches the legacy report."
+        self.add_factors(self.assetowner2, 1000, 2, charm=3)
+        self.add_factors(self.assetowner3, 5)
+        AccountTransaction.objects.create(
+            receiver=self.assetowner2,
+            sender=self.assetowner3,
+            category="Loan",
+            weekly_amount=10,
+        )
+        AccountTransaction.objects.create(
+            receiver=self.assetowner2,
+            sender=self.assetowner4,
+            category="Gift",
+            weekly_amount=50,
+        )
+        self.assetowner4.vault = 200
+        self.assetowner4.save()
+        ruler = Ruler.objects.create(house=self.assetowner2)
+        domain = Domain.objects.create(ruler=ruler, name="Testdomain", stored_food=5)
+        army = Army.objects.create(domain=domain, owner=self.assetowner2)
+        army.units.create(unit_type=MilitaryUnit.INFANTRY, quantity=10)
+        DomainProject.objects.create(
+            domain=domain, type=DomainProject.BUILD_HOUSING, amount=2
+        )
+        economy = WeeklyEconomy(1, dry_run=True)
+        texts = economy.run([self.assetowner2.id], decay=False)
+        self.assertEqual(self.assetowner2.vault, 1000)
+        self.assertEqual(self.assetowner4.vault, 200)
+        self.assetowner2.refresh_from_db()
+        self.assertEqual(self.assetowner2.vault, 1000)
+        domain.refresh_from_db()
+        self.assertEqual((domain.stored_food, domain.num_housing), (5, 0))
+        self.assertTrue(DomainProject.objects.filter(domain=domain).exists())
+        creator = BulkInformCreator(week=1)
+        self.assetowner2.do_weekly_adjustment(1, creator)
+        self.assertEqual(texts[self.account2], creator.informs[0].message)
+        self.assertIn("Failed payments to you", texts[self.account2])
+        self.assertIn("Army reports", texts[self.account2])
+        project_report = self.account2.informs.get(category="project")
+        self.assertEqual(
+            economy.project_reports, [(self.account2, project_report.message)]
+        )
+
+    @patch("web.character.investigation_resolver.inform_staff")
+    def test_investigation_resolver_matches_legacy(self, mock_inform_staff):
+        "Tests resolving investigations in bulk matches the legacy loop with the same seed."
+        clue = Clue.objects.create(name="test clue", rating=10, desc="test clue desc")
+        investigation = Investigation.objects.create(
+            character=self.roster_entry,
+            topic="test clue",
+            clue_target=clue,
+            completion_value=10000,
+        )
+        investigation.assistants.create(char=self.char2, currently_helping=True)
+        legacy = InvestigationResolver(BulkInformCreator(week=1), seed=25)
+        legacy.seed_random(investigation)
+        investigation.process_events(legacy.inform_creator)
+        progress = investigation.progress
+        investigation.progress = 0
+        investigation.active = True
+        investigation.save()
+        resolver = InvestigationResolver(BulkInformCreator(week=1), seed=25)
+        self.assertEqual(resolver.run([investigation]), investigation.id)
+        self.assertIsNone(investigation.loaded_assistants)
+        self.assertFalse(investigation.active)
+        self.assertEqual(investigation.progress, progress)
+        self.assertEqual(
+            resolver.inform_creator.informs[0].message,
+            legacy.inform_creator.informs[0].message,
+        )
+        # a failure is rolled back and reported without stopping the others
+        investigation.active = True
+        investigation.save()
+        with patch.object(Investigation, "reset_values", side_effect=ValueError):
+            resolver = InvestigationResolver(BulkInformCreator(week=1))
+            resolver.run([investigation])
+        self.assertFalse(resolver.inform_creator.informs)
+        self.assertTrue(Investigation.objects.get(id=investigation.id).active)
+        mock_inform_staff.assert_called_once()
+
+    def test_investigation_resolver_queries(self):
+        "Tests loading a batch of investigations takes the same queries for any size."
+        chars = (self.char1, self.char2, self.char3, self.char5)
+        for char in chars:
+            char.traits.set_stat_value("wits", 2)
+            char.health_status
+        investigations = []
+        for entry in (self.roster_entry, self.roster_entry2, self.roster_entry3):
+            investigation = Investigation.objects.create(character=entry, topic="test")
+            investigation.assistants.create(char=self.char5, currently_helping=True)
+            investigations.append(investigation)
+
+        def load(batch):
+            for char in chars:
+                char.__dict__.pop("traits", None)
+            for investigation in batch:
+                del investigation.newbie_bonus
+            CLUE_INDEX.invalidate()
+            InvestigationResolver().load_investigations(batch)
+
+        with CaptureQueriesContext(connection) as queries:
+            load(investigations[:1])
+        with self.assertNumQueries(len(queries)):
+            load(investigations)
+        self.assertEqual(self.char2.traits.get_stat_value("wits"), 2)
+
+    @patch("typeclasses.scripts.weekly_events.inform_staff")
+    @patch("typeclasses.scripts.weekly_events.BBoard")
+    def test_failed_pose_count(self, mock_bboard, mock_inform_staff):
+        """Tests a failed pose count keeps pending poses and the saved counts."""
+        event = create_script(WeeklyEvents)
+        event.db.week = 1
+        event.db.pose_counter = 3
+        event.WEEKLY_STAGES = ("process_pose_counter",)
+        event.start_weekly_events()
+        self.char2.increment_posecount(5)
+        mock_bboard.objects.get.side_effect = ValueError("No staff board")
+        event.run_weekly_slice()
+        self.assertEqual(event.db.weekly_stage_failures, 1)
+        entry = RosterEntry.objects.get(id=self.roster_entry2.id)
+        self.assertEqual(entry.pose_count, 5)
+        self.assertEqual(entry.previous_pose_count, 0)
+
+    @patch("typeclasses.scripts.weekly_events.BBoard")
+    def test_count_poses(self, mock_bboard):
+        from server.utils.counters import COUNTERS
+
+        script = create_script(typeclass=WeeklyEvents)
+        self.char2.tags.add("rostercg")
+        self.char3.tags.add("rostercg")
+        for _ in range(25):
+            self.char2.increment_posecount()
+        self.char3.increment_posecount(3)
+        # pending poses are counted but not yet saved
+        self.assertEqual(self.char2.posecount, 25)
+        self.assertEqual(self.roster_entry2.pose_count, 0)
+        COUNTERS.flush()
+        self.roster_entry2.refresh_from_db()
+        self.assertEqual(self.roster_entry2.pose_count, 25)
+        self.char3.increment_posecount()
+        script.count_poses()
+        self.assertEqual(self.char2.posecount, 0)
+        self.assertEqual(self.char2.previous_posecount, 25)
+        self.assertEqual(self.char3.previous_posecount, 4)
+        self.roster_entry3.refresh_from_db()
+        self.assertEqual(self.roster_entry3.previous_pose_count, 4)
+        table = mock_bboard.objects.get.return_value.bb_post.call_args[1]["msg"]
+        self.assertIn(self.char3.key, table)
+        self.assertNotIn(self.char2.key, table)
+
+
+class TestEventManager(ArxCommandTest):
+    def test_add_msg(self):
+        script = create_script(typeclass=EventManager, key="Event Manager")
+        self.assertEqual(get_event_manager(), script)
+        event = RPEvent.objects.create(name="test event")
+        script.db.idle_events[event.id] = 5
+        log_dir = mkdtemp()
+        path = os.path.join(log_dir, "event_log_%s.txt" % event.id)
+        with patch.object(EventManager, "get_log_path", return_value=path):
+            script.add_msg(event.id, "|wFirst|n pose.", self.char1)
+            script.add_msg(event.id, "Second pose.", self.char1)
+        EVENT_LOG_WRITER.flush()
+        with open(path) as log:
+            self.assertEqual(log.read(), "\nFirst pose.\n\nSecond pose.\n")
+        self.assertEqual(list(event.attended), [self.dompc])
+        self.assertEqual(script.get_attendees(event.id), {self.dompc.id})
+        # idle timers are only saved when we repeat
+        self.assertEqual(script.db.idle_events[event.id], 5)
+        script.save_idle_timers()
+        self.assertEqual(script.db.idle_events[event.id], 0)
@@ -3,18 +3,25 @@ This script keeps a timer that will cause an update to happen
 on a weekly basis. Things we'll be updating are counting votes
 for players, and processes for Dominion.
 """
+import time
 import traceback
 from collections import defaultdict
 from datetime import datetime, timedelta
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.db.models import Q, F
+from twisted.internet import reactor
 
 
 from evennia.objects.models import ObjectDB
+from evennia.utils import logger
+from evennia.utils.dbserialize import from_pickle
 from evennia.utils.evtable import EvTable
 
 from world.dominion.models import AssetOwner, Member, AccountTransaction
+from world.dominion.economy import WeeklyEconomy
+from world.dominion.prestige import ACTIVE_PRESTIGE_RANKINGS
 from world.dominion.domain.models import Army, Orders
 from world.dominion.plots.models import ActionRequirement
 from world.msgs.models import Inform
@@ -22,14 +29,42 @@ from typeclasses.bulletin_board.bboard import BBoard
 from typeclasses.accounts import Account
 from typeclasses.scripts.scripts import Script
 from typeclasses.scripts.script_mixins import RunDateMixin
-from server.utils.arx_utils import inform_staff, cache_safe_update
-from web.character.models import Investigation, RosterEntry
+from server.utils.counters import COUNTERS
+from server.utils.arx_utils import (
+    inform_staff,
+    cache_safe_update,
+    cache_safe_increment,
+)
+from web.character.investigation_resolver import InvestigationResolver
+from web.character.clue_index import CLUE_INDEX
+from web.character.models import (
+    AccountHistory,
+    ClueDiscovery,
+    Investigation,
+    InvestigationAssistant,
+    RosterEntry,
+)
 
 
 EVENT_SCRIPT_NAME = "Weekly Update"
 VOTES_BOARD_NAME = "Votes"
 PRESTIGE_BOARD_NAME = "Prestige Changes"
 TRAINING_CAP_PER_WEEK = 10
+# how many rows a chunked stage processes before yielding back to the reactor
+WEEKLY_CHUNK_SIZE = 25
+# how many times a failed stage is retried before the update is halted
+MAX_STAGE_RETRIES = 3
+# in-memory tallies that are saved with each checkpoint so an update can be resumed
+CHECKPOINT_VALUES = (
+    "recorded_votes",
+    "vote_history",
+    "xp",
+    "xptypes",
+    "requested_support",
+    "scenes",
+    "pending_xp",
+    "pending_resources",
+)
 
 PLAYER_ATTRS = (
     "votes",
@@ -90,9 +125,14 @@ class BulkInformCreator(object):
         self.informs.append(inform)
         return inform
 
+    def create_informs(self):
+        """Creates the informs we've gathered so far, without notifying anyone yet"""
+        Inform.objects.bulk_create(self.informs)
+        self.informs = []
+
     def create_and_send_informs(self, sender="the Weekly Update script"):
         """Creates all our informs and notifies players/orgs about them"""
-        Inform.objects.bulk_create(self.informs)
+        self.create_informs()
         for receiver in self.receivers_to_notify:
             receiver.msg("{yYou have new informs from %s.{n" % sender)
 
@@ -104,6 +144,29 @@ class WeeklyEvents(RunDateMixin, Script):
     """
 
     XP_TYPES_FOR_RESOURCES = ("votes", "scenes")
+    # the methods called in order for a weekly update. Awards are tallied in memory
+    # by the earlier stages and then written to the database in apply_weekly_awards.
+    # Each stage is a checkpoint: progress is saved after it completes.
+    WEEKLY_STAGES = (
+        "do_events_per_player",
+        "award_scene_xp",
+        "award_vote_xp",
+        "apply_weekly_awards",
+        "post_top_rpers",
+        "post_top_prestige",
+        "do_prestige_decay",
+        "do_weekly_adjustments",
+        "do_dominion_cleanup",
+        "cleanup_stale_attributes",
+        "post_inactives",
+        "process_pose_counter",
+        "advance_week",
+        "reset_action_points",
+        "do_investigations",
+        "send_informs",
+    )
+    # stages that take last_id/limit arguments and can be run in slices
+    CHUNKED_STAGES = ("do_weekly_adjustments", "do_investigations")
 
     # noinspection PyAttributeOutsideInit
     def at_script_creation(self):
@@ -122,6 +185,9 @@ class WeeklyEvents(RunDateMixin, Script):
         from world.magic.advancement import init_magic_advancement
 
         init_magic_advancement()
+        # resume an update that was interrupted by a reload or crash
+        if self.update_in_progress:
+            self.schedule_weekly_slice()
 
     @property
     def inform_creator(self):
@@ -134,9 +200,14 @@ class WeeklyEvents(RunDateMixin, Script):
         """
         Called every minute to update the timers.
         """
-        if self.check_event():
+        if self.update_in_progress:
+            # a stage failed or we were restarted: pick up where we left off
+            if not self.ndb.weekly_slice_call and not self.db.weekly_update_halted:
+                self.schedule_weekly_slice()
+        elif self.check_event():
             # check if we've been tagged to not reset next time we run
-            self.do_weekly_events()
+            self.start_weekly_events()
+            self.schedule_weekly_slice()
         else:
             hour = timedelta(minutes=65)
             if self.time_remaining < hour:
@@ -150,50 +221,279 @@ class WeeklyEvents(RunDateMixin, Script):
     def do_weekly_events(self, reset=True):
         """
         It's time for us to do events, like count votes, update dominion, etc.
+        This runs every stage at once. at_repeat instead spreads the stages out
+        over successive reactor ticks with run_weekly_slice.
+        """
+        self.start_weekly_events(reset)
+        while self.process_weekly_stage():
+            pass
+
+    @property
+    def update_in_progress(self):
+        """Whether a weekly update has been started and not yet finished"""
+        return self.db.weekly_stage is not None
+
+    def start_weekly_events(self, reset=True):
+        """
+        Begins a weekly update, recording our progress so that it can be resumed.
+
+            Args:
+                reset (bool): Whether to record awarded values when we finish
         """
         # schedule next weekly update for one week from now
         self.db.run_date += timedelta(days=7)
         # initialize temporary dictionaries we used for aggregating values
         self.initialize_temp_dicts()
-        # processing for each player
-        self.do_events_per_player()
-        # awarding votes we counted
-        self.award_scene_xp()
-        self.award_vote_xp()
-        self.post_top_rpers()
-        self.post_top_prestige()
-        # dominion stuff
-        self.do_dominion_events()
-        self.cleanup_stale_attributes()
-        self.post_inactives()
+        self.ndb.inform_creator = None
+        self.db.weekly_stage = 0
+        self.db.weekly_stage_cursor = 0
+        self.db.weekly_stage_timings = []
+        self.db.weekly_stage_failures = 0
+        self.db.weekly_update_halted = False
+        self.db.record_weekly_values = reset
+        self.save_checkpoint()
+
+    def schedule_weekly_slice(self):
+        """Runs the next slice of the weekly update on the next reactor tick"""
+        self.ndb.weekly_slice_call = reactor.callLater(0, self.run_weekly_slice)
+
+    def run_weekly_slice(self):
+        """
+        Runs one stage, or one chunk of a chunked stage, then yields to the
+        reactor so that the game keeps responding while the update runs. If a
+        stage raises an exception, we stop and at_repeat will retry it later,
+        until it has failed MAX_STAGE_RETRIES times and the update is halted.
+        """
+        self.ndb.weekly_slice_call = None
+        try:
+            more_work = self.process_weekly_stage(limit=WEEKLY_CHUNK_SIZE)
+        except Exception as err:
+            traceback.print_exc()
+            failures = (self.db.weekly_stage_failures or 0) + 1
+            self.db.weekly_stage_failures = failures
+            if failures > MAX_STAGE_RETRIES:
+                self.db.weekly_update_halted = True
+                inform_staff(
+                    "Weekly update stage %s failed %s times and the update is halted "
+                    "until resume_weekly_events is called: %s"
+                    % (self.current_weekly_stage, failures, err)
+                )
+            else:
+                inform_staff(
+                    "Weekly update stage %s failed and will be retried: %s"
+                    % (self.current_weekly_stage, err)
+                )
+            return
+        self.db.weekly_stage_failures = 0
+        if more_work:
+            self.schedule_weekly_slice()
+
+    def resume_weekly_events(self):
+        """Resumes a weekly update that was halted after its stage kept failing"""
+        self.db.weekly_stage_failures = 0
+        self.db.weekly_update_halted = False
+        if self.update_in_progress and not self.ndb.weekly_slice_call:
+            self.schedule_weekly_slice()
+
+    @property
+    def current_weekly_stage(self):
+        """The name of the stage we'll run next"""
+        try:
+            return self.WEEKLY_STAGES[self.db.weekly_stage]
+        except (IndexError, TypeError):
+            return None
+
+    def process_weekly_stage(self, limit=None):
+        """
+        Runs the current stage in a transaction and saves a checkpoint when it's
+        done, so an interrupted update neither repeats nor skips a stage.
+
+            Args:
+                limit (int): Max rows for a chunked stage to process, or None for all
+
+            Returns:
+                True if there are more stages to run, False if the update is finished.
+        """
+        stage = self.current_weekly_stage
+        if not stage:
+            return False
+        if self.ndb.xp is None:
+            # our tallies were lost to a reload, so get them from the checkpoint
+            self.restore_checkpoint()
+        start = time.time()
+        # pending counter increments are written outside our transaction, since a
+        # rollback would lose them after they've been taken from the counters
+        COUNTERS.flush()
+        try:
+            with transaction.atomic():
+                if stage in self.CHUNKED_STAGES:
+                    cursor = self.db.weekly_stage_cursor or 0
+                    last_id = getattr(self, stage)(last_id=cursor, limit=limit)
+                    finished = last_id is None
+                    self.db.weekly_stage_cursor = 0 if finished else last_id
+                else:
+                    getattr(self, stage)()
+                    finished = True
+                if finished:
+                    self.db.weekly_stage += 1
+                self.inform_creator.create_informs()
+                self.save_checkpoint()
+                self.record_stage_timing(stage, time.time() - start)
+        except Exception:
+            self.discard_failed_stage(stage)
+            raise
+        if not self.current_weekly_stage:
+            self.finish_weekly_events()
+            return False
+        return True
+
+    def discard_failed_stage(self, stage):
+        """
+        Throws away what a failed stage left in memory after its transaction was
+        rolled back, so that retrying it doesn't count or send anything twice.
+        Our script Attributes were rolled back with everything else, so we
+        reload them along with our tallies from the last checkpoint.
+
+            Args:
+                stage (str): The name of the stage that failed
+        """
+        self.attributes.reset_cache()
+        self.restore_checkpoint()
+        self.ndb.inform_creator = None
+        for model in self.get_stage_models(stage):
+            model.flush_instance_cache(force=True)
+        if stage == "do_investigations":
+            CLUE_INDEX.invalidate()
+
+    @staticmethod
+    def get_stage_models(stage):
+        """Returns the cached models whose instances a stage changes"""
+        from evennia_extensions.character_extensions.models import (
+            CharacterCombatSettings,
+        )
+
+        return {
+            "do_prestige_decay": (AssetOwner,),
+            "do_weekly_adjustments": (AssetOwner,),
+            "apply_weekly_awards": (
+                CharacterCombatSettings,
+                AccountHistory,
+                AssetOwner,
+            ),
+            "do_dominion_cleanup": (
+                Member,
+                AccountTransaction,
+                Army,
+                Orders,
+                ActionRequirement,
+            ),
+            "process_pose_counter": (RosterEntry,),
+            "reset_action_points": (RosterEntry,),
+            "do_investigations": (Investigation, InvestigationAssistant, ClueDiscovery),
+        }.get(stage, ())
+
+    def finish_weekly_events(self):
+        """Cleans up our progress records once all stages have run"""
+        if self.db.record_weekly_values:
+            self.record_awarded_values()
+        self.report_stage_timings(self.db.weekly_stage_timings or [])
+        self.db.weekly_stage = None
+        for attrname in (
+            "weekly_stage_cursor",
+            "weekly_stage_timings",
+            "weekly_stage_failures",
+            "weekly_update_halted",
+            "weekly_checkpoint",
+            "record_weekly_values",
+        ):
+            self.attributes.remove(attrname)
+
+    def save_checkpoint(self):
+        """Saves our in-memory tallies so that they survive a reload"""
+        self.db.weekly_checkpoint = {
+            name: dict(getattr(self.ndb, name)) for name in CHECKPOINT_VALUES
+        }
+
+    def restore_checkpoint(self):
+        """Restores the in-memory tallies saved by our last checkpoint"""
+        self.initialize_temp_dicts()
+        checkpoint = self.db.weekly_checkpoint or {}
+        for name in CHECKPOINT_VALUES:
+            getattr(self.ndb, name).update(checkpoint.get(name) or {})
+
+    def record_stage_timing(self, stage, elapsed):
+        """Adds the time a stage or slice took to our saved timings"""
+        timings = list(self.db.weekly_stage_timings or [])
+        if timings and timings[-1][0] == stage:
+            timings[-1] = (stage, timings[-1][1] + elapsed)
+        else:
+            timings.append((stage, elapsed))
+        self.db.weekly_stage_timings = timings
+
+    def process_pose_counter(self):
+        """Every fourth week, we post and reset the pose counts of characters"""
         self.db.pose_counter = (self.db.pose_counter or 0) + 1
         if self.db.pose_counter % 4 == 0:
             self.db.pose_counter = 0
             self.count_poses()
+
+    def advance_week(self):
+        """Increments the week counter used for informs and records"""
         self.db.week += 1
-        self.reset_action_points()
-        self.do_investigations()
+
+    def send_informs(self):
+        """Creates all the informs we've gathered during the update"""
         self.inform_creator.create_and_send_informs()
-        if reset:
-            self.record_awarded_values()
+
+    def report_stage_timings(self, timings):
+        """
+        Logs how long each stage of the weekly update took and tells staff.
+
+            Args:
+                timings (list): List of (stage name, seconds elapsed) tuples
+        """
+        total = sum(elapsed for _, elapsed in timings)
+        msg = "Weekly update stage timings (total %.2fs): %s" % (
+            total,
+            ", ".join("%s %.2fs" % (stage, elapsed) for stage, elapsed in timings),
+        )
+        logger.log_info(msg)
+        inform_staff(msg)
 
     def do_dominion_events(self):
         """Does all the dominion weekly events"""
-        for owner in AssetOwner.objects.all():
-            owner.prestige_decay()
-
-        for owner in AssetOwner.objects.filter(
-            Q(organization_owner__isnull=False)
-            | (
-                Q(player__player__roster__roster__name="Active")
-                & Q(player__player__roster__frozen=False)
-            )
-        ).distinct():
-            try:
-                owner.do_weekly_adjustment(self.db.week, self.inform_creator)
-            except Exception as err:
-                traceback.print_exc()
-                print("Error in %s's weekly adjustment: %s" % (owner, err))
+        self.do_prestige_decay()
+        self.do_weekly_adjustments()
+        self.do_dominion_cleanup()
+
+    def do_prestige_decay(self):
+        """Decays the fame of every AssetOwner, saving them in bulk"""
+        economy = WeeklyEconomy(self.db.week)
+        economy.load_owners()
+        economy.decay_prestige()
+        economy.save()
+
+    def do_weekly_adjustments(self, last_id=0, limit=None):
+        """
+        Does the weekly income and costs for AssetOwners, in order of ID.
+
+            Args:
+                last_id (int): Only process AssetOwners with a higher ID than this
+                limit (int): Max number of AssetOwners to process, or None for all
+
+            Returns:
+                The ID of the last AssetOwner processed, or None if there were none.
+        """
+        owner_ids = WeeklyEconomy.get_weekly_owner_ids(last_id)
+        if limit:
+            owner_ids = owner_ids[:limit]
+        if not owner_ids:
+            return None
+        WeeklyEconomy(self.db.week, self.inform_creator).run(owner_ids, decay=False)
+        return owner_ids[-1]
+
+    def do_dominion_cleanup(self):
+        """Resets weekly counters, transactions, and army orders"""
         # resets the weekly record of work command
         cache_safe_update(
             Member.objects.filter(deguilded=False),
@@ -221,32 +521,62 @@ class WeeklyEvents(RunDateMixin, Script):
     @staticmethod
     def reset_action_points():
         """
-        Originally did this with RosterEntry update but ran into issues with cache being out
-        of sync, so action_points didn't properly update. Look into solving that in the future
-        for more efficient bulk update implementation.
+        Regenerates action points for all active characters. The new values are
+        calculated in memory and written with F() expressions, with
+        cache_safe_increment updating the instances in the idmapper cache so that
+        the Account and Character views of a RosterEntry stay in sync.
         """
-        qs = Account.objects.filter(roster__roster__name="Active").distinct()
-        for ob in qs:
-            current = ob.roster.action_points
-            max_ap = ob.roster.max_action_points
-            regen = ob.roster.action_point_regen
+        entries = list(
+            RosterEntry.objects.filter(
+                roster__name="Active", player__isnull=False
+            ).select_related("player")
+        )
+        increments = {}
+        for entry in entries:
+            current = entry.action_points
+            max_ap = entry.max_action_points
+            regen = entry.action_point_regen
             if (current + regen) > max_ap:
                 increment = max_ap - current
             else:
                 increment = regen
             if increment:
-                ob.pay_action_points(-increment)
+                increments[entry.id] = increment
+        cache_safe_increment(RosterEntry, increments, "action_points")
+        messages = []
+        for entry in entries:
+            increment = increments.get(entry.id)
+            if not increment:
+                continue
+            verb = "gain" if increment > 0 else "use"
+            messages.append(
+                (
+                    entry.player,
+                    "{wYou %s %s action points and have %s remaining this week.{n"
+                    % (verb, abs(increment), entry.action_points),
+                )
+            )
 
-    def do_investigations(self):
-        """Does all the investigation events"""
-        for investigation in Investigation.objects.filter(
-            active=True, ongoing=True, character__roster__name="Active"
-        ):
-            try:
-                investigation.process_events(self.inform_creator)
-            except Exception as err:
-                traceback.print_exc()
-                print("Error in investigation %s: %s" % (investigation, err))
+        def send_messages():
+            for player, msg in messages:
+                player.msg(msg)
+
+        # only tell players once the new values are saved, not for a rolled back attempt
+        transaction.on_commit(send_messages)
+
+    def do_investigations(self, last_id=0, limit=None):
+        """
+        Does all the investigation events, in order of ID.
+
+            Args:
+                last_id (int): Only process investigations with a higher ID than this
+                limit (int): Max number of investigations to process, or None for all
+
+            Returns:
+                The ID of the last investigation processed, or None if there were none.
+        """
+        resolver = InvestigationResolver(self.inform_creator)
+        return resolver.run(resolver.get_weekly_investigations(last_id, limit))
 
     @staticmethod
     def cleanup_stale_attributes():
@@ -279,6 +609,7 @@ class WeeklyEvents(RunDateMixin, Script):
             ).distinct()
             if ob.char_ob
         ]
+        self.load_weekly_attributes(players)
         for player in players:
             self.count_votes(player)
             # journal XP
@@ -310,6 +641,71 @@ class WeeklyEvents(RunDateMixin, Script):
                 except (KeyError, AttributeError, ObjectDoesNotExist):
                     continue
 
+    def load_weekly_attributes(self, players):
+        """
+        Fetches the weekly Attributes of all our players and their characters in
+        two queries, rather than going through each object's attribute handler.
+
+            Args:
+                players (list): Accounts that we're processing this week
+        """
+        from evennia.typeclasses.attributes import Attribute
+
+        characters = [player.char_ob for player in players]
+        self.ndb.player_attributes = self.get_attribute_values(
+            Attribute.objects.filter(accountdb__in=players),
+            "accountdb__id",
+            PLAYER_ATTRS,
+        )
+        self.ndb.character_attributes = self.get_attribute_values(
+            Attribute.objects.filter(objectdb__in=characters),
+            "objectdb__id",
+            CHARACTER_ATTRS,
+        )
+        # map of account IDs to their AssetOwner IDs, for awarding resources
+        self.ndb.asset_owner_ids = dict(
+            AssetOwner.objects.filter(player__player__in=players).values_list(
+                "player__player__id", "id"
+            )
+        )
+
+    @staticmethod
+    def get_attribute_values(queryset, holder_field, attr_names):
+        """
+        Returns a dict of holder IDs to dicts of their deserialized Attribute values.
+
+            Args:
+                queryset: Attributes filtered to the holders we want
+                holder_field (str): Lookup for the ID of the Attribute's holder
+                attr_names (tuple): Keys of the Attributes we want
+        """
+        values = defaultdict(dict)
+        qs = queryset.filter(db_key__in=attr_names, db_category__isnull=True)
+        for holder_id, key, value in qs.values_list(holder_field, "db_key", "db_value"):
+            values[holder_id][key] = from_pickle(value)
+        return values
+
+    def get_player_attr(self, player, attrname):
+        """Gets a weekly Attribute value for a player, from our bulk load if possible"""
+        if self.ndb.player_attributes is None:
+            return player.attributes.get(attrname)
+        return self.ndb.player_attributes.get(player.id, {}).get(attrname)
+
+    def get_character_attr(self, char, attrname):
+        """Gets a weekly Attribute value for a character, from our bulk load if possible"""
+        if self.ndb.character_attributes is None:
+            return char.attributes.get(attrname)
+        return self.ndb.character_attributes.get(char.id, {}).get(attrname)
+
+    def get_asset_owner_id(self, player):
+        """Gets the ID of the AssetOwner for a player, or None if they have none"""
+        if player.id not in self.ndb.asset_owner_ids:
+            try:
+                self.ndb.asset_owner_ids[player.id] = player.assets.id
+            except (AttributeError, ObjectDoesNotExist):
+                self.ndb.asset_owner_ids[player.id] = None
+        return self.ndb.asset_owner_ids[player.id]
+
     def initialize_temp_dicts(self):
         """Initializes dicts we record weekly values in"""
         # our votes are a dict of player to their number of votes
@@ -320,6 +716,12 @@ class WeeklyEvents(RunDateMixin, Script):
         self.ndb.xptypes = {}
         self.ndb.requested_support = {}
         self.ndb.scenes = defaultdict(int)
+        # xp and resources awarded, which are saved in bulk by apply_weekly_awards
+        self.ndb.pending_xp = defaultdict(int)
+        self.ndb.pending_resources = defaultdict(int)
+        self.ndb.asset_owner_ids = {}
+        self.ndb.player_attributes = None
+        self.ndb.character_attributes = None
 
     @staticmethod
     def check_freeze():
@@ -357,22 +759,32 @@ class WeeklyEvents(RunDateMixin, Script):
 
     def count_poses(self):
         """Makes a board post of characters with insufficient pose-counts"""
-        qs = ObjectDB.objects.filter(roster__roster__name="Active")
         min_poses = 20
-        low_activity = []
-        for ob in qs:
-            if ob.posecount < min_poses and (
-                ob.tags.get("rostercg")
-                and ob.player_ob
-                and not ob.player_ob.tags.get("staff_alt")
-            ):
-                low_activity.append(ob)
-            ob.previous_posecount = ob.posecount
-            ob.posecount = 0
-        board = BBoard.objects.get(db_key__iexact="staff")
+        COUNTERS.flush()
+        low_activity = (
+            ObjectDB.objects.filter(
+                roster__roster__name="Active",
+                roster__pose_count__lt=min_poses,
+                roster__player__isnull=False,
+                db_tags__db_key="rostercg",
+                db_tags__db_category__isnull=True,
+            )
+            .exclude(roster__player__db_tags__db_key="staff_alt")
+            .distinct()
+            .values_list("db_key", "roster__pose_count")
+        )
         table = EvTable("{wName{n", "{wNum Poses{n", border="cells", width=78)
-        for ob in low_activity:
-            table.add_row(ob.key, str(ob.previous_posecount))
+        for key, pose_count in low_activity:
+            table.add_row(key, str(pose_count))
+        # move every active pose count to previous, then keep our cache in step
+        active = RosterEntry.objects.filter(roster__name="Active")
+        active_ids = set(active.values_list("id", flat=True))
+        active.update(previous_pose_count=F("pose_count"), pose_count=0)
+        for entry in RosterEntry.get_all_cached_instances():
+            if entry.id in active_ids:
+                entry.previous_pose_count = entry.pose_count
+                entry.pose_count = 0
+        board = BBoard.objects.get(db_key__iexact="staff")
         board.bb_post(poster_obj=self, msg=str(table), subject="Inactive by Poses List")
 
     # Various 'Beats' -------------------------------------------------
@@ -390,7 +802,10 @@ class WeeklyEvents(RunDateMixin, Script):
             else:
                 self.ndb.xptypes[account.id] = {}
                 total = 0
-            journal_total = char.messages.num_weekly_journals
+            journal_total = sum(
+                self.get_character_attr(char, attrname) or 0
+                for attrname in ("num_journals", "num_rel_updates", "num_flashbacks")
+            )
             xp = 0
             if journal_total > 0:
                 xp += 4
@@ -429,7 +844,7 @@ class WeeklyEvents(RunDateMixin, Script):
         player it's fairly trivial to check each week on an individual basis
         anyway.
         """
-        votes = player.db.votes or []
+        votes = self.get_player_attr(player, "votes") or []
         for ob in votes:
             self.ndb.recorded_votes[ob] += 1
         if votes:
@@ -441,7 +856,7 @@ class WeeklyEvents(RunDateMixin, Script):
         random scenes in a week, and each scene that they participated in gives them
         2 xp.
         """
-        scenes = player.db.claimed_scenelist or []
+        scenes = self.get_player_attr(player, "claimed_scenelist") or []
         charob = player.char_ob
         for ob in scenes:
             # give credit to the character the player had a scene with
@@ -449,7 +864,7 @@ class WeeklyEvents(RunDateMixin, Script):
             # give credit to the player's character, once per scene
             if charob:
                 self.ndb.scenes[charob] += 1
-        requested_scenes = charob.db.scene_requests or {}
+        requested_scenes = self.get_character_attr(charob, "scene_requests") or {}
         if requested_scenes:
             self.ndb.scenes[charob] += len(requested_scenes)
 
@@ -541,7 +956,7 @@ class WeeklyEvents(RunDateMixin, Script):
             except AttributeError:
                 pass
             xp = int(xp)
-            char.adjust_xp(xp)
+            self.ndb.pending_xp[char] += xp
             self.ndb.xp[char] += xp
         except Exception as err:
             traceback.print_exc()
@@ -554,22 +969,65 @@ class WeeklyEvents(RunDateMixin, Script):
         """Awards resources to someone based on their xp awards"""
         if xptype not in self.XP_TYPES_FOR_RESOURCES:
             return
-        resource_msg = ""
-        amt = 0
-        try:
-            for r_type in ("military", "economic", "social"):
-                amt = player.gain_resources(r_type, xp)
-            if amt:
-                resource_msg = (
-                    "Based on your number of %s, you have gained %s resources of each type."
-                    % (xptype, amt)
-                )
-        except AttributeError:
-            pass
-        if resource_msg:
-            self.inform_creator.add_player_inform(
-                player, resource_msg, "Resources", week=self.db.week
+        owner_id = self.get_asset_owner_id(player)
+        if not owner_id or xp <= 0:
+            return
+        self.ndb.pending_resources[owner_id] += xp
+        resource_msg = (
+            "Based on your number of %s, you have gained %s resources of each type."
+            % (xptype, xp)
+        )
+        self.inform_creator.add_player_inform(
+            player, resource_msg, "Resources", week=self.db.week
+        )
+
+    def apply_weekly_awards(self):
+        """
+        Saves all the xp and resources we've tallied for the week. Each table is
+        written with a handful of F() expression updates rather than a save for
+        every character, and cache_safe_increment keeps the cached instances in
+        sync with the database.
+        """
+        from evennia_extensions.character_extensions.models import (
+            CharacterCombatSettings,
+        )
+
+        xp_by_char = defaultdict(int)
+        for char, xp in self.ndb.pending_xp.items():
+            if xp > 0:
+                xp_by_char[char.id] += xp
+        has_settings = set(
+            CharacterCombatSettings.objects.filter(pk__in=xp_by_char).values_list(
+                "pk", flat=True
+            )
+        )
+        for char in self.ndb.pending_xp:
+            # rare case of a character without storage: let the handler create it
+            if char.id in xp_by_char and char.id not in has_settings:
+                char.adjust_xp(xp_by_char.pop(char.id))
+        cache_safe_increment(CharacterCombatSettings, xp_by_char, "xp", "total_xp")
+        # xp earned by the current player of each character, in their latest history
+        history_ids = {}
+        for history_id, char_id in (
+            AccountHistory.objects.filter(
+                entry__character__in=xp_by_char,
+                account=F("entry__current_account"),
             )
+            .order_by("id")
+            .values_list("id", "entry__character__id")
+        ):
+            history_ids[char_id] = history_id
+        cache_safe_increment(
+            AccountHistory,
+            {
+                history_id: xp_by_char[char_id]
+                for char_id, history_id in history_ids.items()
+            },
+            "xp_earned",
+        )
+        cache_safe_increment(
+            AssetOwner, self.ndb.pending_resources, "military", "economic", "social"
+        )
 
     def post_top_rpers(self):
         """
@@ -665,18 +1123,13 @@ class WeeklyEvents(RunDateMixin, Script):
                 border="cells",
                 width=78,
             )
-            rank_order = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name="Active"
-                ).distinct()
-            )
-            rank_order = sorted(rank_order, key=lambda x: x.prestige, reverse=True)
+            # rescan everyone once, since the week changed all their prestige
+            ACTIVE_PRESTIGE_RANKINGS.rebuild()
             for tup in sorted_changes:
                 # get our prestige ranking compared to others
                 owner = tup[0]
-                try:
-                    rank = rank_order.index(owner) + 1
-                except ValueError:
+                rank = ACTIVE_PRESTIGE_RANKINGS.rank(owner)
+                if rank is None:
                     # they rostered mid-week or whatever, skip them
                     continue
                 # get the amount that our prestige has changed. add + for positive
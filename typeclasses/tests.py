@@ -3,9 +3,14 @@ Tests for commands associated with typeclasses, or typeclass functionality.
 We'll use the Arx CommandTest class, which is a subclass of Evennia's testcases
 that leverage django's testrunner.
 """
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
+from typeclasses.broadcast import MsgPreferences, RoomBroadcast
+from typeclasses.channels import Channel
+from typeclasses.mixins import RE_COLOR
+from typeclasses.room_graph import ROOM_GRAPH
 from typeclasses.rooms import CmdExtendedLook
+from server.utils.session_log import SessionLog
 from server.utils.test_utils import ArxCommandTest
 
 
@@ -58,3 +63,262 @@ class ArxRoomTests(ArxCommandTest):
                 desc = f"It is {season} in the test room."
                 setattr(self.room1.item_data, f"{season}_description", desc)
                 self.call_cmd("", get_full_desc(desc))
+
+
+class RoomBroadcastTests(ArxCommandTest):
+    """Tests the shared formatting of room messages and cached msg preferences."""
+
+    def test_msg_preferences(self):
+        prefs = MsgPreferences.get(self.char1)
+        self.assertFalse(prefs.posebreak)
+        self.assertIs(MsgPreferences.get(self.char1), prefs)
+        # writing an Attribute we read, or tagging the account, drops the snapshot
+        self.char1.db.posebreak = True
+        prefs = MsgPreferences.get(self.char1)
+        self.assertTrue(prefs.posebreak)
+        self.account.tags.add("no_ascii")
+        self.assertTrue(MsgPreferences.get(self.char1).no_ascii)
+        self.account.tags.remove("no_ascii")
+        self.assertFalse(MsgPreferences.get(self.char1).no_ascii)
+        self.char1.attributes.remove("posebreak")
+        self.assertFalse(MsgPreferences.get(self.char1).posebreak)
+        # other Attributes leave it alone
+        prefs = MsgPreferences.get(self.char1)
+        self.char1.db.test_attribute = True
+        self.assertIs(MsgPreferences.get(self.char1), prefs)
+
+    def test_broadcast_formatting(self):
+        self.char1.db.pose_quote_color = "|c"
+        self.char2.db.pose_quote_color = "|c"
+        self.char2.db.name_color = "|r"
+        pose = '%s says, "Hello, %s."' % (self.char1.key, self.char2.key)
+        with RoomBroadcast.sending(self.room1) as broadcast:
+            self.assertIs(RoomBroadcast.current(), broadcast)
+            results = []
+            for char in (self.char1, self.char2):
+                prefs = MsgPreferences.get(char)
+                results.append(
+                    broadcast.format_pose(pose, char.key, prefs, char.namex, RE_COLOR)
+                )
+            self.assertEqual(
+                results[0],
+                '%s says, |c"Hello, %s."{n' % (self.char1.key, self.char2.key),
+            )
+            self.assertEqual(
+                results[1],
+                '%s says, |c"Hello, |r%s|c."{n' % (self.char1.key, self.char2.key),
+            )
+            self.assertFalse(broadcast.private)
+        self.assertIsNone(RoomBroadcast.current())
+
+
+class SessionLogTests(ArxCommandTest):
+    """Tests the bounded logs of messages that accounts receive."""
+
+    num_additional_characters = 1
+
+    def test_session_log(self):
+        log = SessionLog(capacity=3)
+        self.assertTrue(log.add(self.char2, "Hi."))
+        self.assertFalse(log.add(self.char2, "Hi."))
+        log.add(self.char2, "Bye.")
+        log.add(self.account2, "Hi.")
+        log.add(self.char3, "Hello.")
+        # the oldest line fell off, so it's no longer a duplicate
+        self.assertEqual(len(log), 3)
+        self.assertNotIn((self.char2, "Hi."), log)
+        self.assertTrue(log.add(self.char2, "Hi."))
+
+    def test_account_logs(self):
+        self.account.log_message(self.char2, " Hi. ")
+        self.account.log_message(self.char2, "Hi.")
+        self.account.log_message(self.account3, "Hello.")
+        self.account.log_message(self.char1, "Talking to myself.")
+        lines = [(self.char2, "Hi."), (self.account3, "Hello.")]
+        self.assertEqual(list(self.account.current_log), lines)
+        self.account.previous_log = self.account.current_log
+        self.assertEqual(
+            self.account.db.previous_log,
+            {
+                "session_log": [
+                    ("o%s" % self.char2.id, "Hi."),
+                    ("a%s" % self.account3.id, "Hello."),
+                ]
+            },
+        )
+        self.assertEqual(list(self.account.previous_log), lines)
+        self.account.report_player(self.account3)
+        self.assertEqual(list(self.account.flagged_log), [(self.account3, "Hello.")])
+        # logs saved before we used references still load
+        self.account.db.flagged_log = lines
+        self.assertEqual(list(self.account.flagged_log), lines)
+
+
+class ChannelTests(ArxCommandTest):
+    """Tests delivery of channel messages."""
+
+    num_additional_characters = 1
+
+    @patch.object(Channel, "send_msg")
+    def test_distribute_mentions(self, mock_send_msg):
+        from evennia.utils.create import create_channel
+
+        channel = create_channel("Public", typeclass="typeclasses.channels.Channel")
+        for account in (self.account, self.account2, self.account3):
+            channel.subscriptions.add(account)
+        channel.invalidate_mention_index()
+        message = f"@{self.char2.key.lower()}! Hello @Everyone and @{self.char3.key}."
+        msgobj = Mock(message=message, senders=[self.account], keep_log=False)
+        channel.distribute_message(msgobj, online=False)
+        everyone = "{c[Everyone]{n"
+        char2, char3 = f"{{c[{self.char2.key}]{{n", f"{{c[{self.char3.key}]{{n"
+        received = {call[0][1]: call[0][0] for call in mock_send_msg.call_args_list}
+        self.assertEqual(
+            received[self.account], f"{char2}! Hello {everyone} and {char3}."
+        )
+        self.assertEqual(
+            received[self.account2],
+            f"{char2}! Hello {everyone} and @{self.char3.key}.",
+        )
+        self.assertEqual(
+            received[self.account3],
+            f"@{self.char2.key.lower()}! Hello {everyone} and {char3}.",
+        )
+        channel.mute(self.account2)
+        self.assertIn(self.account2, channel.mute_set)
+        channel.unmute(self.account2)
+        self.assertNotIn(self.account2, channel.mute_set)
+        self.char3.name = "Renamed"
+        self.assertEqual(channel.mention_index["renamed"], ("Renamed", self.account3))
+        self.assertNotIn("char3", channel.mention_index)
+
+
+class RoomGraphTests(ArxCommandTest):
+    """Tests routes found for @directions"""
+
+    def setUp(self):
+        from evennia.utils import create
+
+        super().setUp()
+        self.room3 = create.create_object(self.room_typeclass, key="Room3")
+        self.exit2 = create.create_object(
+            self.exit_typeclass,
+            key="north",
+            location=self.room2,
+            destination=self.room3,
+        )
+
+    def test_get_route(self):
+        route = ((self.exit.id, self.room2.id), (self.exit2.id, self.room3.id))
+        self.assertEqual(ROOM_GRAPH.get_route(self.room1, self.room3), route)
+        self.assertEqual(self.char1.get_directions(self.room3), "{c%s{n" % self.exit)
+        # the rest of the route is remembered for when we step into room2
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ROOM_GRAPH.get_route(self.room2, self.room3, [self.room1.id]),
+                route[1:],
+            )
+        self.assertIsNone(ROOM_GRAPH.get_route(self.room1, self.room3, [self.room2.id]))
+        self.exit2.tags.add("secret")
+        self.assertIsNone(ROOM_GRAPH.get_route(self.room1, self.room3))
+        self.exit2.tags.remove("secret")
+        self.assertEqual(ROOM_GRAPH.get_route(self.room1, self.room3), route)
+        # relinking an exit updates the graph without a reload
+        self.exit2.destination = self.room1
+        self.assertIsNone(ROOM_GRAPH.get_route(self.room1, self.room3))
+        self.exit2.destination = self.room3
+        self.assertEqual(ROOM_GRAPH.get_route(self.room1, self.room3), route)
+        self.exit2.delete()
+        self.assertIsNone(ROOM_GRAPH.get_route(self.room1, self.room3))
+
+
+class MapTests(ArxCommandTest):
+    """Tests drawing maps"""
+
+    def test_draw_map(self):
+        from evennia.utils import create
+
+        area_map = create.create_object("typeclasses.map.Map", key="Test Map")
+        for room, x, y, icon in ((self.room1, 0, 1, "R"), (self.room2, 1, 0, "R2")):
+            room.db.x_coord, room.db.y_coord, room.db.map_icon = x, y, icon
+            area_map.add_room(room)
+        self.assertEqual(
+            area_map.draw_map(self.room1, destination=self.room2),
+            "\n{gXX{n-  \n  -{rXX{n",
+        )
+        self.assertEqual(area_map.draw_map(self.room2), "\nR -  \n  -{gXX{n")
+        area_map.clear_square(1, 0)
+        self.assertEqual(area_map.draw_map(self.room1), "\n{gXX{n-  \n  -  ")
+
+
+class BBoardTests(ArxCommandTest):
+    """Tests numbering posts and tracking which have been read"""
+
+    def test_post_numbers_and_unread_counts(self):
+        from evennia.utils import create
+
+        board = create.create_object(
+            "typeclasses.bulletin_board.bboard.BBoard", key="Test Board"
+        )
+        posts = [
+            board.bb_post(self.account, "Text %s" % num, announce=False)
+            for num in range(1, 4)
+        ]
+        self.assertEqual(board.get_post_count(), 3)
+        self.assertEqual(board.get_post(self.account2, 2), posts[1])
+        self.assertEqual(board.get_post_number(posts[2]), 3)
+        self.assertEqual(board.num_of_unread_posts(self.account2), 3)
+        board.mark_read(self.account2, posts[0])
+        board.mark_read(self.account2, posts[0])
+        self.assertEqual(board.num_of_unread_posts(self.account2), 2)
+        board.delete_post(posts[1])
+        self.assertEqual(board.num_of_unread_posts(self.account2), 1)
+        self.assertEqual(board.get_post(self.account2, 2), posts[2])
+        self.assertIsNone(board.get_post(self.account2, 3))
+        board.archive_post(posts[2])
+        self.assertEqual(board.num_of_unread_posts(self.account2), 0)
+        self.assertEqual(board.get_post_number(posts[2], old=True), 1)
+        board.mark_unarchived(posts[2])
+        board.mark_all_read(self.account2)
+        self.assertEqual(board.num_of_unread_posts(self.account2), 0)
+        self.assertFalse(board.get_unread_posts(self.account2).exists())
+
+    def test_read_unread_posts(self):
+        from evennia.utils import create
+
+        board = create.create_object(
+            "typeclasses.bulletin_board.bboard.BBoard", key="Test Board"
+        )
+        posts = [
+            board.bb_post(self.account, "Text %s" % num, announce=False)
+            for num in range(1, 4)
+        ]
+        board.mark_read(self.account2, posts[1])
+        self.assertEqual(board.num_of_unread_posts(self.account2), 2)
+        self.assertEqual(
+            set(board.read_unread_posts(self.account2)), {posts[0], posts[2]}
+        )
+        self.assertEqual(board.num_of_unread_posts(self.account2), 0)
+        self.assertEqual(board.read_unread_posts(self.account2), [])
+        self.assertEqual(posts[1].db_receivers_accounts.count(), 1)
+
+
+class OldAnsiTests(ArxCommandTest):
+    """Tests translating old MUSH-style codes in one pass"""
+
+    def test_sub_old_ansi(self):
+        import random
+        from server.utils.arx_utils import OLD_ANSI_CODES, sub_old_ansi
+
+        def sub_in_turn(text):
+            for code, markup in OLD_ANSI_CODES.items():
+                text = text.replace(code, markup)
+            return text
+
+        self.assertEqual(sub_old_ansi("%ch%crHi%cn%r"), "|h|rHi|n|/")
+        self.assertEqual(sub_old_ansi("100%"), "100%")
+        self.assertEqual(sub_old_ansi(None), "")
+        rand = random.Random(21)
+        for _ in range(500):
+            text = "".join(rand.choice("%%crRtTbgGyBmMwXhn |") for _ in range(12))
+            self.assertEqual(sub_old_ansi(text), sub_in_turn(text))
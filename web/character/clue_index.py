@@ -0,0 +1,243 @@
+"""
+The search tags and discoveries of clues, kept in memory so that finding a clue
+for an investigation doesn't query every candidate clue for its tags.
+
+ClueSearchIndex loads which clues can be investigated, the search tags of every
+clue, and how many times each clue has been discovered, in three queries. The
+clues each character has discovered are loaded when they're first needed, or
+for many characters at once with load_discoveries. Candidates for an
+investigation are then found with set operations, and picked with the same
+weights as before. Clues, ClueDiscoveries and changes to a clue's search tags
+update the index as they happen, and it's reloaded periodically to catch
+anything else, like discoveries deleted in bulk.
+"""
+from datetime import datetime, timedelta
+
+
+class ClueSearchIndex(object):
+    """Clue IDs keyed by search tag and by the characters that discovered them"""
+
+    # how long until we reload, to catch changes made without saving models
+    REFRESH_INTERVAL = timedelta(hours=1)
+
+    def __init__(self):
+        self.last_load = None
+        self.investigable = set()
+        self.clue_tags = {}
+        self.tag_clues = {}
+        self.discovery_counts = {}
+        self.discovered = {}
+
+    @staticmethod
+    def can_investigate(allow_investigation, name):
+        """Whether an investigation can find a clue, other than by its topic"""
+        return allow_investigation and "placeholder" not in name.lower()
+
+    def load_clues(self):
+        """Loads every clue's tags and discovery count in three queries"""
+        from django.db.models import Count
+        from web.character.models import Clue, ClueDiscovery
+
+        self.investigable = set()
+        self.clue_tags = {}
+        self.tag_clues = {}
+        self.discovered = {}
+        for clue_id, name, allow_investigation in Clue.objects.values_list(
+            "id", "name", "allow_investigation"
+        ):
+            if self.can_investigate(allow_investigation, name):
+                self.investigable.add(clue_id)
+        for clue_id, tag_id in Clue.search_tags.through.objects.values_list(
+            "clue_id", "searchtag_id"
+        ):
+            self.add_tags(clue_id, [tag_id])
+        self.discovery_counts = dict(
+            ClueDiscovery.objects.values("clue")
+            .annotate(cnt=Count("id"))
+            .values_list("clue", "cnt")
+        )
+        self.last_load = datetime.now()
+
+    def ensure_loaded(self):
+        """Loads our clues if we don't have them or they're out of date"""
+        if (
+            not self.last_load
+            or datetime.now() - self.last_load >= self.REFRESH_INTERVAL
+        ):
+            self.load_clues()
+
+    def invalidate(self):
+        """Forgets everything, so that it's all loaded again when next used"""
+        self.last_load = None
+        self.investigable = set()
+        self.clue_tags = {}
+        self.tag_clues = {}
+        self.discovery_counts = {}
+        self.discovered = {}
+
+    def update_clue(self, clue):
+        """Updates whether a clue that was just saved can be investigated"""
+        if not self.last_load:
+            return
+        if self.can_investigate(clue.allow_investigation, clue.name):
+            self.investigable.add(clue.id)
+        else:
+            self.investigable.discard(clue.id)
+
+    def remove_clue(self, clue_id):
+        """Removes a clue that's being deleted"""
+        if not self.last_load:
+            return
+        self.investigable.discard(clue_id)
+        self.remove_tags(clue_id, list(self.clue_tags.get(clue_id, ())))
+        self.discovery_counts.pop(clue_id, None)
+        for discovered in self.discovered.values():
+            discovered.discard(clue_id)
+
+    def add_tags(self, clue_id, tag_ids):
+        for tag_id in tag_ids:
+            self.clue_tags.setdefault(clue_id, set()).add(tag_id)
+            self.tag_clues.setdefault(tag_id, set()).add(clue_id)
+
+    def remove_tags(self, clue_id, tag_ids):
+        for tag_id in tag_ids:
+            self.clue_tags.get(clue_id, set()).discard(tag_id)
+            self.tag_clues.get(tag_id, set()).discard(clue_id)
+
+    def get_clue_tags(self, clue_id):
+        """Returns the IDs of a clue's search tags"""
+        self.ensure_loaded()
+        return set(self.clue_tags.get(clue_id, ()))
+
+    def update_tags(self, instance, action, reverse, pk_set):
+        """
+        Updates search tags after they're changed for a clue, or clues are
+        changed for a search tag. Called for the m2m_changed signal of
+        Clue.search_tags, with the same arguments.
+        """
+        if not self.last_load or not action.startswith("post_"):
+            return
+        if action == "post_clear":
+            if reverse:
+                for clue_id in list(self.tag_clues.get(instance.id, ())):
+                    self.remove_tags(clue_id, [instance.id])
+            else:
+                self.remove_tags(instance.id, list(self.clue_tags.get(instance.id, ())))
+            return
+        pairs = [
+            (clue_id, instance.id) if reverse else (instance.id, clue_id)
+            for clue_id in pk_set or ()
+        ]
+        for clue_id, tag_id in pairs:
+            if action == "post_add":
+                self.add_tags(clue_id, [tag_id])
+            elif action == "post_remove":
+                self.remove_tags(clue_id, [tag_id])
+
+    def load_discoveries(self, roster_ids):
+        """Loads the clues discovered by many characters in one query"""
+        from web.character.models import ClueDiscovery
+
+        self.ensure_loaded()
+        roster_ids = [pk for pk in roster_ids if pk not in self.discovered]
+        if not roster_ids:
+            return
+        for roster_id in roster_ids:
+            self.discovered[roster_id] = set()
+        for roster_id, clue_id in ClueDiscovery.objects.filter(
+            character_id__in=roster_ids
+        ).values_list("character_id", "clue_id"):
+            self.discovered[roster_id].add(clue_id)
+
+    def get_discovered(self, roster):
+        """Returns the IDs of the clues that a RosterEntry has discovered"""
+        if roster.id not in self.discovered:
+            self.load_discoveries([roster.id])
+        return self.discovered[roster.id]
+
+    def add_discovery(self, discovery):
+        """Adds a ClueDiscovery that was just created"""
+        if not self.last_load:
+            return
+        clue_id = discovery.clue_id
+        self.discovery_counts[clue_id] = self.discovery_counts.get(clue_id, 0) + 1
+        if discovery.character_id in self.discovered:
+            self.discovered[discovery.character_id].add(clue_id)
+
+    def remove_discovery(self, discovery):
+        """Removes a ClueDiscovery that's being deleted"""
+        if not self.last_load:
+            return
+        clue_id = discovery.clue_id
+        if self.discovery_counts.get(clue_id):
+            self.discovery_counts[clue_id] -= 1
+        if discovery.character_id in self.discovered:
+            self.discovered[discovery.character_id].discard(clue_id)
+
+    def find_clues(
+        self,
+        roster,
+        all_tag_ids=(),
+        any_tag_ids=None,
+        omit_tag_ids=(),
+        investigable_only=True,
+    ):
+        """
+        Finds the clues a character hasn't discovered.
+
+            Args:
+                roster (RosterEntry): The character looking for clues
+                all_tag_ids: IDs of search tags that clues must all have
+                any_tag_ids: If given, IDs of search tags that clues must have
+                    at least one of. Otherwise we start from every clue that
+                    can be investigated.
+                omit_tag_ids: IDs of search tags that clues must not have
+                investigable_only (bool): Whether clues must be ones that can
+                    be investigated
+
+            Returns:
+                A set of clue IDs.
+        """
+        self.ensure_loaded()
+        if any_tag_ids is None:
+            clues = set(self.investigable)
+        else:
+            clues = set().union(
+                *(self.tag_clues.get(tag_id, ()) for tag_id in any_tag_ids)
+            )
+            if investigable_only:
+                clues &= self.investigable
+        for tag_id in all_tag_ids:
+            clues &= self.tag_clues.get(tag_id, set())
+        for tag_id in omit_tag_ids:
+            clues -= self.tag_clues.get(tag_id, set())
+        return clues - self.get_discovered(roster)
+
+    def pick_clue(self, clue_ids, bonus_tag_ids=None):
+        """
+        Picks one of the given clues, weighted by how many times they've been
+        discovered, plus how many of the bonus tags they have.
+
+            Returns:
+                A Clue, or None if there were no clues to pick from.
+        """
+        from web.character.models import Clue
+        from server.utils.picker import WeightedPicker
+
+        if not clue_ids:
+            return None
+        bonus_tag_ids = set(bonus_tag_ids or ())
+        picker = WeightedPicker()
+        for clue_id in sorted(clue_ids):
+            weight = self.discovery_counts.get(clue_id, 0)
+            if bonus_tag_ids:
+                weight += len(self.clue_tags.get(clue_id, set()) & bonus_tag_ids)
+            picker.add_option(clue_id, weight)
+        try:
+            return Clue.objects.get(id=picker.pick())
+        except Clue.DoesNotExist:
+            # the clue was deleted without telling us, so load everything again
+            self.invalidate()
+
+
+CLUE_INDEX = ClueSearchIndex()
@@ -0,0 +1,204 @@
+"""
+The weekly resolution of investigations. Rather than having each Investigation
+query its assistants, the traits and wounds of everyone rolling and the clues
+its character has discovered as it's resolved, InvestigationResolver loads
+them for a whole batch of investigations in a handful of queries. Each
+investigation is then resolved by Investigation.process_events, which is kept
+as the legacy path, inside its own savepoint. One that fails is rolled back
+and reported to staff, and the rest carry on.
+
+Given a seed, the random number generator is seeded from it and each
+investigation's ID just before that investigation is resolved, so its rolls
+don't depend on what was resolved before it. Calling seed_random before
+process_events gives the legacy path the same rolls, so that the results of
+the two can be compared.
+"""
+import random
+import traceback
+from collections import defaultdict
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, prefetch_related_objects
+
+from server.utils.arx_utils import inform_staff
+from web.character.clue_index import CLUE_INDEX
+from web.character.models import ClueDiscovery, Investigation, InvestigationAssistant
+
+
+class InvestigationResolver(object):
+    """
+    Resolves many investigations at once for the weekly update.
+
+    Investigations are the cached instances from the idmapper. The assistants
+    we load for them are only used while we resolve them, and forgotten
+    afterwards so that later changes to who's helping are seen.
+    """
+
+    def __init__(self, inform_creator=None, seed=None):
+        """
+        Args:
+            inform_creator: A BulkInformCreator for results. Without one, players
+                are informed as each investigation is resolved.
+            seed: If given, rolls are seeded from this and each investigation's ID
+        """
+        self.inform_creator = inform_creator
+        self.seed = seed
+        self.failures = []
+
+    @staticmethod
+    def get_weekly_investigations(last_id=0, limit=None):
+        """
+        Returns the investigations resolved by the weekly update, in order of ID.
+
+            Args:
+                last_id (int): Only return investigations with a higher ID than this
+                limit (int): Max number of investigations, or None for all
+        """
+        qs = (
+            Investigation.objects.filter(
+                active=True,
+                ongoing=True,
+                character__roster__name="Active",
+                id__gt=last_id,
+            )
+            .select_related("character__character", "character__player", "clue_target")
+            .order_by("id")
+        )
+        if limit:
+            qs = qs[:limit]
+        return qs
+
+    def run(self, investigations):
+        """
+        Resolves investigations and reports any that failed to staff.
+
+            Args:
+                investigations: The investigations to resolve, in order
+
+            Returns:
+                The ID of the last investigation processed, or None if there were none.
+        """
+        investigations = list(investigations)
+        if not investigations:
+            return None
+        random_state = random.getstate() if self.seed is not None else None
+        try:
+            self.load_investigations(investigations)
+            for investigation in investigations:
+                self.resolve(investigation)
+        finally:
+            for investigation in investigations:
+                investigation.loaded_assistants = None
+            if random_state is not None:
+                random.setstate(random_state)
+        self.report_failures()
+        return investigations[-1].id
+
+    def load_investigations(self, investigations):
+        """
+        Loads the active assistants of investigations, everyone's traits and
+        wounds, the clues their characters have discovered, and how many
+        investigations each character has for their newbie bonus.
+        """
+        assistants = defaultdict(list)
+        for assistant in (
+            InvestigationAssistant.objects.filter(
+                investigation__in=investigations, currently_helping=True
+            )
+            .select_related("char")
+            .order_by("id")
+        ):
+            assistants[assistant.investigation_id].append(assistant)
+        characters = []
+        for investigation in investigations:
+            investigation.loaded_assistants = assistants[investigation.id]
+            characters.append(investigation.char)
+            characters.extend(ob.char for ob in investigation.loaded_assistants)
+        self.load_characters(characters)
+        roster_ids = {ob.character_id for ob in investigations}
+        CLUE_INDEX.load_discoveries(roster_ids)
+        counts = dict(
+            Investigation.objects.filter(character__in=roster_ids)
+            .values("character")
+            .annotate(cnt=Count("id"))
+            .values_list("character", "cnt")
+        )
+        for investigation in investigations:
+            if "newbie_bonus" not in investigation.__dict__:
+                investigation.newbie_bonus = investigation.get_newbie_bonus(
+                    counts.get(investigation.character_id, 0)
+                )
+
+    @staticmethod
+    def load_characters(characters):
+        """
+        Sets up the traits and wounds of characters that don't have them yet.
+        A Traitshandler loads its trait values as soon as it's made, so they're
+        prefetched for characters that don't have one before anything makes it.
+        """
+        characters = [
+            char
+            for char in set(characters)
+            if char and getattr(char, "is_character", False)
+        ]
+        new_traits = [char for char in characters if "traits" not in char.__dict__]
+        prefetch_related_objects(new_traits, "trait_values__trait")
+        prefetch_related_objects(characters, "character_health_status__wounds__trait")
+        # the prefetched querysets are dropped once our caches are set up, so
+        # that anything changed later is queried again
+        for char in new_traits:
+            char.traits
+            char._prefetched_objects_cache.pop("trait_values", None)
+        for char in characters:
+            try:
+                status = char.character_health_status
+            except ObjectDoesNotExist:
+                continue
+            status.cached_wounds
+            status._prefetched_objects_cache.pop("wounds", None)
+
+    def seed_random(self, investigation):
+        """Seeds the random number generator for an investigation, if we have a seed"""
+        if self.seed is not None:
+            random.seed("%s-%s" % (self.seed, investigation.id))
+
+    def resolve(self, investigation):
+        """Resolves an investigation in a savepoint, rolling it back if it fails"""
+        num_informs = len(self.inform_creator.informs) if self.inform_creator else 0
+        self.seed_random(investigation)
+        try:
+            with transaction.atomic():
+                investigation.process_events(self.inform_creator)
+        except Exception as err:
+            traceback.print_exc()
+            print("Error in investigation %s: %s" % (investigation, err))
+            self.failures.append((investigation.id, err))
+            if self.inform_creator:
+                del self.inform_creator.informs[num_informs:]
+            self.discard_failed(investigation)
+
+    @staticmethod
+    def discard_failed(investigation):
+        """
+        Forgets the cached changes made by an investigation that was rolled
+        back: the investigation and its assistants, any discoveries it made,
+        its character's Attributes and the clue index.
+        """
+        for assistant in investigation.loaded_assistants or ():
+            assistant.flush_from_cache(force=True)
+        char = investigation.char
+        if char:
+            char.attributes.reset_cache()
+        investigation.flush_from_cache(force=True)
+        ClueDiscovery.flush_instance_cache(force=True)
+        CLUE_INDEX.invalidate()
+
+    def report_failures(self):
+        """Tells staff which investigations failed and were rolled back"""
+        if not self.failures:
+            return
+        inform_staff(
+            "Investigations that failed in the weekly update and were rolled back: %s"
+            % ", ".join("#%s (%s)" % (pk, err) for pk, err in self.failures)
+        )
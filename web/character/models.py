@@ -21,6 +21,7 @@ from cloudinary.models import CloudinaryField
 from evennia.locks.lockhandler import LockHandler
 from evennia.utils.idmapper.models import SharedMemoryModel
 
+from web.character.clue_index import CLUE_INDEX
 from web.character.managers import ArxRosterManager, AccountHistoryManager
 from server.utils.arx_utils import CachedProperty
 from server.utils.picker import WeightedPicker
@@ -1259,6 +1260,7 @@ class Clue(SharedMemoryModel):
     def save(self, *args, **kwargs):
         """Save and then update all investigations that point to us"""
         super(Clue, self).save(*args, **kwargs)
+        CLUE_INDEX.update_clue(self)
         ongoing = self.investigation_set.filter(ongoing=True)
         if ongoing:
             value = self.get_completion_value()
@@ -1268,6 +1270,12 @@ class Clue(SharedMemoryModel):
                     investigation.completion_value = value
                     investigation.save()
 
+    def delete(self, *args, **kwargs):
+        clue_id = self.id
+        ret = super(Clue, self).delete(*args, **kwargs)
+        CLUE_INDEX.remove_clue(clue_id)
+        return ret
+
 
 class CluePlotInvolvement(SharedMemoryModel):
     """How a clue is related to a plot"""
@@ -1632,7 +1640,10 @@ class ClueDiscovery(SharedMemoryModel):
         return RosterEntry.objects.filter(clues__in=spoiled)
 
     def save(self, *args, **kwargs):
+        created = not self.pk
         super(ClueDiscovery, self).save(*args, **kwargs)
+        if created:
+            CLUE_INDEX.add_discovery(self)
         if (
             self.clue
             and self.clue.tangible_object
@@ -1641,6 +1652,10 @@ class ClueDiscovery(SharedMemoryModel):
         ):
             self.clue.tangible_object.messages.build_secretslist()
 
+    def delete(self, *args, **kwargs):
+        CLUE_INDEX.remove_discovery(self)
+        return super(ClueDiscovery, self).delete(*args, **kwargs)
+
 
 class ClueForRevelation(SharedMemoryModel):
     """Through model that shows which clues are required for a revelation"""
@@ -1787,6 +1802,9 @@ class Investigation(AbstractPlayerAllocations):
         default=300, help_text="Total progress needed to make a discovery."
     )
 
+    # active assistants loaded in bulk by an InvestigationResolver while it resolves us
+    loaded_assistants = None
+
     def __str__(self):
         return "%s's investigation on %s" % (self.character, self.topic)
 
@@ -1844,6 +1862,8 @@ class Investigation(AbstractPlayerAllocations):
     @property
     def active_assistants(self):
         """Assistants that are flagged as actively participating"""
+        if self.loaded_assistants is not None:
+            return self.loaded_assistants
         return self.assistants.filter(currently_helping=True)
 
     @staticmethod
@@ -1954,7 +1974,12 @@ class Investigation(AbstractPlayerAllocations):
     @CachedProperty
     def newbie_bonus(self):
         """Bonus to reduce difficulty of the investigation for the character's first 5 investigations"""
-        bonus = 60 - (10 * self.character.investigations.count())
+        return self.get_newbie_bonus(self.character.investigations.count())
+
+    @staticmethod
+    def get_newbie_bonus(num_investigations):
+        """Returns the newbie bonus for a character with this many investigations"""
+        bonus = 60 - (10 * num_investigations)
         if bonus < 0:
             bonus = 0
         return bonus
@@ -2124,16 +2149,12 @@ class Investigation(AbstractPlayerAllocations):
             search = SearchTag.objects.filter(
                 reduce(lambda x, y: x | Q(name__icontains=y), names, Q())
             )
-            clues = (
-                Clue.objects.exclude(characters=self.character)
-                .filter(search_tags__in=search)
-                .annotate(cnt=Count("discoveries"))
+            clues = CLUE_INDEX.find_clues(
+                self.character,
+                any_tag_ids=search.values_list("id", flat=True),
+                investigable_only=False,
             )
-            if clues:
-                picker = WeightedPicker()
-                for clue in clues:
-                    picker.add_option(clue, clue.cnt)
-                return picker.pick()
+            return CLUE_INDEX.pick_clue(clues)
         else:
             return get_random_clue(
                 self.character,
@@ -2288,33 +2309,23 @@ def get_random_clue(roster, search_tags, omit_tags=None, source_clue=None):
     Finds a target clue based on our topic and our investigation history.
     We'll choose the lowest rating out of 3 random choices.
     """
-    exact = Clue.objects.filter(
-        Q(allow_investigation=True) & ~Q(characters=roster)
-    ).exclude(name__icontains="placeholder")
     if source_clue:
-        by_revelation = exact.filter(
-            revelations__in=source_clue.revelations.all()
-        ).annotate(cnt=Count("discoveries"))
-        tags = source_clue.search_tags.all()
+        tag_ids = CLUE_INDEX.get_clue_tags(source_clue.id)
+        by_revelation = CLUE_INDEX.find_clues(roster).intersection(
+            Clue.objects.filter(
+                revelations__in=source_clue.revelations.all()
+            ).values_list("id", flat=True)
+        )
         if by_revelation:
-            tag_ids = [ob.id for ob in tags]
-            picker = WeightedPicker()
-            for clue in by_revelation:
-                tag_matches = clue.search_tags.filter(id__in=tag_ids).count()
-                picker.add_option(clue, clue.cnt + tag_matches)
-            return picker.pick()
-        exact = exact.filter(search_tags__in=source_clue.search_tags.all())
+            return CLUE_INDEX.pick_clue(by_revelation, bonus_tag_ids=tag_ids)
+        exact = CLUE_INDEX.find_clues(roster, any_tag_ids=tag_ids)
     else:
-        exact = reduce(lambda x, y: x.filter(search_tags=y), search_tags, exact)
-        if omit_tags:
-            exclude_query = reduce(lambda x, y: x | Q(search_tags=y), omit_tags, Q())
-            exact = exact.exclude(exclude_query)
-    if exact:
-        picker = WeightedPicker()
-        exact = exact.annotate(cnt=Count("discoveries"))
-        for clue in exact:
-            picker.add_option(clue, clue.cnt)
-        return picker.pick()
+        exact = CLUE_INDEX.find_clues(
+            roster,
+            all_tag_ids=[ob.id for ob in search_tags],
+            omit_tag_ids=[ob.id for ob in omit_tags or ()],
+        )
+    return CLUE_INDEX.pick_clue(exact)
 
 
 class Flashback(SharedMemoryModel):
@@ -2833,3 +2844,13 @@ class PlayerPosition(SharedMemoryModel):
 
     def __str__(self):
         return self.name
+
+
+def update_clue_index_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keeps the clue search index up to date when clues' search tags change"""
+    CLUE_INDEX.update_tags(instance, action, reverse, pk_set)
+
+
+models.signals.m2m_changed.connect(
+    update_clue_index_tags, sender=Clue.search_tags.through
+)
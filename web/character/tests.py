@@ -155,6 +155,40 @@ class InvestigationTests(ArxCommandTest):
             category="Theories",
         )
 
+    def test_clue_search_index(self):
+        from web.character.clue_index import CLUE_INDEX
+        from web.character.models import get_random_clue
+
+        tag1 = SearchTag.objects.create(name="foo")
+        tag2 = SearchTag.objects.create(name="bar")
+        self.clue.search_tags.add(tag1)
+        self.clue2.search_tags.add(tag1, tag2)
+        for clue in (self.clue, self.clue2):
+            clue.allow_investigation = True
+            clue.save()
+        self.assertEqual(
+            CLUE_INDEX.find_clues(self.roster_entry, all_tag_ids=[tag1.id]),
+            {self.clue2.id},
+        )
+        self.assertEqual(
+            CLUE_INDEX.find_clues(
+                self.roster_entry2, all_tag_ids=[tag1.id], omit_tag_ids=[tag2.id]
+            ),
+            {self.clue.id},
+        )
+        self.clue2.search_tags.remove(tag1)
+        self.assertEqual(
+            CLUE_INDEX.find_clues(self.roster_entry2, any_tag_ids=[tag1.id]),
+            {self.clue.id},
+        )
+        self.clue2.discoveries.create(character=self.roster_entry2)
+        self.assertEqual(CLUE_INDEX.discovery_counts[self.clue2.id], 1)
+        self.assertIsNone(get_random_clue(self.roster_entry2, [tag2]))
+        self.assertEqual(get_random_clue(self.roster_entry2, [tag1]), self.clue)
+        self.clue.name = "placeholder clue"
+        self.clue.save()
+        self.assertIsNone(get_random_clue(self.roster_entry2, [tag1]))
+
     def test_cmd_investigate(self):
         tag1 = SearchTag.objects.create(name="foo")
         tag2 = SearchTag.objects.create(name="bar")
@@ -1646,6 +1646,13 @@ class DomainProject(SharedMemoryModel):
         (MUSTER_TROOPS, "Muster Troops"),
         (BUILD_TROOP_EQUIPMENT, "Build Troop Equipment"),
     )
+    # the Domain field that each type of building project adds to
+    DOMAIN_FIELDS = {
+        BUILD_HOUSING: "num_housing",
+        BUILD_FARMS: "num_farms",
+        BUILD_MINES: "num_mines",
+        BUILD_MILLS: "num_mills",
+    }
 
     type = models.PositiveSmallIntegerField(
         choices=PROJECT_CHOICES, default=BUILD_HOUSING
@@ -1685,12 +1692,26 @@ class DomainProject(SharedMemoryModel):
             self.finish_project(report)
         self.save()
 
+    def get_new_total(self):
+        """Returns what the total this project adds to will be once it's finished"""
+        if self.type in self.DOMAIN_FIELDS:
+            return getattr(self.domain, self.DOMAIN_FIELDS[self.type]) + self.amount
+        if self.type == self.BUILD_DEFENSES:
+            return self.castle.level + self.amount
+        if self.type == self.MUSTER_TROOPS:
+            existing_unit = self.military.find_unit(self.unit_type)
+            return (existing_unit.quantity if existing_unit else 0) + self.amount
+        if self.type == self.BUILD_TROOP_EQUIPMENT:
+            return self.unit.equipment + self.amount
+        return self.amount
+
     def finish_project(self, report=None):
         """
         Does whatever the project set out to do. For muster troops, we'll need to first
         determine if the unit type we're training more of already exists in the army.
         If so, we add to the value, and if not, we create a new unit.
         """
+        new_total = self.get_new_total()
         if self.type == self.BUILD_HOUSING:
             self.domain.num_housing += self.amount
         if self.type == self.BUILD_FARMS:
@@ -1714,14 +1735,12 @@ class DomainProject(SharedMemoryModel):
                 self.military.units.create(
                     unit_type=self.unit_type, quantity=self.amount
                 )
-        if self.type == self.TRAIN_TROOPS:
-            self.unit.train(self.amount)
         if self.type == self.BUILD_TROOP_EQUIPMENT:
             self.unit.equipment += self.amount
             self.unit.save()
         if report:
             # add a copy of this project's data to the report
-            report.add_project_report(self)
+            report.add_project_report(self, new_total)
         # we're all done. goodbye, cruel world
         self.delete()
 
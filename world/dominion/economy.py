@@ -0,0 +1,417 @@
+"""
+The weekly economy for Dominion. Rather than having each AssetOwner query
+its own holdings, agents, incomes and debts and save itself several times,
+WeeklyEconomy loads every owner and their weekly transactions in a handful
+of queries, works out the vault and fame changes in memory, and then writes
+all the changed owners back in bulk.
+
+The results match AssetOwner.do_weekly_adjustment, which is kept as the
+legacy path. A dry run produces the WeeklyReport text, and the text of any
+project reports, without saving anything, so that staff can compare the two.
+"""
+import traceback
+from collections import defaultdict
+
+from django.db.models import Q
+
+from world.dominion.domain.models import Domain
+from world.dominion.models import (
+    AssetOwner,
+    AccountTransaction,
+    Agent,
+    LIFESTYLES,
+    PRESTIGE_DECAY_AMOUNT,
+)
+from world.dominion.prestige import invalidate_rankings
+from world.dominion.reports import ProjectReport, WeeklyReport
+
+
+class WeeklyEconomy(object):
+    """
+    Calculates weekly income, costs, lifestyle payments and prestige decay for
+    many AssetOwners at once.
+
+    Owners are the cached instances from the idmapper, and all changes are made
+    to them in memory as they're calculated, exactly as the legacy path would
+    see them. save() then writes every owner we changed with a single
+    bulk_update, or puts back their original values for a dry run.
+    """
+
+    SAVED_FIELDS = ("vault", "fame")
+
+    def __init__(self, week, inform_creator=None, dry_run=False):
+        """
+        Args:
+            week (int): The week we're processing
+            inform_creator: A BulkInformCreator for reports. One is made for dry runs.
+            dry_run (bool): If True, nothing is saved and reports are not sent.
+        """
+        if dry_run and not inform_creator:
+            from typeclasses.scripts.weekly_events import BulkInformCreator
+
+            inform_creator = BulkInformCreator(week=week)
+        self.week = week
+        self.inform_creator = inform_creator
+        self.dry_run = dry_run
+        self.owners = {}
+        self.original_values = {}
+        self.changed = set()
+        self.incomes = defaultdict(list)
+        self.unpaid_debts = defaultdict(int)
+        self.agent_costs = defaultdict(int)
+        self.active_ids = set()
+        self.holdings = defaultdict(list)
+        self.project_reports = []
+
+    @staticmethod
+    def get_weekly_owner_ids(last_id=0):
+        """
+        Returns IDs of AssetOwners who get a weekly adjustment, in order.
+
+            Args:
+                last_id (int): Only return IDs higher than this
+        """
+        return list(
+            AssetOwner.objects.filter(
+                Q(organization_owner__isnull=False)
+                | (
+                    Q(player__player__roster__roster__name="Active")
+                    & Q(player__player__roster__frozen=False)
+                )
+            )
+            .filter(id__gt=last_id)
+            .distinct()
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def run(self, owner_ids=None, decay=True):
+        """
+        Does the whole weekly economy at once.
+
+            Args:
+                owner_ids (list): Owners to adjust. Defaults to get_weekly_owner_ids.
+                decay (bool): Whether to decay the fame of every owner first
+
+            Returns:
+                A dict of report receivers to their report text.
+        """
+        if owner_ids is None:
+            owner_ids = self.get_weekly_owner_ids()
+        try:
+            if decay:
+                self.load_owners()
+                self.decay_prestige()
+            self.do_weekly_adjustments(owner_ids)
+        finally:
+            self.save()
+        return self.report_texts
+
+    def load_owners(self, owner_ids=None):
+        """
+        Loads AssetOwners we don't have yet, along with what we need to name them,
+        in one query.
+
+            Args:
+                owner_ids: IDs of the owners to load, or None to load all of them
+        """
+        qs = AssetOwner.objects.select_related("player__player", "organization_owner")
+        if owner_ids is not None:
+            owner_ids = set(owner_ids).difference(self.owners)
+            if not owner_ids:
+                return
+            qs = qs.filter(id__in=owner_ids)
+        for owner in qs:
+            self.owners.setdefault(owner.id, owner)
+
+    def get_owner(self, owner_id):
+        """Gets an owner by ID, loading any we haven't seen"""
+        if owner_id not in self.owners:
+            self.owners[owner_id] = AssetOwner.objects.get(id=owner_id)
+        return self.owners[owner_id]
+
+    def adjust(self, owner, field, amount):
+        """
+        Changes a field of an owner in memory, remembering the original value so
+        that a dry run can restore it.
+
+            Args:
+                owner (AssetOwner): The owner we're changing
+                field (str): vault or fame
+                amount (int): The amount to add
+        """
+        if not amount:
+            return
+        if owner.id not in self.original_values:
+            self.original_values[owner.id] = {
+                name: getattr(owner, name) for name in self.SAVED_FIELDS
+            }
+        setattr(owner, field, getattr(owner, field) + amount)
+        self.changed.add(owner.id)
+        if field == "fame":
+            owner.clear_cached_properties()
+
+    def decay_prestige(self):
+        """Decays the fame of every owner, as prestige_decay does"""
+        for owner in self.owners.values():
+            self.adjust(owner, "fame", -int(owner.fame * PRESTIGE_DECAY_AMOUNT))
+
+    def load_transactions(self, owner_ids):
+        """
+        Loads the weekly incomes, debts with no receiver, agent costs and
+        holdings of the owners.
+
+            Args:
+                owner_ids (list): IDs of owners we're adjusting
+        """
+        related = (
+            "sender__player__player",
+            "sender__organization_owner",
+            "receiver__player__player",
+            "receiver__organization_owner",
+        )
+        for income in (
+            AccountTransaction.objects.filter(receiver__in=owner_ids, do_weekly=True)
+            .select_related(*related)
+            .order_by("id")
+        ):
+            self.incomes[income.receiver_id].append(income)
+        for sender_id, amount in AccountTransaction.objects.filter(
+            sender__in=owner_ids, receiver__isnull=True, do_weekly=True
+        ).values_list("sender", "weekly_amount"):
+            self.unpaid_debts[sender_id] += amount
+        for owner_id, cost, quantity in Agent.objects.filter(
+            owner__in=owner_ids
+        ).values_list("owner", "cost_per_guard", "quantity"):
+            self.agent_costs[owner_id] += cost * quantity
+        self.active_ids = set(
+            AssetOwner.objects.filter(
+                id__in=owner_ids, player__player__roster__roster__name="Active"
+            ).values_list("id", flat=True)
+        )
+        self.load_holdings(owner_ids)
+
+    def load_holdings(self, owner_ids):
+        """
+        Loads the domains of the owners' estates, along with their armies, units
+        and projects, in one query each.
+
+            Args:
+                owner_ids (list): IDs of owners we're adjusting
+        """
+        for domain in (
+            Domain.objects.filter(ruler__house__in=owner_ids)
+            .select_related("ruler")
+            .prefetch_related("armies__units", "projects")
+            .order_by("id")
+        ):
+            self.holdings[domain.ruler.house_id].append(domain)
+
+    def forget_holdings(self):
+        """
+        Drops the querysets prefetched for our domains once we're done, so that
+        anything changed later is queried again.
+        """
+        for domains in self.holdings.values():
+            for domain in domains:
+                for army in domain.armies.all():
+                    army._prefetched_objects_cache.pop("units", None)
+                domain._prefetched_objects_cache.pop("armies", None)
+                domain._prefetched_objects_cache.pop("projects", None)
+        self.holdings = defaultdict(list)
+
+    def do_weekly_adjustments(self, owner_ids):
+        """
+        Adjusts each owner in order. Errors are caught per owner so that one bad
+        owner doesn't stop the rest.
+
+            Args:
+                owner_ids (list): IDs of owners we're adjusting
+        """
+        self.load_transactions(owner_ids)
+        senders = [
+            income.sender_id for incomes in self.incomes.values() for income in incomes
+        ]
+        self.load_owners(list(owner_ids) + senders)
+        try:
+            for owner_id in owner_ids:
+                owner = self.get_owner(owner_id)
+                try:
+                    self.adjust_owner(owner)
+                except Exception as err:
+                    traceback.print_exc()
+                    print("Error in %s's weekly adjustment: %s" % (owner, err))
+        finally:
+            self.forget_holdings()
+
+    def adjust_owner(self, owner):
+        """
+        Works out the weekly change to an owner's vault and sends their report.
+        This mirrors AssetOwner.do_weekly_adjustment.
+
+            Args:
+                owner (AssetOwner): The owner we're adjusting
+
+            Returns:
+                The amount the owner's vault changed from income and costs.
+        """
+        amount = 0
+        report = None
+        npc = True
+        inform_target = owner.inform_target
+        if inform_target and inform_target.can_receive_informs:
+            report = WeeklyReport(inform_target, self.week, self.inform_creator)
+            npc = False
+        amount += self.get_holdings_income(owner, report, npc)
+        amount -= self.agent_costs[owner.id]
+        for income in self.incomes[owner.id]:
+            amount += self.process_payment(income, report)
+        if owner.organization_owner:
+            amount += owner.organization_owner.amount
+        amount -= self.unpaid_debts[owner.id]
+        self.adjust(owner, "vault", amount)
+        if owner.id in self.active_ids:
+            self.pay_lifestyle(owner, report)
+        if report:
+            report.record_income(owner.vault, amount)
+            report.send_report()
+        return amount
+
+    def get_holdings_income(self, owner, report, npc):
+        """
+        Gets the income of an owner's domains. Domains feed their armies and
+        advance their projects as part of this, which a dry run only projects.
+        """
+        amount = 0
+        for domain in self.holdings[owner.id]:
+            if self.dry_run and not npc:
+                amount += self.project_domain_income(domain, report)
+            else:
+                amount += domain.do_weekly_adjustment(self.week, report, npc)
+        return amount
+
+    def project_domain_income(self, domain, report):
+        """
+        Works out what Domain.do_weekly_adjustment would return without saving
+        anything. Armies eat the domain's food and charge their owner for the
+        rest, as Army.consume_food does, and the reports of projects that would
+        finish are added to project_reports.
+
+            Returns:
+                The domain's income for the week.
+        """
+        loot = 0
+        stored_food = domain.stored_food
+        for army in domain.armies.all():
+            hunger = army.get_food_consumption()
+            consumed = min(stored_food, hunger)
+            stored_food -= consumed
+            cost = (hunger - consumed) * 10
+            payer_id = army.temp_owner_id or army.owner_id
+            if cost and payer_id:
+                self.adjust(self.get_owner(payer_id), "vault", -cost)
+            report.add_army_consumption_report(army, food=consumed, silver=cost)
+            loot += army.plunder
+        for project in domain.projects.all():
+            if project.time_remaining <= 1:
+                report.projects += 1
+                text = ProjectReport.get_project_text(project, project.get_new_total())
+                self.project_reports.append((report.owner, text))
+        return (domain.total_income + loot) - domain.costs
+
+    def process_payment(self, transaction, report=None):
+        """
+        Pays a transaction from its sender's vault in memory, as
+        AccountTransaction.process_payment does.
+
+            Returns:
+                The amount received.
+        """
+        if not transaction.sender_id:
+            return transaction.weekly_amount
+        sender = self.get_owner(transaction.sender_id)
+        if sender.vault >= transaction.weekly_amount:
+            if report:
+                report.add_payment(transaction)
+            self.adjust(sender, "vault", -transaction.weekly_amount)
+            return transaction.weekly_amount
+        if report:
+            report.payment_fail(transaction)
+        return 0
+
+    def pay_lifestyle(self, owner, report=None):
+        """
+        Pays for a character's lifestyle and adjusts their prestige, as
+        PlayerOrNpc.pay_lifestyle does.
+
+            Returns:
+                True if someone could pay, False otherwise.
+        """
+        dompc = owner.player
+        cost, prestige = LIFESTYLES.get(dompc.lifestyle_rating, (0, 0))
+        try:
+            clout = dompc.player.char_ob.social_clout
+            bonus = int(prestige * clout * 3 * 0.01)
+            if bonus > 0:
+                prestige += bonus
+        except (AttributeError, TypeError, ValueError):
+            pass
+        if owner.vault > cost:
+            return self.charge_lifestyle(owner, owner, cost, prestige, report)
+        orgs = [
+            org for org in dompc.current_orgs if org.access(dompc.player, "withdraw")
+        ]
+        if not orgs:
+            return False
+        for org in orgs:
+            payer = self.get_owner(org.assets.id)
+            if payer.vault > cost:
+                return self.charge_lifestyle(payer, owner, cost, prestige, report)
+        # no one could pay for us
+        if report:
+            report.lifestyle_msg = (
+                "You were unable to afford to pay for your lifestyle.\n"
+            )
+        return False
+
+    def charge_lifestyle(self, payer, owner, cost, prestige, report=None):
+        """Makes a lifestyle payment, adjusts prestige, and notes it in the report"""
+        self.adjust(payer, "vault", -cost)
+        self.adjust(owner, "fame", prestige)
+        payname = "You" if payer == owner else str(payer)
+        if report:
+            report.lifestyle_msg = (
+                "%s paid %s for your lifestyle and you gained %s prestige.\n"
+                % (payname, cost, prestige)
+            )
+        return True
+
+    def save(self):
+        """
+        Writes every owner we changed in one bulk_update. For a dry run, we put
+        back the values we started with instead.
+        """
+        changed = [self.owners[owner_id] for owner_id in self.changed]
+        if self.dry_run:
+            for owner in changed:
+                for field, value in self.original_values[owner.id].items():
+                    setattr(owner, field, value)
+                owner.clear_cached_properties()
+        elif changed:
+            AssetOwner.objects.bulk_update(changed, self.SAVED_FIELDS, batch_size=500)
+            for owner in changed:
+                owner.clear_cached_properties()
+            invalidate_rankings()
+        self.changed = set()
+        self.original_values = {}
+
+    @property
+    def report_texts(self):
+        """A dict of receivers to the text of the reports we've made for them"""
+        if not self.inform_creator:
+            return {}
+        return {
+            inform.player or inform.organization: inform.message
+            for inform in self.inform_creator.informs
+            if inform.category == "synopsis"
+        }
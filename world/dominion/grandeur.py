@@ -0,0 +1,211 @@
+"""
+Grandeur is the prestige an AssetOwner gets from the people and organizations
+they're connected to: their patron, their proteges, the orgs they belong to,
+or for an org, its active members. Each of those contributes its
+base_grandeur, which means that working out one large house's grandeur used
+to query every member and every member's memberships in turn.
+
+GrandeurGraph loads all of those connections at once, and remembers each
+owner's base_grandeur and grandeur until something changes. A change to an
+owner's fame or legend only forgets the values of that owner and the owners
+connected to them, while a change to memberships or patronage reloads the
+connections.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+
+class GrandeurGraph(object):
+    """
+    The patron, protege and membership connections between AssetOwners, along
+    with the grandeur values we've worked out from them. All of it is keyed by
+    AssetOwner ID.
+    """
+
+    # how long until we reload connections, to catch roster changes
+    REFRESH_INTERVAL = timedelta(days=1)
+
+    def __init__(self):
+        self.last_load = None
+        self.patrons = {}
+        self.proteges = defaultdict(list)
+        self.memberships = defaultdict(list)
+        self.members = defaultdict(list)
+        self.dependents = defaultdict(set)
+        self.base_values = {}
+        self.results = {}
+
+    def load_connections(self):
+        """Loads every patron, protege and membership connection in three queries"""
+        from world.dominion.models import Member, PlayerOrNpc
+
+        self.patrons = {}
+        self.proteges = defaultdict(list)
+        self.memberships = defaultdict(list)
+        self.members = defaultdict(list)
+        self.dependents = defaultdict(set)
+        self.results = {}
+        for owner_id, patron_id in PlayerOrNpc.objects.filter(
+            assets__isnull=False, patron__assets__isnull=False
+        ).values_list("assets", "patron__assets"):
+            self.patrons[owner_id] = patron_id
+            self.proteges[patron_id].append(owner_id)
+            self.add_dependency(owner_id, patron_id)
+            self.add_dependency(patron_id, owner_id)
+        # the orgs that a character gets grandeur from
+        for owner_id, org_id, rank in (
+            Member.objects.filter(
+                deguilded=False,
+                secret=False,
+                organization__secret=False,
+                player__assets__isnull=False,
+            )
+            .order_by("id")
+            .values_list("player__assets", "organization__assets", "rank")
+        ):
+            self.memberships[owner_id].append((org_id, rank))
+            self.add_dependency(owner_id, org_id)
+        # the active members that an org gets grandeur from
+        active_members = (
+            Member.objects.filter(
+                deguilded=False,
+                organization__assets__isnull=False,
+                player__player__roster__roster__name="Active",
+            )
+            .order_by("id")
+            .values_list("id", "organization__assets", "player__assets", "rank")
+        )
+        for _, org_id, owner_id, rank in {
+            row[0]: row for row in active_members
+        }.values():
+            self.members[org_id].append((owner_id, rank))
+            self.add_dependency(org_id, owner_id)
+        self.last_load = datetime.now()
+
+    def add_dependency(self, owner_id, source_id):
+        """Notes that an owner's grandeur uses the base_grandeur of source_id"""
+        if source_id is not None:
+            self.dependents[source_id].add(owner_id)
+
+    def ensure_loaded(self):
+        """Loads our connections if we don't have them or they're out of date"""
+        if (
+            not self.last_load
+            or datetime.now() - self.last_load >= self.REFRESH_INTERVAL
+        ):
+            self.load_connections()
+
+    def invalidate(self):
+        """Forgets everything, so that connections and values are all reloaded"""
+        self.last_load = None
+        self.base_values = {}
+        self.results = {}
+
+    def invalidate_connections(self):
+        """Reloads connections the next time they're used, such as after a membership changes"""
+        self.last_load = None
+        self.results = {}
+
+    def invalidate_owner(self, owner_id):
+        """
+        Forgets the values of an owner after their fame, legend or propriety
+        changes, along with the grandeur of everyone who used their base_grandeur.
+        """
+        self.base_values.pop(owner_id, None)
+        self.results.pop(owner_id, None)
+        for dependent_id in self.dependents.get(owner_id, ()):
+            self.results.pop(dependent_id, None)
+
+    def load_base_values(self, owner_ids):
+        """
+        Works out the base_grandeur of any owners we don't have yet, fetching the
+        ones that aren't already in memory in one query.
+        """
+        from world.dominion.models import AssetOwner
+
+        missing = set(owner_ids).difference(self.base_values)
+        missing.discard(None)
+        if not missing:
+            return
+        owners = {}
+        for owner_id in missing:
+            owner = AssetOwner.get_cached_instance(owner_id)
+            if owner:
+                owners[owner_id] = owner
+        owners.update(AssetOwner.objects.in_bulk(missing.difference(owners)))
+        for owner_id, owner in owners.items():
+            self.base_values[owner_id] = owner.base_grandeur
+
+    def load_all_base_values(self):
+        """Works out the base_grandeur of everyone with a connection at once"""
+        self.ensure_loaded()
+        self.load_base_values(self.dependents.keys())
+
+    def get_base_grandeur(self, owner_id):
+        """Returns the base_grandeur of an owner, or 0 if they're missing"""
+        return self.base_values.get(owner_id, 0)
+
+    def get_grandeur(self, owner):
+        """
+        Returns the grandeur of an owner, working it out if we haven't already.
+
+            Args:
+                owner (AssetOwner): The owner whose grandeur we want
+
+            Returns:
+                The grandeur as an int.
+        """
+        self.ensure_loaded()
+        if owner.id not in self.results:
+            if owner.organization_owner_id:
+                value = self.get_grandeur_from_members(owner)
+            else:
+                self.load_base_values(
+                    [self.patrons.get(owner.id)]
+                    + self.proteges[owner.id]
+                    + [org_id for org_id, _ in self.memberships[owner.id]]
+                )
+                value = self.get_grandeur_from_patron(owner.id)
+                value += self.get_grandeur_from_proteges(owner.id)
+                value += self.get_grandeur_from_orgs(owner.id)
+            self.results[owner.id] = value
+        return self.results[owner.id]
+
+    def get_grandeur_from_patron(self, owner_id):
+        """Gets our grandeur value from our patron, if we have one"""
+        return self.get_base_grandeur(self.patrons.get(owner_id))
+
+    def get_grandeur_from_proteges(self, owner_id):
+        """Gets grandeur value from each of our proteges, if any"""
+        return sum(self.get_base_grandeur(ob) for ob in self.proteges[owner_id])
+
+    def get_grandeur_from_orgs(self, owner_id):
+        """Gets grandeur value from orgs we're a member of."""
+        base = 0
+        memberships = self.memberships[owner_id]
+        too_many_org_penalty = max(len(memberships) * 0.5, 1.0)
+        for org_id, rank in memberships:
+            rank_divisor = max(rank, 1)
+            grandeur = self.get_base_grandeur(org_id) / rank_divisor
+            grandeur /= too_many_org_penalty
+            base += grandeur
+        return int(base)
+
+    def get_grandeur_from_members(self, owner):
+        """Gets grandeur for an org from its members"""
+        members = self.members[owner.id]
+        self.load_base_values([member_id for member_id, _ in members])
+        base = 0
+        ranks = 0
+        for member_id, rank in members:
+            rank_divisor = max(rank, 1)
+            grandeur = self.get_base_grandeur(member_id) / rank_divisor
+            base += grandeur
+            ranks += 11 - rank
+        too_many_members_mod = max(ranks / 200.0, 0.01)
+        base /= too_many_members_mod
+        sign = -1 if base < 0 else 1
+        return min(abs(int(base)), abs(owner.fame + owner.legend) * 2) * sign
+
+
+GRANDEUR_GRAPH = GrandeurGraph()
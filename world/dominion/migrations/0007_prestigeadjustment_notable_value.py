@@ -0,0 +1,40 @@
+# Generated by Django 2.2.24 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+def set_notable_values(apps, schema_editor):
+    from world.dominion.models import PrestigeAdjustment as LivePrestigeAdjustment
+
+    PrestigeAdjustment = apps.get_model("dominion", "PrestigeAdjustment")
+    adjustments = []
+    for adjustment in PrestigeAdjustment.objects.all().iterator():
+        adjustment.notable_value = LivePrestigeAdjustment.get_notable_value(
+            adjustment.adjusted_by, adjustment.adjustment_type, adjustment.adjusted_on
+        )
+        adjustments.append(adjustment)
+    PrestigeAdjustment.objects.bulk_update(
+        adjustments, ["notable_value"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dominion", "0006_plotaction_episode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prestigeadjustment",
+            name="notable_value",
+            field=models.FloatField(
+                db_index=True,
+                default=0,
+                help_text="Sorts adjustments of the same type in the order of their effective value",
+            ),
+        ),
+        migrations.RunPython(
+            set_notable_values, migrations.RunPython.noop, elidable=False
+        ),
+    ]
@@ -53,6 +53,7 @@ that currently have a ruler designated will change on a weekly basis.
 """
 from collections import namedtuple
 from datetime import datetime, timedelta
+from math import log
 from random import randint, choice as random_choice
 from typing import List
 
@@ -69,6 +70,8 @@ import typeclasses.npcs.constants
 from typeclasses.mixins import InformMixin
 from world.dominion.domain.models import LAND_SIZE, LAND_COORDS
 from world.dominion.reports import WeeklyReport
+from world.dominion.grandeur import GRANDEUR_GRAPH
+from world.dominion.prestige import PRESTIGE_RANKINGS, update_rankings
 from world.dominion.agenthandler import AgentHandler
 from world.dominion.managers import OrganizationManager, LandManager, RPEventQuerySet
 from world.dominion.plots.models import Plot, PlotAction, PCPlotInvolvement
@@ -97,6 +100,8 @@ LIFESTYLES = {
 }
 PRESTIGE_DECAY_AMOUNT = 0.50
 MAX_PRESTIGE_HISTORY = 10
+# fame adjustments are ranked by how much they've decayed since this date
+NOTABLE_EPOCH = datetime(2000, 1, 1)
 
 
 # Create your models here.
@@ -144,6 +149,11 @@ class PlayerOrNpc(SharedMemoryModel):
     # bonus to all military combat commands
     warfare = models.PositiveSmallIntegerField(default=0, blank=True)
 
+    def save(self, *args, **kwargs):
+        """Saves changes and reloads grandeur connections, which use our patron"""
+        super(PlayerOrNpc, self).save(*args, **kwargs)
+        GRANDEUR_GRAPH.invalidate_connections()
+
     def __str__(self):
         if self.player:
             name = self.player.key.capitalize()
@@ -684,6 +694,45 @@ class PrestigeAdjustment(SharedMemoryModel):
     adjusted_by = models.IntegerField(default=0)
     reason = models.TextField(blank=True, null=True)
     long_reason = models.TextField(blank=True, null=True)
+    notable_value = models.FloatField(
+        default=0,
+        db_index=True,
+        help_text="Sorts adjustments of the same type in the order of their effective value",
+    )
+
+    def save(self, *args, **kwargs):
+        """Sets our notable_value before saving"""
+        self.notable_value = self.get_notable_value(
+            self.adjusted_by, self.adjustment_type, self.adjusted_on or datetime.now()
+        )
+        super(PrestigeAdjustment, self).save(*args, **kwargs)
+
+    @classmethod
+    def get_notable_value(cls, adjusted_by, adjustment_type, adjusted_on):
+        """
+        Gets a value that sorts adjustments of one type the same way that their
+        effective_value would, but which doesn't change over time. Legend doesn't
+        decay, so that's just the amount. Fame is halved every week, so the log of
+        its decayed value is the log of the amount minus the weeks it's decayed for.
+        Since every adjustment decays until the same present, counting the weeks
+        since NOTABLE_EPOCH instead keeps the order the same, ignoring the weekly
+        step. The sign is kept so that negative adjustments sort below zero.
+
+            Args:
+                adjusted_by (int): The amount of the adjustment
+                adjustment_type (int): FAME or LEGEND
+                adjusted_on (datetime): When the adjustment happened
+
+            Returns:
+                The notable value as a float.
+        """
+        if adjustment_type == cls.LEGEND:
+            return float(adjusted_by)
+        if not adjusted_by:
+            return 0.0
+        weeks = (adjusted_on - NOTABLE_EPOCH).total_seconds() / (7 * 24 * 60 * 60)
+        value = log(abs(adjusted_by)) + weeks * log(1 / PRESTIGE_DECAY_AMOUNT)
+        return value if adjusted_by > 0 else -value
 
     @property
     def effective_value(self):
@@ -931,152 +980,29 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
     min_resources_for_inform = models.PositiveIntegerField(default=0)
     min_materials_for_inform = models.PositiveIntegerField(default=0)
 
-    _AVERAGE_PRESTIGE = {"last_check": None, "last_value": 0}
-    _AVERAGE_FAME = {"last_check": None, "last_value": 0}
-    _AVERAGE_LEGEND = {"last_check": None, "last_value": 0}
-    _MEDIAN_PRESTIGE = {"last_check": None, "last_value": 0}
-    _MEDIAN_FAME = {"last_check": None, "last_value": 0}
-    _MEDIAN_LEGEND = {"last_check": None, "last_value": 0}
-
     @classproperty
     def AVERAGE_PRESTIGE(cls):
-        last_check = cls._AVERAGE_PRESTIGE["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._AVERAGE_PRESTIGE["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-            assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
-            total = 0
-            for asset in assets:
-                total += asset.prestige
-            total = total / len(assets)
-            cls._AVERAGE_PRESTIGE["last_value"] = total
-
-        return cls._AVERAGE_PRESTIGE["last_value"]
+        return PRESTIGE_RANKINGS.average("prestige")
 
     @classproperty
     def MEDIAN_PRESTIGE(cls):
-        last_check = cls._MEDIAN_PRESTIGE["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._MEDIAN_PRESTIGE["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-            assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
-
-            median = assets[len(assets) // 2].prestige
-
-            cls._MEDIAN_PRESTIGE["last_value"] = median
-
-        return cls._MEDIAN_PRESTIGE["last_value"]
+        return PRESTIGE_RANKINGS.median("prestige")
 
     @classproperty
     def AVERAGE_FAME(cls):
-        last_check = cls._AVERAGE_FAME["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._AVERAGE_FAME["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                ).order_by("-fame")
-            )
-            total = 0
-            for asset in assets:
-                total += asset.fame
-            total = total / len(assets)
-            cls._AVERAGE_FAME["last_value"] = total
-
-        return cls._AVERAGE_FAME["last_value"]
+        return PRESTIGE_RANKINGS.average("fame")
 
     @classproperty
     def MEDIAN_FAME(cls):
-        last_check = cls._MEDIAN_FAME["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._MEDIAN_FAME["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-            assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
-
-            median = assets[len(assets) / 2].fame
-
-            cls._MEDIAN_FAME["last_value"] = median
-
-        return cls._MEDIAN_FAME["last_value"]
+        return PRESTIGE_RANKINGS.median("fame")
 
     @classproperty
     def AVERAGE_LEGEND(cls):
-        last_check = cls._AVERAGE_LEGEND["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._AVERAGE_LEGEND["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-            assets = sorted(assets, key=lambda x: x.total_legend, reverse=True)
-            total = 0
-            for asset in assets:
-                total += asset.total_legend
-            total = total / len(assets)
-            cls._AVERAGE_LEGEND["last_value"] = total
-
-        return cls._AVERAGE_LEGEND["last_value"]
+        return PRESTIGE_RANKINGS.average("legend")
 
     @classproperty
     def MEDIAN_LEGEND(cls):
-        last_check = cls._MEDIAN_LEGEND["last_check"]
-        now = datetime.now()
-        if not last_check or (now - last_check).days >= 1:
-            cls._MEDIAN_LEGEND["last_check"] = now
-            assets = list(
-                AssetOwner.objects.filter(
-                    player__player__roster__roster__name__in=(
-                        "Active",
-                        "Gone",
-                        "Available",
-                    )
-                )
-            )
-            assets = sorted(assets, key=lambda x: x.prestige, reverse=True)
-
-            median = assets[len(assets) / 2].total_legend
-
-            cls._MEDIAN_LEGEND["last_value"] = median
-
-        return cls._MEDIAN_LEGEND["last_value"]
+        return PRESTIGE_RANKINGS.median("legend")
 
     @CachedProperty
     def prestige(self):
@@ -1226,63 +1152,17 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
     @property
     def grandeur(self):
         """Value used for prestige that represents prestige from external sources"""
-        if self.organization_owner:
-            return self.get_grandeur_from_members()
-        val = 0
-        val += self.get_grandeur_from_patron()
-        val += self.get_grandeur_from_proteges()
-        val += self.get_grandeur_from_orgs()
-        return val
+        return GRANDEUR_GRAPH.get_grandeur(self)
 
     @property
     def base_grandeur(self):
         """The amount we contribute to other people when they're totalling up grandeur"""
         return int(self.fame / 10.0 + self.total_legend / 10.0 + self.propriety / 10.0)
 
-    def get_grandeur_from_patron(self):
-        """Gets our grandeur value from our patron, if we have one"""
-        try:
-            return self.player.patron.assets.base_grandeur
-        except AttributeError:
-            return 0
-
-    def get_grandeur_from_proteges(self):
-        """Gets grandeur value from each of our proteges, if any"""
-        base = 0
-        for protege in self.player.proteges.all():
-            base += protege.assets.base_grandeur
-        return base
-
-    def get_grandeur_from_orgs(self):
-        """Gets grandeur value from orgs we're a member of."""
-        base = 0
-        memberships = list(
-            self.player.memberships.filter(
-                deguilded=False, secret=False, organization__secret=False
-            ).distinct()
-        )
-        too_many_org_penalty = max(len(memberships) * 0.5, 1.0)
-        for member in memberships:
-            rank_divisor = max(member.rank, 1)
-            grandeur = member.organization.assets.base_grandeur / rank_divisor
-            grandeur /= too_many_org_penalty
-            base += grandeur
-        return int(base)
-
-    def get_grandeur_from_members(self):
-        """Gets grandeur for an org from its members"""
-        base = 0
-        members = list(self.organization_owner.active_members)
-        ranks = 0
-        for member in members:
-            rank_divisor = max(member.rank, 1)
-            grandeur = member.player.assets.base_grandeur / rank_divisor
-            base += grandeur
-            ranks += 11 - member.rank
-        too_many_members_mod = max(ranks / 200.0, 0.01)
-        base /= too_many_members_mod
-        sign = -1 if base < 0 else 1
-        return min(abs(int(base)), abs(self.fame + self.legend) * 2) * sign
+    def clear_cached_properties(self):
+        """Clears our cached properties, and the grandeur of anyone connected to us"""
+        super(AssetOwner, self).clear_cached_properties()
+        GRANDEUR_GRAPH.invalidate_owner(self.id)
 
     # noinspection PyMethodMayBeStatic
     def store_prestige_record(
@@ -1296,10 +1176,7 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
         if not category:
             return
 
-        old_adjustments = PrestigeAdjustment.objects.filter(
-            asset_owner=self, adjustment_type=adjustment_type
-        )
-        new_adjustment = PrestigeAdjustment.objects.create(
+        PrestigeAdjustment.objects.create(
             asset_owner=self,
             category=category,
             adjustment_type=adjustment_type,
@@ -1307,28 +1184,31 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
             reason=reason,
             long_reason=long_reason,
         )
-
-        if old_adjustments.count() >= MAX_PRESTIGE_HISTORY:
-            # Remove our least-notable adjustments to get us back under the limit
-            extras = old_adjustments.count() - MAX_PRESTIGE_HISTORY
-            for i in range(0, extras + 1):
-                least = new_adjustment
-                for adjustment in old_adjustments.all():
-                    if adjustment.effective_value < least.effective_value:
-                        least = adjustment
-
-                least.delete()
+        # Remove our least-notable adjustments to get us back under the limit
+        extras = list(
+            self.prestige_adjustments.filter(adjustment_type=adjustment_type)
+            .order_by("-notable_value", "-id")
+            .values_list("id", flat=True)[MAX_PRESTIGE_HISTORY:]
+        )
+        if extras:
+            PrestigeAdjustment.objects.filter(id__in=extras).delete()
 
     def most_notable_adjustment(self, adjust_type=None):
-        greatest = None
-        adjustments = PrestigeAdjustment.objects.filter(asset_owner=self)
+        """
+        Returns our adjustment with the highest effective value, of the given type
+        if any. Notable values only sort adjustments of the same type, so without a
+        type we compare the most notable of each.
+        """
+        adjustments = self.prestige_adjustments.order_by("-notable_value", "-id")
         if adjust_type:
-            adjustments = adjustments.filter(adjustment_type=adjust_type)
-
-        for adjustment in adjustments.all():
-            if not greatest or adjustment.effective_value > greatest.effective_value:
+            return adjustments.filter(adjustment_type=adjust_type).first()
+        greatest = None
+        for adjust_type, _ in PrestigeAdjustment.PRESTIGE_TYPES:
+            adjustment = adjustments.filter(adjustment_type=adjust_type).first()
+            if adjustment and (
+                not greatest or adjustment.effective_value > greatest.effective_value
+            ):
                 greatest = adjustment
-
         return greatest
 
     def adjust_prestige(self, value, category=None, reason=None, long_reason=None):
@@ -1338,6 +1218,7 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
         """
         self.fame += value
         self.save()
+        update_rankings(self)
 
         if category:
             self.store_prestige_record(
@@ -1354,6 +1235,7 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
         """
         self.legend += value
         self.save()
+        update_rankings(self)
 
         if category:
             self.store_prestige_record(
@@ -1412,6 +1294,7 @@ class AssetOwner(CachedPropertiesMixin, SharedMemoryModel):
         """Decreases our fame for the week"""
         self.fame -= int(self.fame * PRESTIGE_DECAY_AMOUNT)
         self.save()
+        update_rankings(self)
 
     def do_weekly_adjustment(self, week, inform_creator=None):
         """
@@ -2589,6 +2472,8 @@ class Organization(InformMixin, SharedMemoryModel):
             self.assets.clear_cached_properties()
         except (AttributeError, ValueError, TypeError):
             pass
+        # secrecy changes who gets grandeur from us
+        GRANDEUR_GRAPH.invalidate_connections()
         # make sure that any cached AP modifiers based on Org fealties are invalidated
         from web.character.models import RosterEntry
 
@@ -3211,6 +3096,16 @@ class Member(SharedMemoryModel):
     def __repr__(self):
         return "<Member %s (#%s)>" % (self.player, self.id)
 
+    def save(self, *args, **kwargs):
+        """Saves changes and reloads grandeur connections, which use our rank"""
+        super(Member, self).save(*args, **kwargs)
+        GRANDEUR_GRAPH.invalidate_connections()
+
+    def delete(self, *args, **kwargs):
+        """Deletes us and reloads grandeur connections"""
+        super(Member, self).delete(*args, **kwargs)
+        GRANDEUR_GRAPH.invalidate_connections()
+
     def fake_delete(self):
         """
         Alternative to deleting this object. That way we can just readd them if they
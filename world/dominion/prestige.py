@@ -0,0 +1,210 @@
+"""
+Rankings of AssetOwners by prestige, fame and legend. Working out prestige
+means totalling grandeur from patrons, proteges and organizations, so rather
+than sorting every owner each time we need an average, a median or someone's
+rank, PrestigeRankings computes every owner's values in one pass and keeps
+them in sorted indexes. Ranks are then found with a binary search, and a
+change to one owner's fame or legend only moves that owner in the indexes.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+RANKED_ROSTERS = ("Active", "Gone", "Available")
+RANKED_FIELDS = ("prestige", "fame", "legend")
+
+
+class PrestigeRankings(object):
+    """
+    Sorted indexes of prestige, fame and legend for the AssetOwners of
+    characters on the given rosters. Each index is an ascending list of
+    (value, owner ID) tuples, so that ties are broken consistently.
+    """
+
+    # how long until we rescan everyone, to catch changes from grandeur or propriety
+    REFRESH_INTERVAL = timedelta(days=1)
+
+    def __init__(self, rosters=RANKED_ROSTERS):
+        self.rosters = rosters
+        self.values = {}
+        self.indexes = {field: [] for field in RANKED_FIELDS}
+        self.totals = {field: 0 for field in RANKED_FIELDS}
+        self.last_rebuild = None
+
+    @staticmethod
+    def get_owner_values(owner):
+        """Returns a dict of an owner's values for each of our indexes"""
+        return {
+            "prestige": owner.prestige,
+            "fame": owner.fame,
+            "legend": owner.total_legend,
+        }
+
+    def get_queryset(self):
+        """Returns the AssetOwners that we rank"""
+        from world.dominion.models import AssetOwner
+
+        return AssetOwner.objects.filter(
+            player__player__roster__roster__name__in=self.rosters
+        ).distinct()
+
+    def rebuild(self):
+        """Computes the values of every ranked owner and sorts them"""
+        from world.dominion.grandeur import GRANDEUR_GRAPH
+
+        self.values = {}
+        owners = list(self.get_queryset())
+        GRANDEUR_GRAPH.load_all_base_values()
+        for owner in owners:
+            self.values[owner.id] = self.get_owner_values(owner)
+        for field in RANKED_FIELDS:
+            self.indexes[field] = sorted(
+                (values[field], owner_id) for owner_id, values in self.values.items()
+            )
+            self.totals[field] = sum(value for value, _ in self.indexes[field])
+        self.last_rebuild = datetime.now()
+
+    def ensure_fresh(self):
+        """Rebuilds our indexes if they've never been built or are out of date"""
+        if (
+            not self.last_rebuild
+            or datetime.now() - self.last_rebuild >= self.REFRESH_INTERVAL
+        ):
+            self.rebuild()
+
+    def invalidate(self):
+        """Forces a rebuild the next time the rankings are used"""
+        self.last_rebuild = None
+
+    def remove_owner(self, owner_id):
+        """Removes an owner from our indexes, if they're in them"""
+        old_values = self.values.pop(owner_id, None)
+        if not old_values:
+            return
+        for field in RANKED_FIELDS:
+            index = self.indexes[field]
+            key = (old_values[field], owner_id)
+            pos = bisect_left(index, key)
+            if pos < len(index) and index[pos] == key:
+                del index[pos]
+                self.totals[field] -= old_values[field]
+
+    def update_owner(self, owner):
+        """
+        Moves an owner to their new place in each index after their values change.
+        Owners we aren't ranking are ignored until the next rebuild picks them up.
+
+            Args:
+                owner (AssetOwner): The owner whose fame, legend or prestige changed
+        """
+        if not self.last_rebuild or owner.id not in self.values:
+            return
+        self.remove_owner(owner.id)
+        values = self.get_owner_values(owner)
+        self.values[owner.id] = values
+        for field in RANKED_FIELDS:
+            insort(self.indexes[field], (values[field], owner.id))
+            self.totals[field] += values[field]
+
+    def rank(self, owner, field="prestige"):
+        """
+        Returns an owner's rank from highest to lowest, starting at 1, or None if
+        they aren't ranked.
+        """
+        self.ensure_fresh()
+        values = self.values.get(owner.id)
+        if not values:
+            return None
+        index = self.indexes[field]
+        return len(index) - bisect_right(index, (values[field], owner.id)) + 1
+
+    def average(self, field="prestige"):
+        """Returns the average value of a field for all ranked owners"""
+        self.ensure_fresh()
+        if not self.values:
+            return 0
+        return self.totals[field] / len(self.values)
+
+    def median(self, field="prestige"):
+        """Returns the middle value of a field, counting from the highest"""
+        self.ensure_fresh()
+        index = self.indexes[field]
+        if not index:
+            return 0
+        return index[len(index) - 1 - len(index) // 2][0]
+
+    def top(self, field="prestige", count=20, highest=True, negative_only=False):
+        """
+        Returns a list of the top owners for a field.
+
+            Args:
+                field (str): prestige, fame or legend
+                count (int): Max number of owners to return
+                highest (bool): Whether to start from the highest or lowest value
+                negative_only (bool): Only return owners whose value is below 0
+        """
+        from world.dominion.models import AssetOwner
+
+        self.ensure_fresh()
+        index = self.indexes[field]
+        if negative_only:
+            index = index[: bisect_left(index, (0,))]
+        if highest:
+            entries = index[-count:][::-1]
+        else:
+            entries = index[:count]
+        owners = AssetOwner.objects.in_bulk([owner_id for _, owner_id in entries])
+        return [owners[owner_id] for _, owner_id in entries if owner_id in owners]
+
+
+PRESTIGE_RANKINGS = PrestigeRankings()
+ACTIVE_PRESTIGE_RANKINGS = PrestigeRankings(rosters=("Active",))
+
+
+def get_ranked_dependents(owner):
+    """
+    Returns the ranked owners whose grandeur comes from an owner, with their
+    cached values cleared so that their prestige is worked out again.
+    """
+    from world.dominion.grandeur import GRANDEUR_GRAPH
+    from world.dominion.models import AssetOwner
+
+    built = [
+        rankings
+        for rankings in (PRESTIGE_RANKINGS, ACTIVE_PRESTIGE_RANKINGS)
+        if rankings.last_rebuild
+    ]
+    if not built:
+        return []
+    GRANDEUR_GRAPH.ensure_loaded()
+    dependent_ids = {
+        dependent_id
+        for dependent_id in GRANDEUR_GRAPH.dependents.get(owner.id, ())
+        if dependent_id != owner.id
+        and any(dependent_id in rankings.values for rankings in built)
+    }
+    dependents = {}
+    for dependent_id in dependent_ids:
+        dependent = AssetOwner.get_cached_instance(dependent_id)
+        if dependent:
+            dependents[dependent_id] = dependent
+    dependents.update(AssetOwner.objects.in_bulk(dependent_ids.difference(dependents)))
+    for dependent in dependents.values():
+        dependent.clear_cached_properties()
+    return list(dependents.values())
+
+
+def update_rankings(owner):
+    """
+    Updates an owner's place in all our rankings after their prestige changes,
+    along with everyone whose grandeur comes from them.
+    """
+    owners = [owner] + get_ranked_dependents(owner)
+    for rankings in (PRESTIGE_RANKINGS, ACTIVE_PRESTIGE_RANKINGS):
+        for ob in owners:
+            rankings.update_owner(ob)
+
+
+def invalidate_rankings():
+    """Forces all our rankings to be rebuilt, such as after a bulk change"""
+    for rankings in (PRESTIGE_RANKINGS, ACTIVE_PRESTIGE_RANKINGS):
+        rankings.invalidate()
@@ -35,13 +35,17 @@ class ProjectReport(Report):
         super(ProjectReport, self).__init__(owner, week, "project")
         self.generate_project_report()
 
+    @staticmethod
+    def get_project_text(project, new_total):
+        txt = "Project report: %s\n" % project.domain
+        txt += "Project type: %s\n" % project.get_type_display()
+        txt += "Amount increased: %s\n" % project.amount
+        txt += "New total: %s\n" % new_total
+        return txt
+
     def generate_project_report(self):
         report = self.get_or_create_report("project")
-        txt = "Project report: %s\n" % self.project.domain
-        txt += "Project type: %s\n" % self.project.get_type_display()
-        txt += "Amount increased: %s\n" % self.project.amount
-        txt += "New total: %s\n" % self.new_total
-        report.message += txt
+        report.message += self.get_project_text(self.project, self.new_total)
         report.save()
 
 
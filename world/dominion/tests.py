@@ -128,6 +128,117 @@ class TestDomainProgression(ArxCommandTest):
         self.assertEqual(domain.lawlessness, expected_lawlessness)
 
 
+class TestPrestigeRankings(ArxCommandTest):
+    num_additional_characters = 1
+
+    def test_rankings(self):
+        from world.dominion.models import AssetOwner
+        from world.dominion.prestige import PRESTIGE_RANKINGS
+
+        self.assetowner.fame = 1000
+        self.assetowner2.fame = 5000
+        self.assetowner3.fame = 3000
+        for owner in (self.assetowner, self.assetowner2, self.assetowner3):
+            owner.save()
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner2), 1)
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner3), 2)
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner), 3)
+        self.assertEqual(AssetOwner.MEDIAN_FAME, 3000)
+        self.assertEqual(AssetOwner.AVERAGE_FAME, 3000)
+        self.assertEqual(AssetOwner.MEDIAN_PRESTIGE, self.assetowner3.prestige)
+        # a change in prestige moves only that owner
+        self.assetowner.adjust_prestige(9000)
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner), 1)
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner2), 2)
+        self.assertEqual(AssetOwner.AVERAGE_FAME, 6000)
+        self.assertEqual(
+            PRESTIGE_RANKINGS.top("fame", 2), [self.assetowner, self.assetowner2]
+        )
+        self.assertEqual(PRESTIGE_RANKINGS.top(negative_only=True), [])
+        self.assetowner3.adjust_prestige(-10000)
+        self.assertEqual(
+            PRESTIGE_RANKINGS.top(highest=False, negative_only=True),
+            [self.assetowner3],
+        )
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner3), 3)
+        # a protege's grandeur comes from their patron, so they move too
+        self.dompc2.patron = self.dompc
+        self.dompc2.save()
+        PRESTIGE_RANKINGS.rebuild()
+        self.assetowner.adjust_prestige(100000)
+        self.assertEqual(
+            PRESTIGE_RANKINGS.values[self.assetowner2.id]["prestige"],
+            self.assetowner2.prestige,
+        )
+        self.assertGreater(self.assetowner2.grandeur, 10000)
+        self.assertEqual(PRESTIGE_RANKINGS.rank(self.assetowner2), 2)
+
+
+class TestPrestigeAdjustments(ArxCommandTest):
+    def test_store_prestige_record(self):
+        from datetime import datetime, timedelta
+        from world.dominion.models import (
+            MAX_PRESTIGE_HISTORY,
+            PrestigeAdjustment,
+            PrestigeCategory,
+        )
+
+        category = PrestigeCategory.objects.create(
+            name="Fashion", male_noun="fashionista", female_noun="fashionista"
+        )
+        for value in range(1, MAX_PRESTIGE_HISTORY + 3):
+            self.assetowner.adjust_prestige(value * 100, category=category)
+        adjustments = self.assetowner.prestige_adjustments.all()
+        self.assertEqual(adjustments.count(), MAX_PRESTIGE_HISTORY)
+        self.assertEqual(min(ob.adjusted_by for ob in adjustments), 300)
+        best = self.assetowner.most_notable_adjustment()
+        self.assertEqual(best.adjusted_by, 1200)
+        # a larger adjustment from two weeks ago has decayed below a recent one
+        old = PrestigeAdjustment.objects.create(
+            asset_owner=self.assetowner, category=category, adjusted_by=4000
+        )
+        old.adjusted_on = datetime.now() - timedelta(days=15)
+        old.save()
+        self.assertEqual(old.effective_value, 1000)
+        self.assertEqual(self.assetowner.most_notable_adjustment(), best)
+        self.assetowner.adjust_legend(1100, category=category)
+        self.assertEqual(
+            self.assetowner.most_notable_adjustment(
+                adjust_type=PrestigeAdjustment.LEGEND
+            ).adjusted_by,
+            1100,
+        )
+        self.assertEqual(self.assetowner.most_notable_adjustment(), best)
+
+
+class TestGrandeurGraph(ArxCommandTest):
+    def test_grandeur(self):
+        from world.dominion.models import AssetOwner
+
+        org = Organization.objects.create(name="Test House")
+        org_assets = AssetOwner.objects.create(organization_owner=org, fame=1000)
+        org.members.create(player=self.dompc, rank=1)
+        org.members.create(player=self.dompc2, rank=2)
+        self.assetowner.fame = 100
+        self.assetowner.save()
+        self.assetowner2.fame = 200
+        self.assetowner2.save()
+        # (10 + 20/2) / (19 / 200.0)
+        self.assertEqual(org_assets.grandeur, 210)
+        self.assertEqual(self.assetowner.grandeur, 100)
+        self.assertEqual(self.assetowner2.grandeur, 50)
+        self.dompc2.patron = self.dompc
+        self.dompc2.save()
+        self.assertEqual(self.assetowner.grandeur, 120)
+        self.assertEqual(self.assetowner2.grandeur, 60)
+        # only the owners connected to the change should be worked out again
+        self.assetowner.adjust_prestige(900)
+        self.assertEqual(org_assets.grandeur, 1157)
+        self.assertEqual(self.assetowner2.grandeur, 150)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.assetowner.grandeur, 120)
+
+
 class TestGeneralDominionCommands(ArxCommandTest):
     def test_admin_domain(self):
         from world.dominion.models import (
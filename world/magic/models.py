@@ -1500,6 +1500,8 @@ class Working(SharedMemoryModel):
     finalized_at = models.DateTimeField(blank=True, null=True)
 
     REGISTERED_CONSEQUENCES = {}
+    # PreparedDistributions of each danger level's consequences
+    PREPARED_CONSEQUENCES = {}
 
     def __init__(self, *args, **kwargs):
         super(Working, self).__init__(*args, **kwargs)
@@ -1515,18 +1517,21 @@ class Working(SharedMemoryModel):
             consequences = cls.REGISTERED_CONSEQUENCES[danger_level]
         consequences.append((consequence, weight))
         cls.REGISTERED_CONSEQUENCES[danger_level] = consequences
+        cls.PREPARED_CONSEQUENCES.pop(danger_level, None)
 
     @classmethod
     def random_consequence(cls, danger_level):
         if danger_level not in cls.REGISTERED_CONSEQUENCES:
             return None
 
-        consequences = cls.REGISTERED_CONSEQUENCES[danger_level]
-        picker = WeightedPicker()
-        for consequence_tuple in consequences:
-            picker.add_option(consequence_tuple[0], consequence_tuple[1])
+        if danger_level not in cls.PREPARED_CONSEQUENCES:
+            consequences = cls.REGISTERED_CONSEQUENCES[danger_level]
+            picker = WeightedPicker()
+            for consequence_tuple in consequences:
+                picker.add_option(consequence_tuple[0], consequence_tuple[1])
+            cls.PREPARED_CONSEQUENCES[danger_level] = picker.prepare()
 
-        return picker.pick()
+        return cls.PREPARED_CONSEQUENCES[danger_level].pick()
 
     @property
     def consequence_handler(self):
@@ -451,7 +451,7 @@ class MessengerHandler(MsgHandlerBase):
         # Show what we sent. Use initial package to show what was delivered
         self.display_sent_messenger_report(packed, receivers)
         # Mark player as having done something that is RP, so they're not inactive
-        self.obj.posecount += 1
+        self.obj.increment_posecount()
 
     @property
     def no_messenger_preview(self):
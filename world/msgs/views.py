@@ -1,7 +1,6 @@
 """
 Views for msg app - Msg proxy models, boards, etc
 """
-from collections import defaultdict
 import json
 
 from django.urls import reverse
@@ -459,23 +458,7 @@ def post_view_all(request, board_id):
         read_posts = list(Post.objects.all_read_by(request.user))
 
     if request.user.is_authenticated:
-        alts = []
-        if request.user.db.bbaltread:
-            try:
-                alts = [ob.player for ob in request.user.roster.alts]
-            except AttributeError:
-                pass
-        accounts = [request.user]
-        accounts.extend(alts)
-        ReadPostModel = Post.db_receivers_accounts.through
-        bulk_list = []
-        for post in raw_posts:
-            if post not in read_posts:
-                for account in accounts:
-                    bulk_list.append(ReadPostModel(accountdb=account, msg=post))
-                    # They've read everything, clear out their unread cache count
-                    board.zero_unread_cache(account)
-        ReadPostModel.objects.bulk_create(bulk_list)
+        board.mark_all_read(request.user)
 
     posts = map(lambda post_to_map: post_map(post_to_map, board, read_posts), raw_posts)
     return render(
@@ -502,26 +485,7 @@ def post_view_unread_board(request, board_id):
     unread_posts = []
 
     if request.user.is_authenticated:
-        unread_posts = Post.objects.all_unread_by(request.user).filter(
-            db_receivers_objects=board
-        )
-        alts = []
-        if request.user.db.bbaltread:
-            alts = [ob.player for ob in request.user.roster.alts]
-        accounts = [request.user]
-        accounts.extend(alts)
-        ReadPostModel = Post.db_receivers_accounts.through
-        bulk_list = []
-        read_by_alts = defaultdict(list)
-        for alt in alts:
-            read_by_alts[alt] = list(unread_posts.filter(db_receivers_accounts=alt))
-        for account in accounts:
-            for post in unread_posts:
-                if post not in read_by_alts[account]:
-                    bulk_list.append(ReadPostModel(accountdb=account, msg=post))
-            # They've read everything, clear out their unread cache count
-            board.zero_unread_cache(account)
-        ReadPostModel.objects.bulk_create(bulk_list)
+        unread_posts = board.read_unread_posts(request.user)
 
     posts = map(lambda post_to_map: post_map(post_to_map, board), unread_posts)
     return render(
@@ -534,11 +498,11 @@ def post_view_unread_board(request, board_id):
 def post_view_unread(request):
     """View for seeing all posts at once. It'll mark them all read."""
 
-    def post_map(post_to_map):
+    def post_map(post_to_map, bulletin_board):
         """Returns dict of information about each individual post to add to context"""
         return {
             "id": post_to_map.id,
-            "board": post_to_map.bulletin_board.key,
+            "board": bulletin_board.key,
             "poster": post_to_map.poster_name,
             "subject": ansi.strip_ansi(post_to_map.db_header),
             "date": post_to_map.db_date_created.strftime("%x"),
@@ -548,45 +512,16 @@ def post_view_unread(request):
     raw_boards = get_boards(request.user)
 
     if request.user.is_authenticated:
-        alts = []
-        alt_unread_posts = []
-        unread_posts = (
-            Post.objects.all_unread_by(request.user)
-            .filter(db_receivers_objects__in=raw_boards)
-            .order_by("db_receivers_objects")
-        )
-        if request.user.db.bbaltread:
-            try:
-                alts = [ob.player for ob in request.user.roster.alts]
-            except AttributeError:
-                pass
-            if alts:
-                alt_unread_posts = list(
-                    unread_posts.exclude(db_receivers_accounts__in=alts)
-                )
-        ReadPostModel = Post.db_receivers_accounts.through
-        bulk_list = []
-
-        mapped_posts = []
-
-        for unread_post in unread_posts:
-            mapped_posts.append(post_map(unread_post))
-            bulk_list.append(ReadPostModel(accountdb=request.user, msg=unread_post))
-            for alt in alts:
-                if unread_post in alt_unread_posts:
-                    bulk_list.append(ReadPostModel(accountdb=alt, msg=unread_post))
-
-        # They've read everything, clear out their unread cache count
-        accounts = [request.user] + alts
-        for board in raw_boards:
-            for account in accounts:
-                board.zero_unread_cache(account)
-
-        ReadPostModel.objects.bulk_create(bulk_list)
+        mapped_posts = [
+            post_map(post, board)
+            for board in raw_boards
+            for post in board.read_unread_posts(request.user)
+        ]
     else:
         mapped_posts = [
-            post_map(post)
-            for post in Post.objects.filter(db_receivers_objects__in=raw_boards)
+            post_map(post, board)
+            for board in raw_boards
+            for post in Post.objects.filter(db_receivers_objects=board)
         ]
 
     return render(
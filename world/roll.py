@@ -5,8 +5,15 @@ message will be sent, if any. While it could be a simulated roll made
 by a GM, a character's roll will be stored in character.ndb.last_roll
 attribute.
 """
+from bisect import bisect_right
 from collections import defaultdict
-from random import randint
+from functools import lru_cache
+from math import comb
+from random import randint, random
+
+from twisted.internet import reactor
+from twisted.internet.threads import deferToThread
+
 from world.conditions.modifiers_handlers import ModifierHandler
 
 
@@ -14,6 +21,157 @@ from world.conditions.modifiers_handlers import ModifierHandler
 # this number is, the less significant the difference between a highly
 # skilled and unskilled character is.
 DEFAULT_KEEP = 2
+# Dice pools larger than this are rolled die by die rather than from a table
+MAX_TABLE_DICE = 20
+# How many times a die can explode in our tables. The chance of a die going
+# further than this is one in a million, and those dice are counted as their
+# average value.
+MAX_TABLE_EXPLOSIONS = 6
+# Chances smaller than this are dropped while we build a table
+MIN_TABLE_CHANCE = 1e-12
+
+
+def get_kept_dice(num_dice, keep_dice):
+    """
+    Returns how many dice are actually kept from a pool. Rolls keep the last
+    keep_dice of the sorted rolls, so a keep of 0 keeps every die and a
+    negative keep drops that many of the lowest dice.
+    """
+    num_dice = max(num_dice, 0)
+    if keep_dice <= 0:
+        return max(num_dice + keep_dice, 0) if keep_dice else num_dice
+    return min(keep_dice, num_dice)
+
+
+@lru_cache(maxsize=None)
+def get_die_chances():
+    """
+    Returns a tuple of (value, chance) for one exploding d10, from highest to
+    lowest value.
+    """
+    chances = []
+    for explosions in range(MAX_TABLE_EXPLOSIONS):
+        for face in range(1, Roll.EXPLODE_VAL):
+            chances.append((explosions * 10 + face, 0.1 ** (explosions + 1)))
+    # anything past our last explosion counts as exploding that far plus an average die
+    average_die = 5.5 / 0.9
+    chances.append(
+        (
+            int(round(MAX_TABLE_EXPLOSIONS * 10 + average_die)),
+            0.1**MAX_TABLE_EXPLOSIONS,
+        )
+    )
+    return tuple(sorted(chances, reverse=True))
+
+
+class RollDistribution(object):
+    """
+    The chance of every total for keeping the highest dice of a pool of exploding
+    d10s. The table is built once for each pool size, from the highest face down:
+    at each value, we find the chance of how many of the dice that aren't yet
+    placed show that value, given that none of them show anything higher. Once
+    we've placed enough dice to fill our keep dice, the total can't change.
+    """
+
+    def __init__(self, num_dice, keep_dice):
+        self.num_dice = num_dice
+        self.keep_dice = keep_dice
+        self.chances = self.build_chances()
+        self.totals = sorted(self.chances)
+        self.cumulative = []
+        running = 0
+        for total in self.totals:
+            running += self.chances[total]
+            self.cumulative.append(running)
+
+    def build_chances(self):
+        """Returns a dict of each total of our kept dice to its chance"""
+        num_dice, keep_dice = self.num_dice, self.keep_dice
+        if not keep_dice:
+            return {0: 1.0}
+        die_chances = get_die_chances()
+        # chance of a die being at or below each value
+        at_or_below = []
+        running = 0
+        for _, chance in reversed(die_chances):
+            running += chance
+            at_or_below.append(running)
+        at_or_below.reverse()
+        # (dice placed so far, total so far) to their chance
+        states = {(0, 0): 1.0}
+        chances = defaultdict(float)
+        for (value, chance), below in zip(die_chances, at_or_below):
+            same_value = min(chance / below, 1.0)
+            new_states = defaultdict(float)
+            for (placed, total), state_chance in states.items():
+                remaining = num_dice - placed
+                for count in range(remaining + 1):
+                    count_chance = (
+                        state_chance
+                        * comb(remaining, count)
+                        * same_value**count
+                        * (1 - same_value) ** (remaining - count)
+                    )
+                    if count_chance < MIN_TABLE_CHANCE:
+                        continue
+                    new_total = total + min(count, keep_dice - placed) * value
+                    if placed + count >= keep_dice:
+                        chances[new_total] += count_chance
+                    else:
+                        new_states[(placed + count, new_total)] += count_chance
+            states = new_states
+        return dict(chances)
+
+    def sample(self):
+        """Returns a random total with the chances of our table"""
+        index = bisect_right(self.cumulative, random() * self.cumulative[-1])
+        return self.totals[min(index, len(self.totals) - 1)]
+
+    @property
+    def expected_value(self):
+        """The average total of our kept dice"""
+        return sum(total * chance for total, chance in self.chances.items()) / (
+            self.cumulative[-1]
+        )
+
+
+# RollDistributions that have been built, by number of dice and kept dice
+ROLL_TABLES = {}
+# the pools whose tables are being built in a thread
+BUILDING_TABLES = set()
+
+
+def get_distribution(num_dice, keep_dice):
+    """Returns the RollDistribution for a pool, building it now if needed"""
+    key = (num_dice, get_kept_dice(num_dice, keep_dice))
+    if key not in ROLL_TABLES:
+        ROLL_TABLES[key] = RollDistribution(*key)
+    return ROLL_TABLES[key]
+
+
+def get_ready_distribution(num_dice, keep_dice):
+    """
+    Returns the RollDistribution for a pool if it's been built. Otherwise we
+    start building it in a thread, since a large table can take most of a
+    second, and return None until it's ready. Outside of a running reactor,
+    such as in tests, the table is built right away.
+    """
+    if not reactor.running:
+        return get_distribution(num_dice, keep_dice)
+    key = (num_dice, get_kept_dice(num_dice, keep_dice))
+    table = ROLL_TABLES.get(key)
+    if table is None and key not in BUILDING_TABLES:
+        BUILDING_TABLES.add(key)
+        deferToThread(RollDistribution, *key).addBoth(add_built_table, key)
+    return table
+
+
+def add_built_table(result, key):
+    """Stores a table built in a thread, or passes along its failure"""
+    BUILDING_TABLES.discard(key)
+    if isinstance(result, RollDistribution):
+        ROLL_TABLES[key] = result
+    return result
 
 
 class Roll(object):
@@ -128,6 +286,34 @@ class Roll(object):
         announce_room = self.announce_room
         if not announce_room and self.character:
             announce_room = self.character.location
+        num_dice, keep_dice = self.get_pool()
+        dice_total = self.roll_dice(num_dice, keep_dice)
+        roll_modifiers = self.get_roll_modifiers()
+        # crit chance is determined here. If we can't crit, we just set the multiplier to be 1
+        crit_mult = self.check_crit_mult()
+        self.crit_mult = crit_mult
+        result = self.get_result(dice_total, roll_modifiers, crit_mult)
+        if self.flub:
+            rand_cap = max(
+                1, min(get_kept_dice(num_dice, keep_dice) * 5, self.difficulty)
+            )
+            surrender = randint(1, rand_cap) - self.difficulty
+            if result > surrender:
+                result = surrender
+        self.result = result
+        # if quiet is not set, then we send a message to the room.
+        if not self.quiet and announce_room:
+            msg = self.build_msg()
+            announce_room.msg_contents(msg, options={"roll": True})
+        # end result is the sum of our kept dice minus the difficulty of what we were
+        # attempting. Positive number is a success, negative is a failure.
+        return self.result
+
+    def get_pool(self):
+        """
+        Returns the number of dice we roll and the number of our highest dice that
+        we keep, from our stats and skills.
+        """
         statval = sum(self.stats.values())
         if self.average_lists or self.average_stat_list:
             statval //= len(self.stats)
@@ -147,20 +333,39 @@ class Roll(object):
         keep_dice += self.bonus_keep
         # the number of 'dice' we roll is equal to stat + skill
         num_dice = int(statval) + int(skillval) + self.bonus_dice
-        rolls = [randint(1, 10) for _ in range(num_dice)]
-        for x in range(len(rolls)):
-            rolls[x] = self.explode_check(rolls[x])
+        return num_dice, keep_dice
+
+    def roll_dice(self, num_dice, keep_dice):
+        """
+        Returns the sum of our highest keep_dice exploding d10s. Pools that aren't
+        too large are sampled from their precomputed table once it's ready, which
+        has the same chances as rolling each die.
+        """
+        if 0 < num_dice <= MAX_TABLE_DICE:
+            table = get_ready_distribution(num_dice, keep_dice)
+            if table:
+                return table.sample()
+        rolls = [self.explode_check(randint(1, 10)) for _ in range(num_dice)]
         # Now we sort the rolls from least to highest, and keep a number of our
         # highest rolls equal to our 'keep dice'. Those are then added as our result.
         rolls.sort()
-        rolls = rolls[-keep_dice:]
-        result = sum(rolls)
+        return sum(rolls[-keep_dice:])
+
+    def get_result(self, dice_total, roll_modifiers, crit_mult):
+        """
+        Turns the total of our kept dice into the result of the roll.
+
+            Args:
+                dice_total (int): The sum of our kept dice
+                roll_modifiers (int): Modifiers to the roll from our conditions
+                crit_mult (float): Our critical multiplier, 1 if we didn't crit
+
+            Returns:
+                The result, positive for successes and negative for failures.
+        """
         divisor = self.divisor or 1
-        result /= divisor
-        result += self.get_roll_modifiers()
-        # crit chance is determined here. If we can't crit, we just set the multiplier to be 1
-        crit_mult = self.check_crit_mult()
-        self.crit_mult = crit_mult
+        result = dice_total / divisor
+        result += roll_modifiers
         # if our difficulty is higher than 0, then crit is applied to our roll before difficulty is subtracted,
         # to give it a greater chance of success
         if self.difficulty > 0:
@@ -173,19 +378,45 @@ class Roll(object):
             result = int(result * crit_mult)
         # flat modifier is after crits/botches, but before a flubbed result
         result += self.flat_modifier
-        if self.flub:
-            rand_cap = max(1, min(len(rolls) * 5, self.difficulty))
-            surrender = randint(1, rand_cap) - self.difficulty
-            if result > surrender:
-                result = surrender
-        self.result = result
-        # if quiet is not set, then we send a message to the room.
-        if not self.quiet and announce_room:
-            msg = self.build_msg()
-            announce_room.msg_contents(msg, options={"roll": True})
-        # end result is the sum of our kept dice minus the difficulty of what we were
-        # attempting. Positive number is a success, negative is a failure.
-        return self.result
+        return result
+
+    def get_result_chances(self):
+        """
+        Returns a dict of every result this roll could have to its chance, without
+        rolling anything. Flubs are left out, since they're meant to fail.
+        """
+        num_dice, keep_dice = self.get_pool()
+        if num_dice > 0:
+            dice_chances = get_distribution(num_dice, keep_dice).chances
+        else:
+            dice_chances = {0: 1.0}
+        roll_modifiers = self.get_roll_modifiers()
+        results = defaultdict(float)
+        for crit_chance, crit_mult in self.get_crit_chances():
+            for dice_total, chance in dice_chances.items():
+                result = self.get_result(dice_total, roll_modifiers, crit_mult)
+                results[result] += crit_chance * chance
+        return results
+
+    def expected_value(self):
+        """Returns the average result of this roll"""
+        return sum(
+            result * chance for result, chance in self.get_result_chances().items()
+        )
+
+    def probability_of_success(self, threshold=0):
+        """
+        Returns the chance, from 0 to 1, that this roll's result will be at least
+        the threshold. A result of 0 or more beats the difficulty.
+        """
+        return min(
+            sum(
+                chance
+                for result, chance in self.get_result_chances().items()
+                if result >= threshold
+            ),
+            1.0,
+        )
 
     def explode_check(self, num):
         """
@@ -195,29 +426,52 @@ class Roll(object):
             return num
         return num + self.explode_check(randint(1, 10))
 
+    def get_crit_table(self):
+        """
+        Returns a list of the highest d100 roll for each critical multiplier, from
+        the best multiplier to the least. Anything higher doesn't crit.
+        """
+        bonus_crit_chance = self.bonus_crit_chance + self.get_crit_chance_modifiers()
+        bonus_crit_mult = self.bonus_crit_mult
+        return [
+            (1 + bonus_crit_chance, 2.5 + bonus_crit_mult),
+            (2 + bonus_crit_chance, 2.25 + bonus_crit_mult),
+            (3 + bonus_crit_chance, 2 + bonus_crit_mult),
+            (4 + bonus_crit_chance, 1.75 + bonus_crit_mult),
+            (5 + bonus_crit_chance, 1.5 + bonus_crit_mult),
+        ]
+
     def check_crit_mult(self):
         try:
             if not self.can_crit:
                 return 1
-            bonus_crit_chance = (
-                self.bonus_crit_chance + self.get_crit_chance_modifiers()
-            )
-            bonus_crit_mult = self.bonus_crit_mult
+            crit_table = self.get_crit_table()
             roll = randint(1, 100)
-            if roll > (5 + bonus_crit_chance):
-                return 1
-            if roll > (4 + bonus_crit_chance):
-                return 1.5 + bonus_crit_mult
-            if roll > (3 + bonus_crit_chance):
-                return 1.75 + bonus_crit_mult
-            if roll > (2 + bonus_crit_chance):
-                return 2 + bonus_crit_mult
-            if roll > (1 + bonus_crit_chance):
-                return 2.25 + bonus_crit_mult
-            return 2.5 + bonus_crit_mult
+            for max_roll, crit_mult in crit_table:
+                if roll <= max_roll:
+                    return crit_mult
+            return 1
         except (TypeError, ValueError, AttributeError):
             return 1
 
+    def get_crit_chances(self):
+        """Returns a list of (chance, critical multiplier) for this roll"""
+        try:
+            if not self.can_crit:
+                return [(1.0, 1)]
+            chances = []
+            below = 0
+            for max_roll, crit_mult in self.get_crit_table():
+                max_roll = min(max(max_roll, below), 100)
+                if max_roll > below:
+                    chances.append(((max_roll - below) / 100.0, crit_mult))
+                    below = max_roll
+            if below < 100:
+                chances.append(((100 - below) / 100.0, 1))
+            return chances
+        except (TypeError, ValueError, AttributeError):
+            return [(1.0, 1)]
+
     def build_msg(self):
         white_col, red_col, cyan_col, green_col, no_col = "|w", "|r", "|c", "|g", "|n"
         name = self.character_name
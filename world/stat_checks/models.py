@@ -3,11 +3,17 @@ from django.db import models
 from django.forms import ValidationError
 from server.utils.arx_utils import CachedProperty
 from evennia.utils.idmapper.models import SharedMemoryModel
-from jinja2 import Environment, BaseLoader
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from typing import Union, List, TYPE_CHECKING, Dict
 from random import randint
 
 from server.utils.abstract_models import NameLookupModel, NameIntegerLookupModel
+from server.utils.jinja_templates import (
+    get_template_key,
+    invalidate_template,
+    render_template,
+)
 
 from world.stat_checks.constants import (
     NONE,
@@ -45,6 +51,7 @@ class StatWeight(SharedMemoryModel):
     """Lookup table for the weights attached to different stat/skill/knack levels"""
 
     _cache_set = False
+    _weight_tables = None
     (
         SKILL,
         STAT,
@@ -142,31 +149,71 @@ class StatWeight(SharedMemoryModel):
         what does that modify rolls by? 3? 20? Over NINE THOUSAND? This gets our weights
         that are applicable and aggregates them.
         """
-        weights = sorted(cls.get_all_instances(), key=lambda x: x.level)
-        matches = [
-            ob for ob in weights if ob.stat_type == stat_type and ob.level <= level
-        ]
-        if require_matches and not matches:
-            raise StatWeight.DoesNotExist(
-                f"No match found for stat_type: {stat_type} level: {level}. "
-                f"Available cached instances: {cls.get_all_instances()}."
-            )
-        total = 0
-        for stat_weight in matches:
-            # determine how many times this stat_weight should apply
-            index = matches.index(stat_weight)
-            # if we're the last match in the stat weights that applies to this level:
-            if (index + 1) == len(matches):
-                # number of levels this weight affects is the difference between the PC's stat level and the level + 1
-                # e.g: if a stat_weight affects all stats 4 and higher, and the PC has a level of 5, they get 2*weight
-                num_levels = (level - stat_weight.level) + 1
-                total += num_levels * stat_weight.weight
-            else:  # get the number of times to apply between this and our next match
-                next_weight = matches[index + 1]
-                num_levels = next_weight.level - stat_weight.level
-                total += num_levels * stat_weight.weight
-
-        return total
+        min_level, values, last_weight = cls.get_weight_tables().get(
+            stat_type, (None, [], 0)
+        )
+        if min_level is None or level < min_level:
+            if require_matches:
+                raise StatWeight.DoesNotExist(
+                    f"No match found for stat_type: {stat_type} level: {level}. "
+                    f"Available cached instances: {cls.get_all_instances()}."
+                )
+            return 0
+        if level < len(values):
+            return values[level]
+        # past our highest weight, every level adds that weight
+        return values[-1] + (level - len(values) + 1) * last_weight
+
+    @classmethod
+    def get_weight_tables(cls):
+        """Returns our lookup tables, building them if our cache was reset"""
+        if cls._weight_tables is None or not cls._cache_set:
+            cls._weight_tables = cls.build_weight_tables(cls.get_all_instances())
+        return cls._weight_tables
+
+    @classmethod
+    def build_weight_tables(cls, instances):
+        """
+        Builds a lookup table for each stat_type of the total value for every level
+        up to its highest weight. A weight applies to each level from its own up
+        to the level of the next weight, so each level adds the weight of the
+        highest weight at or below it to the total of the level before.
+
+            Args:
+                instances: All our StatWeights
+
+            Returns:
+                A dict of stat_type to a tuple of (lowest level with a weight,
+                list of total values indexed by level, weight of the highest level)
+        """
+        weights_by_type = defaultdict(list)
+        for stat_weight in sorted(instances, key=lambda x: x.level):
+            weights_by_type[stat_weight.stat_type].append(stat_weight)
+        tables = {}
+        for stat_type, weights in weights_by_type.items():
+            min_level = weights[0].level
+            values = [0] * (weights[-1].level + 1)
+            weight_index = 0
+            for level in range(min_level, len(values)):
+                while (
+                    weight_index + 1 < len(weights)
+                    and weights[weight_index + 1].level <= level
+                ):
+                    weight_index += 1
+                values[level] = values[level - 1] if level else 0
+                values[level] += weights[weight_index].weight
+            tables[stat_type] = (min_level, values, weights[-1].weight)
+        return tables
+
+    def save(self, *args, **kwargs):
+        ret = super().save(*args, **kwargs)
+        type(self)._weight_tables = None
+        return ret
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        type(self)._weight_tables = None
+        return ret
 
     def __str__(self):
         return (
@@ -181,6 +228,7 @@ class NaturalRollType(NameIntegerLookupModel):
     high/low outcomes on the table.
     """
 
+    _bound_tables = None
     LOWER_BOUND, UPPER_BOUND = range(2)
     BOUNDARY_CHOICES = ((LOWER_BOUND, "lower bound"), (UPPER_BOUND, "upper bound"))
     value_type = models.PositiveSmallIntegerField(
@@ -210,30 +258,47 @@ class NaturalRollType(NameIntegerLookupModel):
     def is_botch(self):
         return self.value_type == self.UPPER_BOUND
 
+    @classmethod
+    def get_bound_tables(cls):
+        """
+        Returns our crits and botches sorted by value, each with a matching list
+        of values for bisecting. They're rebuilt whenever our sorted index is.
+        """
+        sorted_index = cls.get_sorted_index()
+        if cls._bound_tables is None or cls._bound_tables[0] is not sorted_index:
+            instances = sorted_index[0]
+            crits = [ob for ob in instances if ob.value_type == cls.LOWER_BOUND]
+            botches = [ob for ob in instances if ob.value_type == cls.UPPER_BOUND]
+            cls._bound_tables = (
+                sorted_index,
+                (crits, [ob.value for ob in crits]),
+                (botches, [ob.value for ob in botches]),
+            )
+        return cls._bound_tables[1:]
+
     @classmethod
     def get_roll_type(cls, roll: int) -> Union[None, "NaturalRollType"]:
         """
         Returns an instance of a crit, botch, or nothing depending if their roll falls within
         any of our bounds
         """
-        # instances will be in order of worst botch to highest crit
-        instances = sorted(cls.get_all_instances(), key=lambda x: x.value)
-        # check if roll was high enough to be a crit, get highest value it passed
-        crits = [
-            ob
-            for ob in instances
-            if ob.value_type == cls.LOWER_BOUND and roll >= ob.value
-        ]
-        if crits:
-            return crits[-1]
-        # check if roll was low enough to be a botch. Get lowest botch it passed
-        botches = [
-            ob
-            for ob in instances
-            if ob.value_type == cls.UPPER_BOUND and roll <= ob.value
-        ]
-        if botches:
-            return botches[0]
+        return cls.get_roll_types([roll])[0]
+
+    @classmethod
+    def get_roll_types(cls, rolls: List[int]) -> List[Union[None, "NaturalRollType"]]:
+        """Returns the crit, botch, or None for each of a list of rolls"""
+        (crits, crit_values), (botches, botch_values) = cls.get_bound_tables()
+        roll_types = []
+        for roll in rolls:
+            # check if roll was high enough to be a crit, get highest value it passed
+            index = bisect_right(crit_values, roll)
+            if index:
+                roll_types.append(crits[index - 1])
+                continue
+            # check if roll was low enough to be a botch. Get lowest botch it passed
+            index = bisect_left(botch_values, roll)
+            roll_types.append(botches[index] if index < len(botches) else None)
+        return roll_types
 
 
 class RollResult(NameIntegerLookupModel):
@@ -253,34 +318,43 @@ class RollResult(NameIntegerLookupModel):
     def get_instance_for_roll(
         cls, roll: int, natural_roll_type: Union["NaturalRollType", None] = None
     ):
-        instances = sorted(cls.get_all_instances(), key=lambda x: x.value)
+        return cls.get_instances_for_rolls([roll], [natural_roll_type])[0]
+
+    @classmethod
+    def get_instances_for_rolls(
+        cls,
+        rolls: List[int],
+        natural_roll_types: List[Union["NaturalRollType", None]] = None,
+    ) -> List["RollResult"]:
+        """Returns the RollResult for each roll, shifted by its crit/botch if any"""
+        instances = cls.get_sorted_index()[0]
         if not instances:
             raise ValueError(
                 "No ResultMessage objects have yet been defined in the database."
             )
-        # get index of the result that most closely corresponds to our roll, then shift by result_shift if any
-        # find highest result the roll is higher than, or return our lowest value
-        closest = max(
-            [ob for ob in instances if ob.value <= roll],
-            key=lambda x: x.value,
-            default=instances[0],
-        )
-        # if we don't have a crit/botch, just return the closest result
-        if not natural_roll_type:
-            return closest
-        index = instances.index(closest)
-        index += natural_roll_type.result_shift
-        # this means they botched so badly they would have gotten below the worst botch. Press F to pay respects
-        if index < 0:
-            return instances[0]
-        # they critted so well that they would have gotten above the top result. Trumpets sound and peasants cheer
-        if index >= len(instances):
-            return instances[-1]
-        # they got within the acceptable range of screwing up or being awesome
-        return instances[index]
+        natural_roll_types = natural_roll_types or [None] * len(rolls)
+        results = []
+        for roll, natural_roll_type in zip(rolls, natural_roll_types):
+            # get index of the highest result the roll is at or above, or our lowest value
+            index = cls.get_index_for_value(roll)
+            if natural_roll_type:
+                index += natural_roll_type.result_shift
+            # below the worst botch or above the top result, so cap it at either end
+            index = min(max(index, 0), len(instances) - 1)
+            results.append(instances[index])
+        return results
 
     def render(self, **data):
-        return Environment(loader=BaseLoader()).from_string(self.template).render(data)
+        return render_template(self.template, key=get_template_key(self), **data)
+
+    def save(self, *args, **kwargs):
+        ret = super().save(*args, **kwargs)
+        invalidate_template(self)
+        return ret
+
+    def delete(self, *args, **kwargs):
+        invalidate_template(self)
+        return super().delete(*args, **kwargs)
 
 
 class DamageRating(NameIntegerLookupModel):
@@ -792,18 +866,8 @@ class CheckRank(NameIntegerLookupModel):
 
     @classmethod
     def get_base_rank_for_value(cls, value: int) -> "CheckRank":
-        instances = sorted(cls.get_all_instances(), key=lambda x: x.value)
-        if not instances:
-            raise ValueError(
-                "No CheckRank objects have yet been defined in the database."
-            )
         # get highest rank that our value is over
-        closest = max(
-            [ob for ob in instances if ob.value <= value],
-            key=lambda x: x.value,
-            default=instances[0],
-        )
-        return closest
+        return cls.get_instance_for_value(value)
 
     @classmethod
     def get_chance_of_higher_rank(cls, value: int) -> int:
@@ -856,18 +920,8 @@ class DifficultyTable(NameIntegerLookupModel):
     ) -> "DifficultyTable":
         # the higher the better for the roller
         value = roller_rank.id - target_rank.id
-        instances = sorted(cls.get_all_instances(), key=lambda x: x.value)
-        if not instances:
-            raise ValueError(
-                "No DifficultyTable objects have yet been defined in the database."
-            )
         # get highest rank that our value is over
-        closest = max(
-            [ob for ob in instances if ob.value <= value],
-            key=lambda x: x.value,
-            default=instances[0],
-        )
-        return closest
+        return cls.get_instance_for_value(value)
 
     @CachedProperty
     def cached_ranges(self) -> List["DifficultyTableResultRange"]:
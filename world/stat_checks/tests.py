@@ -282,6 +282,80 @@ class NewCheckCommands(ArxCommandTest):
         )
 
 
+class TestRollResultTemplates(ArxCommandTest):
+    def test_render(self):
+        from server.utils.jinja_templates import TEMPLATE_CACHE, get_template_key
+
+        result = RollResult.objects.create(
+            name="fine", value=10, template="{{character}} does fine."
+        )
+        self.assertEqual(result.render(character="Bob"), "Bob does fine.")
+        key = get_template_key(result)
+        compiled = TEMPLATE_CACHE.templates[key][1]
+        self.assertEqual(result.render(character="Ann"), "Ann does fine.")
+        self.assertIs(TEMPLATE_CACHE.templates[key][1], compiled)
+        result.template = "{{character}} does great."
+        result.save()
+        self.assertNotIn(key, TEMPLATE_CACHE.templates)
+        self.assertEqual(result.render(character="Bob"), "Bob does great.")
+
+
+class TestStatWeightTables(ArxCommandTest):
+    def test_weighted_values(self):
+        StatWeight.objects.all().delete()
+        StatWeight.objects.create(stat_type=StatWeight.STAT, weight=1, level=1)
+        weight = StatWeight.objects.create(
+            stat_type=StatWeight.STAT, weight=10, level=6
+        )
+        # 5 levels at 1 and then 2 levels at 10
+        self.assertEqual(StatWeight.get_weighted_value_for_stat(7, False), 25)
+        self.assertEqual(StatWeight.get_weighted_value_for_stat(4, False), 4)
+        self.assertEqual(StatWeight.get_weighted_value_for_stat(0, False), 0)
+        self.assertEqual(StatWeight.get_weighted_value_for_skill(5), 0)
+        with self.assertRaises(StatWeight.DoesNotExist):
+            StatWeight.get_health_value_for_stamina(3)
+        weight.weight = 2
+        weight.save()
+        self.assertEqual(StatWeight.get_weighted_value_for_stat(7, False), 9)
+        weight.delete()
+        self.assertEqual(StatWeight.get_weighted_value_for_stat(7, False), 7)
+
+
+class TestRollLookups(ArxCommandTest):
+    def test_roll_lookups(self):
+        RollResult.objects.all().delete()
+        NaturalRollType.objects.all().delete()
+        botch = RollResult.objects.create(name="botch", value=-100, template="")
+        fail = RollResult.objects.create(name="fail", value=-20, template="")
+        okay = RollResult.objects.create(name="okay", value=45, template="")
+        great = RollResult.objects.create(name="great", value=150, template="")
+        crit = NaturalRollType.objects.create(name="crit", value=95, result_shift=1)
+        fumble = NaturalRollType.objects.create(
+            name="fumble",
+            value=5,
+            value_type=NaturalRollType.UPPER_BOUND,
+            result_shift=-2,
+        )
+        self.assertEqual(
+            NaturalRollType.get_roll_types([1, 5, 50, 95, 100]),
+            [fumble, fumble, None, crit, crit],
+        )
+        self.assertEqual(
+            RollResult.get_instances_for_rolls([-500, -20, 44, 45, 500]),
+            [botch, fail, fail, okay, great],
+        )
+        self.assertEqual(RollResult.get_instance_for_roll(60, crit), great)
+        self.assertEqual(RollResult.get_instance_for_roll(200, crit), great)
+        self.assertEqual(RollResult.get_instance_for_roll(0, fumble), botch)
+        okay.value = 0
+        okay.save()
+        self.assertEqual(RollResult.get_instance_for_roll(0), okay)
+        super_crit = NaturalRollType.objects.create(
+            name="super crit", value=99, result_shift=2
+        )
+        self.assertEqual(NaturalRollType.get_roll_type(99), super_crit)
+
+
 # This test must be run with migrations.
 @patch("world.stat_checks.check_maker.randint")
 class TestRetainerCheck(ArxCommandTest):
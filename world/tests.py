@@ -0,0 +1,98 @@
+import random
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from world.roll import (
+    BUILDING_TABLES,
+    ROLL_TABLES,
+    Roll,
+    RollDistribution,
+    add_built_table,
+    get_distribution,
+    get_ready_distribution,
+)
+
+
+class TestRoll(SimpleTestCase):
+    NUM_SAMPLES = 20000
+
+    def get_legacy_results(self, roll, num_samples):
+        """Rolls every die for each sample, as rolls did before our tables"""
+        with patch("world.roll.MAX_TABLE_DICE", 0):
+            return [roll.roll() for _ in range(num_samples)]
+
+    def get_chi_square(self, samples, chances, num_bins=10):
+        """
+        Groups results into bins of about equal chance and returns the chi-square
+        statistic of the samples against those chances.
+        """
+        bins = []
+        bin_chance = 0
+        edges = []
+        for total in sorted(chances):
+            bin_chance += chances[total]
+            if bin_chance >= 1.0 / num_bins:
+                bins.append(bin_chance)
+                edges.append(total)
+                bin_chance = 0
+        bins[-1] += bin_chance
+        edges[-1] = max(chances)
+        counts = [0] * len(bins)
+        for sample in samples:
+            for index, edge in enumerate(edges):
+                if sample <= edge:
+                    counts[index] += 1
+                    break
+        total = len(samples)
+        return sum(
+            (count - chance * total) ** 2 / (chance * total)
+            for count, chance in zip(counts, bins)
+        )
+
+    def test_tables_match_legacy_rolls(self):
+        random.seed(2023)
+        # the chi-square critical value for 9 degrees of freedom at p=0.001
+        critical_value = 27.88
+        # keep dice of 0 keeps every die, and negative keep dice drop our lowest
+        for num_dice, bonus_keep in ((1, -1), (4, 0), (8, 1), (6, -2), (5, -4)):
+            roll = Roll(bonus_dice=num_dice, bonus_keep=bonus_keep)
+            chances = get_distribution(*roll.get_pool()).chances
+            roll.difficulty = 0
+            roll.can_crit = False
+            legacy = self.get_legacy_results(roll, self.NUM_SAMPLES)
+            sampled = [roll.roll() for _ in range(self.NUM_SAMPLES)]
+            self.assertLess(self.get_chi_square(legacy, chances), critical_value)
+            self.assertLess(self.get_chi_square(sampled, chances), critical_value)
+
+    def test_odds(self):
+        random.seed(2023)
+        roll = Roll(bonus_dice=6, keep_override=2, difficulty=15)
+        expected = roll.expected_value()
+        success = roll.probability_of_success()
+        legacy = self.get_legacy_results(roll, self.NUM_SAMPLES)
+        self.assertAlmostEqual(expected, sum(legacy) / self.NUM_SAMPLES, delta=0.25)
+        self.assertAlmostEqual(
+            success,
+            len([ob for ob in legacy if ob >= 0]) / self.NUM_SAMPLES,
+            delta=0.015,
+        )
+        roll = Roll(bonus_dice=0, difficulty=5, can_crit=False)
+        self.assertEqual(roll.expected_value(), -5)
+        self.assertEqual(roll.probability_of_success(), 0)
+
+    @patch("world.roll.deferToThread")
+    @patch("world.roll.reactor")
+    def test_tables_built_off_reactor(self, mock_reactor, mock_defer):
+        mock_reactor.running = True
+        roll = Roll(bonus_dice=12, bonus_keep=3)
+        key = roll.get_pool()
+        ROLL_TABLES.pop(key, None)
+        # rolled die by die while the table is built in a thread
+        roll.roll()
+        roll.roll()
+        mock_defer.assert_called_once_with(RollDistribution, *key)
+        self.assertIn(key, BUILDING_TABLES)
+        add_built_table(RollDistribution(*key), key)
+        self.assertNotIn(key, BUILDING_TABLES)
+        self.assertIs(get_ready_distribution(*key), ROLL_TABLES[key])
@@ -36,9 +36,21 @@ class Trait(NameLookupModel):
         help_text="A category for this type of trait, like 'physical' stats, etc",
     )
 
+    _type_index = None
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        ret = super().save(*args, **kwargs)
+        type(self)._type_index = None
+        return ret
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        type(self)._type_index = None
+        return ret
+
     @classmethod
     def get_valid_stat_names(cls, category=None):
         if category:
@@ -63,13 +75,31 @@ class Trait(NameLookupModel):
             return cls.get_valid_trait_names_by_category_and_type(category, cls.OTHER)
         return cls.get_valid_trait_names_by_type(cls.OTHER)
 
+    @classmethod
+    def get_type_index(cls):
+        """
+        Returns a tuple of a dict of each trait type to the lowercase names of
+        its traits, and a dict of each lowercase name to its trait type. It's
+        built once and rebuilt after a save/delete or when our cache has been reset.
+        """
+        if cls._type_index is None or not cls._cache_set:
+            names_by_type = {trait_type: [] for trait_type, _ in cls.TRAIT_TYPE_CHOICES}
+            types_by_name = {}
+            for ob in cls.get_all_instances():
+                name = ob.name.lower()
+                names_by_type.setdefault(ob.trait_type, []).append(name)
+                types_by_name[name] = ob.trait_type
+            cls._type_index = (names_by_type, types_by_name)
+        return cls._type_index
+
+    @classmethod
+    def get_trait_type_for_name(cls, name: str):
+        """Returns the trait type of the trait with a lowercase name, or None"""
+        return cls.get_type_index()[1].get(name)
+
     @classmethod
     def get_valid_trait_names_by_type(cls, trait_type: int) -> List[str]:
-        return [
-            ob.name.lower()
-            for ob in cls.get_all_instances()
-            if ob.trait_type == trait_type
-        ]
+        return list(cls.get_type_index()[0].get(trait_type, ()))
 
     @classmethod
     def get_valid_trait_names_by_category_and_type(
@@ -1,3 +1,26 @@
-from django.test import TestCase
+from server.utils.test_utils import ArxTest
+from world.conditions.constants import PERMANENT_WOUND
+from world.traits.models import Trait
 
-# Create your tests here.
+
+class TestTraitshandler(ArxTest):
+    def test_effective_values(self):
+        strength, _ = Trait.objects.get_or_create(
+            name="strength",
+            defaults=dict(trait_type=Trait.STAT, category=Trait.PHYSICAL),
+        )
+        traits = self.char1.traits
+        traits.set_stat_value("strength", 3)
+        self.assertEqual(traits.strength, 3)
+        health_status = self.char1.health_status
+        health_status.wounds.create(severity=PERMANENT_WOUND, trait=strength)
+        del health_status.cached_wounds
+        self.assertEqual(traits.strength, 2)
+        self.assertEqual(traits.get_stat_value("strength", raw=True), 3)
+        self.assertTrue(traits.check_stat_can_be_raised("strength"))
+        self.assertTrue(health_status.heal_permanent_wound_for_trait(strength))
+        self.assertEqual(traits.get_value_by_trait(strength), 3)
+        traits.set_stat_value("strength", 4)
+        self.assertEqual(traits.stats["strength"], 4)
+        with self.assertRaises(AttributeError):
+            traits.not_a_trait
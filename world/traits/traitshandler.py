@@ -41,6 +41,11 @@ class Traitshandler:
             "other": defaultdict(CharacterTraitValue),
         }
         self.initialized = False
+        # the values and wounds we last worked out effective values from
+        self._values = None
+        self._effective_values = None
+        self._wound_source = None
+        self._wound_counts = None
         self.setup_caches()
 
     def setup_caches(self, reset=False):
@@ -51,20 +56,80 @@ class Traitshandler:
             self.add_trait_value_to_cache(trait_value)
         self.initialized = True
 
+    def invalidate_values(self):
+        """Makes us work out our values again after a trait value changes"""
+        self._values = None
+
+    @property
+    def values(self) -> Dict[str, Dict[str, int]]:
+        """
+        Our trait values by trait type and lowercase name, built once from our
+        cache and rebuilt after a trait value is set.
+        """
+        if self._values is None:
+            self._values = {
+                trait_type: {
+                    name: char_trait.value for name, char_trait in cache.items()
+                }
+                for trait_type, cache in self._cache.items()
+            }
+            self._effective_values = None
+        return self._values
+
+    @property
+    def wound_counts(self):
+        """
+        Returns a tuple of a dict of each lowercase trait name to the number of
+        wounds to it, and one with only the permanent wounds. They're worked
+        out again whenever our health status has a new list of wounds, which
+        happens when one is created or healed.
+        """
+        wounds = self.character.health_status.cached_wounds
+        if wounds is not self._wound_source:
+            counts, permanent = defaultdict(int), defaultdict(int)
+            for wound in wounds:
+                name = wound.trait.name.lower()
+                counts[name] += 1
+                if wound.severity == PERMANENT_WOUND:
+                    permanent[name] += 1
+            self._wound_counts = (counts, permanent)
+            self._wound_source = wounds
+            self._effective_values = None
+        return self._wound_counts
+
+    @property
+    def effective_values(self) -> Dict[str, Dict[str, int]]:
+        """Our trait values by trait type and lowercase name, lowered by wounds"""
+        values = self.values
+        counts = self.wound_counts[0]
+        if self._effective_values is None:
+            self._effective_values = {
+                trait_type: {
+                    name: max(value - counts.get(name, 0), 0)
+                    for name, value in type_values.items()
+                }
+                for trait_type, type_values in values.items()
+            }
+        return self._effective_values
+
+    def get_effective_value(self, trait_type: str, name: str) -> int:
+        """Returns a trait's value lowered by wounds, for a lowercase name"""
+        try:
+            return self.effective_values[trait_type][name]
+        except KeyError:
+            # we don't have the trait, but a wound could still lower it below 0
+            return 0
+
     def get_value_by_trait(self, trait: Trait) -> int:
         name = trait.name.lower()
         trait_type = trait.get_trait_type_display()
-        return self.adjust_by_wounds(self._cache[trait_type][name].value, name)
+        return self.get_effective_value(trait_type, name)
 
     def get_wound_count_for_trait_name(self, name, perm_only=False):
-        wounds = [
-            ob
-            for ob in self.character.health_status.cached_wounds
-            if ob.trait.name.lower() == name
-        ]
+        counts, permanent = self.wound_counts
         if perm_only:
-            wounds = [ob for ob in wounds if ob.severity == PERMANENT_WOUND]
-        return len(wounds)
+            return permanent.get(name, 0)
+        return counts.get(name, 0)
 
     def get_total_wound_count(self):
         return len(self.character.health_status.cached_wounds)
@@ -73,6 +138,7 @@ class Traitshandler:
         self._cache[trait_value.trait.get_trait_type_display()][
             trait_value.trait.name.lower()
         ] = trait_value
+        self.invalidate_values()
 
     def adjust_by_wounds(self, value, name, perm_only=False):
         num = self.get_wound_count_for_trait_name(name, perm_only=perm_only)
@@ -82,18 +148,19 @@ class Traitshandler:
         return value
 
     def get_skill_value(self, name: str) -> int:
-        return self.adjust_by_wounds(self.skills.get(name, 0), name)
+        return self.get_effective_value("skill", name)
 
     def get_stat_value(self, name: str, raw=False) -> int:
         if raw:
-            return self.stats.get(name, 0)
-        return self.adjust_by_wounds(self.stats.get(name, 0), name)
+            return self.values["stat"].get(name, 0)
+        return self.get_effective_value("stat", name)
 
     def check_stat_can_be_raised(self, name: str) -> bool:
         """Returns True if the stat can be raised (or a permanent wound erased),
         False otherwise.
         """
-        return self.adjust_by_wounds(self.stats.get(name, 0), name, perm_only=True) < 5
+        value = self.values["stat"].get(name, 0)
+        return self.adjust_by_wounds(value, name, perm_only=True) < 5
 
     def set_stat_value(self, name: str, value: int):
         self.set_trait_value("stat", name, value)
@@ -102,19 +169,20 @@ class Traitshandler:
         self.set_trait_value("skill", name, value)
 
     def get_ability_value(self, name: str) -> int:
-        return self.abilities.get(name, 0)
+        return self.values["ability"].get(name, 0)
 
     def set_ability_value(self, name: str, value: int):
         self.set_trait_value("ability", name, value)
 
     def get_other_value(self, name: str) -> int:
-        return self.other.get(name, 0)
+        return self.values["other"].get(name, 0)
 
     def set_other_value(self, name: str, value: int):
         self.set_trait_value("other", name, value)
 
     def set_trait_value(self, trait_type: str, name: str, value: int):
         """Deletes or sets up a trait value for a character, updating our cache"""
+        self.invalidate_values()
         # if our value is 0 or lower, delete the trait value
         if value <= 0 and name in self._cache[trait_type]:
             trait_value = self._cache[trait_type].pop(name)
@@ -138,14 +206,11 @@ class Traitshandler:
         Gets the highest trait for list of skill names. If no matches, a ValueError is raised and we choose
         one at random.
         """
+        skills = self.values["skill"]
         try:
             # get the highest trait from the list of skill names
             return max(
-                [
-                    TraitValue(name, self.skills.get(name))
-                    for name in namelist
-                    if name in self.skills
-                ],
+                [TraitValue(name, skills[name]) for name in namelist if name in skills],
                 key=lambda x: x.value,
             )
         except ValueError:
@@ -154,19 +219,20 @@ class Traitshandler:
 
     # stats or other traits
     def __getattr__(self, name):
-        stat_names = Trait.get_valid_stat_names()
-        if name in stat_names:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        trait_type = Trait.get_trait_type_for_name(name)
+        if trait_type == Trait.STAT:
             return self.get_stat_value(name)
+        if trait_type == Trait.OTHER:
+            return self.get_other_value(name)
+        stat_names = Trait.get_valid_stat_names()
         other_names = Trait.get_valid_other_names()
-        if name in other_names:
-            return self.other.get(name, 0)
         raise AttributeError(f"{name} not found in {stat_names + other_names}.")
 
     @property
     def skills(self) -> Dict[str, int]:
-        return {
-            name: char_trait.value for name, char_trait in self._cache["skill"].items()
-        }
+        return dict(self.values["skill"])
 
     @skills.setter
     def skills(self, skills_dict: Dict[str, int]):
@@ -182,10 +248,7 @@ class Traitshandler:
 
     @property
     def abilities(self) -> Dict[str, int]:
-        return {
-            name: char_trait.value
-            for name, char_trait in self._cache["ability"].items()
-        }
+        return dict(self.values["ability"])
 
     @abilities.setter
     def abilities(self, abilities_dict: Dict[str, int]):
@@ -198,23 +261,21 @@ class Traitshandler:
 
     @property
     def stats(self) -> Dict[str, int]:
-        return {
-            name: char_trait.value for name, char_trait in self._cache["stat"].items()
-        }
+        return dict(self.values["stat"])
 
     @property
     def other(self) -> Dict[str, int]:
-        return {
-            name: char_trait.value for name, char_trait in self._cache["other"].items()
-        }
+        return dict(self.values["other"])
 
     def wipe_all_skills(self):
         self.character.trait_values.filter(trait__trait_type=Trait.SKILL).delete()
         self._cache["skill"] = defaultdict(CharacterTraitValue)
+        self.invalidate_values()
 
     def wipe_all_abilities(self):
         self.character.trait_values.filter(trait__trait_type=Trait.ABILITY).delete()
         self._cache["ability"] = defaultdict(CharacterTraitValue)
+        self.invalidate_values()
 
     def check_training(self, field, stype):
         trainer = self.character.db.trainer
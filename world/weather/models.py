@@ -38,6 +38,15 @@ class WeatherType(SharedMemoryModel):
             result += emit.weight * self.multiplier
         return result
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        WeatherEmit.clear_distributions()
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        WeatherEmit.clear_distributions()
+        return ret
+
 
 class WeatherEmit(SharedMemoryModel):
 
@@ -60,3 +69,20 @@ class WeatherEmit(SharedMemoryModel):
     weight = models.PositiveIntegerField("Weight", default=10)
     text = models.TextField("Emit", blank=False, null=False)
     gm_notes = models.TextField("GM Notes", blank=True, null=True)
+
+    # PreparedDistributions of emits or weather types, built by weather utils and
+    # kept until any emit or weather type is saved or deleted
+    distributions = {}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.clear_distributions()
+
+    def delete(self, *args, **kwargs):
+        ret = super().delete(*args, **kwargs)
+        self.clear_distributions()
+        return ret
+
+    @classmethod
+    def clear_distributions(cls):
+        cls.distributions.clear()
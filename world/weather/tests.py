@@ -1,9 +1,14 @@
 from __future__ import unicode_literals
-from mock import Mock
+import random
+from collections import Counter
+
+from django.test import SimpleTestCase
+from mock import Mock, patch
 from world.weather.models import WeatherType, WeatherEmit
 from server.utils.test_utils import ArxCommandTest
 from world.weather import weather_commands, weather_script, utils
 from evennia.server.models import ServerConfig
+from server.utils.picker import WeightedPicker
 
 
 class TestWeatherCommands(ArxCommandTest):
@@ -64,3 +69,44 @@ class TestWeatherCommands(ArxCommandTest):
         # Call choose_current_weather() and expect a WeatherSelectionError to be raised
         with self.assertRaises(utils.WeatherSelectionError):
             utils.choose_current_weather()
+
+    def test_emit_distribution(self):
+        distribution = utils.emit_distribution(self.weather1, "spring", "night")
+        self.assertIs(
+            utils.emit_distribution(self.weather1, "Spring", "night"), distribution
+        )
+        self.assertEqual(
+            utils.pick_emit(self.weather1, "spring", "night", 5),
+            "Test1 weather happens.",
+        )
+        self.emit1.text = "Test1 weather changes."
+        self.emit1.save()
+        self.assertEqual(
+            utils.pick_emit(self.weather1, "spring", "night", 5),
+            "Test1 weather changes.",
+        )
+
+
+class TestPreparedDistribution(SimpleTestCase):
+    def test_matches_weighted_picker(self):
+        weights = {"rain": 5, "snow": 0, "hail": 3, "sun": 10, "fog": 1}
+        picker = WeightedPicker()
+        for option, weight in weights.items():
+            picker.add_option(option, weight)
+        # the odds of the old pick, from every number it can draw
+        total = sum(weights.values()) + 1
+        expected = Counter()
+        for number in range(total):
+            with patch("server.utils.picker.random.randint", return_value=number):
+                expected[picker.pick()] += 1
+        random.seed(0)
+        samples = 10000
+        observed = Counter(picker.prepare().pick_many(samples))
+        self.assertEqual(observed["snow"], 0)
+        chi_squared = sum(
+            (observed[option] - samples * count / total) ** 2
+            / (samples * count / total)
+            for option, count in expected.items()
+        )
+        # the critical value for 3 degrees of freedom at p = 0.001
+        self.assertLess(chi_squared, 16.27)
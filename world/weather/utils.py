@@ -11,14 +11,12 @@ from random import randint
 from server.utils.picker import WeightedPicker
 
 
-def weather_emits(weathertype, season=None, time=None, intensity=5):
+def season_and_time(season=None, time=None):
     """
-    Return all emits matching the given values.
-    :param weathertype: The type of weather to use, a WeatherType object
-    :param season: The season (summer, spring, autumn, winter)
-    :param time: The time (morning, afternoon, evening, night)
-    :param intensity: The intensity of weather to pick an emit for, from 1 to 10
-    :return: A QuerySet of matching WeatherEmit objects
+    Fills in the current IC season and time of day if they're not given.
+    :param season: The season (summer, spring, autumn, winter), or None
+    :param time: The time (morning, afternoon, evening, night), or None
+    :return: A tuple of the lowercase season and time
     """
     if not season:
         season, _ = gametime.get_time_and_season()
@@ -27,6 +25,19 @@ def weather_emits(weathertype, season=None, time=None, intensity=5):
     if not time:
         _, time = gametime.get_time_and_season()
     time = time.lower()
+    return season, time
+
+
+def weather_emits(weathertype, season=None, time=None, intensity=5):
+    """
+    Return all emits matching the given values.
+    :param weathertype: The type of weather to use, a WeatherType object
+    :param season: The season (summer, spring, autumn, winter)
+    :param time: The time (morning, afternoon, evening, night)
+    :param intensity: The intensity of weather to pick an emit for, from 1 to 10
+    :return: A QuerySet of matching WeatherEmit objects
+    """
+    season, time = season_and_time(season, time)
 
     qs = WeatherEmit.objects.filter(weather=weathertype)
     qs = qs.filter(intensity_min__lte=intensity, intensity_max__gte=intensity)
@@ -81,9 +92,11 @@ def pick_emit(weathertype, season=None, time=None, intensity=None):
     if intensity is None:
         intensity = ServerConfig.objects.conf("weather_intensity_current", default=5)
 
-    emits = weather_emits(weathertype, season=season, time=time, intensity=intensity)
+    distribution = emit_distribution(
+        weathertype, season=season, time=time, intensity=intensity
+    )
 
-    if emits.count() == 0:
+    if not distribution.options:
         logger.log_err(
             "Weather: Unable to find any matching emits for {} intensity {} on a {} {}.".format(
                 weathertype.name, intensity, season, time
@@ -91,17 +104,32 @@ def pick_emit(weathertype, season=None, time=None, intensity=None):
         )
         return None
 
-    if emits.count() == 1:
-        return emits[0].text
+    result = distribution.pick()
 
-    picker = WeightedPicker()
-
-    for emit in emits:
-        picker.add_option(emit, emit.weight)
+    return result.text
 
-    result = picker.pick()
 
-    return result.text
+def emit_distribution(weathertype, season=None, time=None, intensity=5):
+    """
+    Returns a PreparedDistribution of the emits matching the given values, which
+    is kept until an emit or weather type is saved or deleted.
+    :param weathertype: The type of weather to use, a WeatherType object
+    :param season: The season (summer, spring, autumn, winter)
+    :param time: The time (morning, afternoon, evening, night)
+    :param intensity: The intensity of weather to pick an emit for, from 1 to 10
+    :return: A PreparedDistribution of WeatherEmit objects
+    """
+    season, time = season_and_time(season, time)
+    key = ("emits", weathertype.id, season, time, intensity)
+    if key not in WeatherEmit.distributions:
+        emits = weather_emits(
+            weathertype, season=season, time=time, intensity=intensity
+        )
+        picker = WeightedPicker()
+        for emit in emits:
+            picker.add_option(emit, emit.weight)
+        WeatherEmit.distributions[key] = picker.prepare()
+    return WeatherEmit.distributions[key]
 
 
 def set_weather_type(value=1):
@@ -195,27 +223,30 @@ def random_weather(season="fall"):
     :param season: 'summer', 'autumn', 'winter', or 'spring'
     :return: A WeatherType object with emits valid in the given season.
     """
-    emits = emits_for_season(season)
-
-    # Build a list of all weathers and the combined weight
-    # of their valid emits
-    weathers = {}
-    total_weight = 0
-    for emit in emits:
-        if emit.weather.automated:
-            weatherweight = (
-                weathers[emit.weather.id] if emit.weather.id in weathers else 0
-            )
-            weatherweight += emit.weight
-            weathers[emit.weather.id] = weatherweight * emit.weather.multiplier
-            total_weight += emit.weight
-
-    # Create our picker list
-    picker = WeightedPicker()
-    for k, v in weathers.items():
-        picker.add_option(k, v)
-
-    result = picker.pick()
+    key = ("weathers", season.lower())
+    if key not in WeatherEmit.distributions:
+        emits = emits_for_season(season)
+
+        # Build a list of all weathers and the combined weight
+        # of their valid emits
+        weathers = {}
+        total_weight = 0
+        for emit in emits:
+            if emit.weather.automated:
+                weatherweight = (
+                    weathers[emit.weather.id] if emit.weather.id in weathers else 0
+                )
+                weatherweight += emit.weight
+                weathers[emit.weather.id] = weatherweight * emit.weather.multiplier
+                total_weight += emit.weight
+
+        # Create our picker list
+        picker = WeightedPicker()
+        for k, v in weathers.items():
+            picker.add_option(k, v)
+        WeatherEmit.distributions[key] = picker.prepare()
+
+    result = WeatherEmit.distributions[key].pick()
 
     weather = WeatherType.objects.get(pk=result)
     return weather